@@ -5,7 +5,7 @@ import { SearchForm } from './components/SearchForm';
 import { Spinner } from './components/Spinner';
 import { TranslationWidget } from './components/TranslationWidget';
 import { AuthModal } from './components/AuthModal';
-import { getCoordinatesForLocation, getPointsOfInterest, getWeatherForCoordinates } from './services/apiService';
+import { exploreLocation } from './services/apiService';
 import type { Coordinates, PointOfInterest } from './types';
 import { onAuthStateChanged, User, signOut } from 'firebase/auth';
 import { auth } from './services/firebase';
@@ -51,26 +51,9 @@ export default function App() {
     setSearchedLocation(locationName);
 
     try {
-      const coords = await getCoordinatesForLocation(locationName);
-      if (!coords) {
-        throw new Error("Không thể tìm thấy tọa độ cho địa điểm đã chỉ định.");
-      }
+      // Coordinates, POIs and weather come back from a single /api/explore call
+      const { coordinates: coords, pois: poisWithWeather } = await exploreLocation(locationName);
       setMapCenter(coords);
-
-      const fetchedPois = await getPointsOfInterest(coords);
-      
-      // Fetch weather for all POIs concurrently
-      const weatherPromises = fetchedPois.map(poi => getWeatherForCoordinates(poi.coordinates));
-      const weatherResults = await Promise.allSettled(weatherPromises);
-
-      const poisWithWeather = fetchedPois.map((poi, index) => {
-        const weatherResult = weatherResults[index];
-        if (weatherResult.status === 'fulfilled' && weatherResult.value) {
-          return { ...poi, weather: weatherResult.value };
-        }
-        return poi; // Return POI without weather if fetch failed
-      });
-      
       setPois(poisWithWeather);
 
     } catch (err) {
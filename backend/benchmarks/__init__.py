@@ -0,0 +1 @@
+# File này để Python nhận diện thư mục benchmarks là một package
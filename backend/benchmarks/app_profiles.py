@@ -0,0 +1,133 @@
+"""
+Benchmark thời gian khởi động và bộ nhớ nền theo APP_PROFILE (all, geo, translation)
+
+Với mỗi profile, đo trong tiến trình mới:
+- import: thời gian `import main`, RSS ngay sau import và các module nặng đã bị nạp
+  (torch, transformers, ...) - process geo không được nạp module nào trong số này
+- serve: chạy uvicorn, thời gian tới khi /health hết 503 (gồm nạp + warmup model
+  theo TRANSLATION_PRELOAD), RSS lúc sẵn sàng và số route được gắn
+
+Chạy từ thư mục backend:
+    python -m benchmarks.app_profiles
+    TRANSLATION_PRELOAD= python -m benchmarks.app_profiles --profiles geo translation
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import httpx
+
+from benchmarks.stats import rss_mb
+from benchmarks.suite import BACKEND_DIR, free_port
+
+
+HEAVY_MODULES = ("torch", "transformers", "huggingface_hub", "optimum", "onnxruntime")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) / 1024 for line in f if line.startswith("VmRSS:"))
+print(json.dumps({{
+    "import_s": round(elapsed, 3),
+    "import_rss_mb": round(rss, 1),
+    "modules": len(sys.modules),
+    "heavy_modules": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def profile_env(profile: str, cache_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "APP_PROFILE": profile,
+        "GEOCODE_CACHE_PATH": os.path.join(cache_dir, "geocode.sqlite3"),
+        "POI_TILE_CACHE_PATH": os.path.join(cache_dir, "poi_tiles.sqlite3"),
+        "TRANSLATION_CACHE_PATH": os.path.join(cache_dir, "translations.sqlite3"),
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+def measure_import(profile: str, cache_dir: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=profile_env(profile, cache_dir),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_serve(profile: str, cache_dir: str, timeout: float) -> Dict:
+    port = free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=profile_env(profile, cache_dir),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        health = None
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    raise RuntimeError(f"App profile {profile} đã thoát (code {process.returncode})")
+                try:
+                    response = client.get("/health")
+                    if response.status_code != 503:
+                        health = response.json()
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+            if health is None:
+                raise RuntimeError(f"App profile {profile} chưa sẵn sàng sau {timeout}s")
+            ready_s = time.perf_counter() - start
+            routes = [path for path in client.get("/openapi.json").json()["paths"] if path.startswith("/api/")]
+        return {
+            "ready_s": round(ready_s, 2),
+            "ready_rss_mb": round(rss_mb(process.pid), 1),
+            "status": health["status"],
+            "api_routes": len(routes),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thời gian import/khởi động và RSS theo APP_PROFILE")
+    parser.add_argument("--profiles", nargs="+", default=["all", "geo", "translation"],
+                        choices=["all", "geo", "translation"])
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần đo import (lấy giá trị nhỏ nhất)")
+    parser.add_argument("--timeout", type=float, default=600, help="Thời gian chờ /health (giây)")
+    args = parser.parse_args()
+
+    print(f"TRANSLATION_PRELOAD={os.getenv('TRANSLATION_PRELOAD', 'en-vi,vi-en')!r}")
+    print(f"{'profile':<12} {'import s':>9} {'import MB':>10} {'modules':>8} {'ready s':>8} "
+          f"{'ready MB':>9} {'routes':>7} {'status':<9} module nặng")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory(prefix="bench-profile-") as cache_dir:
+            imports = [measure_import(profile, cache_dir) for _ in range(args.repeat)]
+            best = min(imports, key=lambda result: result["import_s"])
+            serve = measure_serve(profile, cache_dir, args.timeout)
+        print(
+            f"{profile:<12} {best['import_s']:>9.3f} {best['import_rss_mb']:>10.1f} {best['modules']:>8} "
+            f"{serve['ready_s']:>8.2f} {serve['ready_rss_mb']:>9.1f} {serve['api_routes']:>7} "
+            f"{serve['status']:<9} {', '.join(best['heavy_modules']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark cold start và bộ nhớ của các worker gunicorn (Linux)
+
+Khởi động gunicorn (gunicorn.conf.py) với và không có preload_app, đo:
+- Thời gian từ lúc khởi động tới khi /health trả 200 (model đã nạp + warmup)
+- Độ trễ request dịch đầu tiên sau khi sẵn sàng
+- RSS và PSS của master và từng worker (PSS chia đều các trang nhớ dùng chung,
+  tổng PSS là bộ nhớ vật lý thực sự mà cả nhóm tiến trình chiếm)
+
+Chạy từ thư mục backend:
+    python -m benchmarks.cold_start --workers 2 4
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """RSS và PSS của một tiến trình (từ /proc/<pid>/smaps_rollup)"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower() + "_mb"] = round(int(parts[1]) / 1024, 1)
+    return values
+
+
+def children(pid: int) -> List[int]:
+    """Các tiến trình con trực tiếp (worker của gunicorn master)"""
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+
+def run(workers: int, preload: bool, port: int, timeout: float) -> Dict:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "PORT": str(port),
+    }
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # Sẵn sàng khi mọi worker đều trả 200 (mỗi request có thể vào worker khác nhau)
+        ready_at = None
+        consecutive_ok = 0
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                    consecutive_ok += 1
+                    ready_at = ready_at or time.perf_counter()
+                    if consecutive_ok >= workers * 3:
+                        break
+                else:
+                    consecutive_ok, ready_at = 0, None
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        else:
+            raise TimeoutError(f"Server không sẵn sàng sau {timeout}s")
+
+        first = time.perf_counter()
+        httpx.post(
+            f"{base_url}/api/translate",
+            json={"text": "The old quarter is full of street food.", "source_lang": "en", "target_lang": "vi"},
+            timeout=timeout,
+        ).raise_for_status()
+        first_translate_ms = (time.perf_counter() - first) * 1000
+
+        worker_memory = [memory_mb(pid) for pid in children(proc.pid)]
+        master_memory = memory_mb(proc.pid)
+        return {
+            "workers": workers,
+            "preload": preload,
+            "ready_seconds": round(ready_at - start, 2),
+            "first_translate_ms": round(first_translate_ms, 1),
+            "master": master_memory,
+            "worker_rss_mb": [m["rss_mb"] for m in worker_memory],
+            "total_pss_mb": round(master_memory["pss_mb"] + sum(m["pss_mb"] for m in worker_memory), 1),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo cold start và RSS/PSS của các worker gunicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600, help="Thời gian chờ tối đa (giây)")
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        for preload in (False, True):
+            result = run(workers, preload, args.port, args.timeout)
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+So sánh hai file kết quả của benchmarks.suite (VD: trước/sau một commit)
+
+Ghép kết quả theo (kịch bản, mức đồng thời) và in thay đổi của throughput,
+p50/p99, CPU mỗi request và RSS. Thoát với mã 1 nếu có hồi quy vượt ngưỡng
+(throughput giảm, p99 hoặc CPU/request tăng quá --threshold %, hoặc thêm lỗi)
+để dùng được trong CI.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+# (khóa, tên cột, True nếu giá trị lớn hơn là tốt hơn)
+METRICS = [
+    ("throughput_rps", "req/s", True),
+    ("p50_ms", "p50 ms", False),
+    ("p99_ms", "p99 ms", False),
+    ("cpu_ms_per_request", "cpu ms/req", False),
+    ("rss_mb", "rss MB", False),
+]
+# Chỉ số dùng để quyết định hồi quy (p50 và RSS chỉ để tham khảo)
+GATED = {"throughput_rps", "p99_ms", "cpu_ms_per_request"}
+
+
+def load(path: str) -> Tuple[Dict, Dict[Tuple[str, int], Dict]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report["meta"], {(r["scenario"], r["concurrency"]): r for r in report["results"]}
+
+
+def change(before: float, after: float) -> Optional[float]:
+    """Thay đổi theo %, None nếu không so được (giá trị gốc bằng 0)"""
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float, min_ms: float) -> Tuple[List[List[str]], List[str]]:
+    """
+    Returns:
+        (các dòng của bảng, danh sách mô tả hồi quy)
+    """
+    rows, regressions = [], []
+    for key in sorted(set(baseline) & set(candidate)):
+        before, after = baseline[key], candidate[key]
+        label = f"{key[0]} c={key[1]}"
+        row = [key[0], str(key[1])]
+        for metric, title, higher_is_better in METRICS:
+            delta = change(before[metric], after[metric])
+            row.append(f"{after[metric]:g} ({delta:+.1f}%)" if delta is not None else f"{after[metric]:g}")
+            if metric not in GATED or delta is None:
+                continue
+            worse = -delta if higher_is_better else delta
+            # Bỏ qua chênh lệch tuyệt đối quá nhỏ của độ trễ (nhiễu khi đo ở mức < 1ms)
+            if metric.endswith("_ms") and abs(after[metric] - before[metric]) < min_ms:
+                continue
+            if worse > threshold:
+                regressions.append(f"{label}: {title} {before[metric]:g} -> {after[metric]:g} ({delta:+.1f}%)")
+
+        error_rate_before = before["errors"] / before["requests"]
+        error_rate_after = after["errors"] / after["requests"]
+        row.append(f"{after['errors']}/{after['requests']}")
+        if error_rate_after > error_rate_before:
+            regressions.append(
+                f"{label}: tỉ lệ lỗi {error_rate_before:.1%} -> {error_rate_after:.1%}"
+            )
+        rows.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh hai kết quả benchmarks.suite")
+    parser.add_argument("baseline", help="Kết quả gốc (VD: commit trước)")
+    parser.add_argument("candidate", help="Kết quả cần kiểm tra")
+    parser.add_argument("--threshold", type=float, default=10, help="Ngưỡng hồi quy (%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Bỏ qua chênh lệch độ trễ nhỏ hơn (ms)")
+    args = parser.parse_args()
+
+    meta_before, baseline = load(args.baseline)
+    meta_after, candidate = load(args.candidate)
+    print(f"Gốc:  {meta_before.get('commit')} ({meta_before.get('timestamp')}, profile {meta_before['profile']['name']})")
+    print(f"Mới:  {meta_after.get('commit')} ({meta_after.get('timestamp')}, profile {meta_after['profile']['name']})")
+    if meta_before["profile"] != meta_after["profile"] or meta_before.get("cpu_count") != meta_after.get("cpu_count"):
+        print("Cảnh báo: khác profile upstream hoặc số CPU, kết quả có thể không so sánh được")
+
+    rows, regressions = compare(baseline, candidate, args.threshold, args.min_ms)
+    headers = ["scenario", "c"] + [title for _, title, _ in METRICS] + ["errors"]
+    widths = [max(len(headers[i]), *(len(row[i]) for row in rows)) if rows else len(headers[i])
+              for i in range(len(headers))]
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    missing = sorted(set(baseline) ^ set(candidate))
+    if missing:
+        print(f"Chỉ có ở một bên (không so sánh): {', '.join(f'{s} c={c}' for s, c in missing)}")
+
+    if regressions:
+        print(f"\nHồi quy vượt ngưỡng {args.threshold:g}%:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\nKhông có hồi quy vượt ngưỡng {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
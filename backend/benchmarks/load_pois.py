@@ -0,0 +1,119 @@
+"""
+Load test cho /api/pois với upstream Overpass giả lập (không gọi mạng thật)
+
+Bắn N request đồng thời vào app (qua ASGI transport) trong khi upstream trả lời
+chậm, đồng thời đo độ trễ của /health để chứng minh event loop không bị chặn.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.load_pois --concurrency 200 --upstream-latency-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+# Không nạp model dịch: benchmark chỉ đo phần địa điểm, /health phải sẵn sàng ngay
+os.environ.setdefault("TRANSLATION_PRELOAD", "")
+
+import main
+from benchmarks.stats import percentile
+from services.cache import TwoTierCache
+from services.http_client import HttpClient
+from services.location_service import LocationService
+
+
+STUB_OVERPASS_RESPONSE = {
+    "elements": [
+        {
+            "type": "node",
+            "id": 1000 + i,
+            "lat": 21.0285 + i * 0.001,
+            "lon": 105.8542 + i * 0.001,
+            "tags": {"name": f"POI {i}", "tourism": "attraction"},
+        }
+        for i in range(5)
+    ]
+}
+
+
+def make_stub_transport(latency_s: float) -> httpx.MockTransport:
+    """Upstream giả lập: trả về dữ liệu cố định sau một độ trễ"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_s)
+        return httpx.Response(200, json=STUB_OVERPASS_RESPONSE)
+
+    return httpx.MockTransport(handler)
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float:
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(concurrency: int, latency_ms: float, per_host_limit: int) -> dict:
+    # Thay LocationService của app bằng bản trỏ tới upstream giả lập
+    main.location_service = LocationService(
+        http_client=HttpClient(
+            per_host_limit=per_host_limit,
+            transport=make_stub_transport(latency_ms / 1000),
+        ),
+        # Cache chỉ trong bộ nhớ để mỗi lần chạy bắt đầu nguội
+        geocode_cache=TwoTierCache("geocode"),
+        poi_tile_cache=TwoTierCache("poi_tiles"),
+    )
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            payload = {"lat": 21.0285, "lng": 105.8542}
+            poi_tasks = [
+                asyncio.create_task(timed(client, "POST", "/api/pois", json=payload))
+                for _ in range(concurrency)
+            ]
+
+            # Thăm dò /health trong lúc đang tải
+            health_samples = []
+            while not all(task.done() for task in poi_tasks):
+                health_samples.append(await timed(client, "GET", "/health"))
+                await asyncio.sleep(0.01)
+
+            poi_samples = await asyncio.gather(*poi_tasks)
+
+    return {
+        "concurrency": concurrency,
+        "upstream_latency_ms": latency_ms,
+        "pois_p50_ms": round(statistics.median(poi_samples), 2),
+        "pois_p99_ms": round(percentile(poi_samples, 99), 2),
+        "pois_max_ms": round(max(poi_samples), 2),
+        "health_p99_ms": round(percentile(health_samples, 99), 2) if health_samples else None,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Load test /api/pois với upstream giả lập")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50)
+    parser.add_argument("--per-host-limit", type=int, default=50)
+    parser.add_argument("--p99-budget-ms", type=float, default=1000,
+                        help="Ngưỡng p99 cho /api/pois, vượt quá thì exit code 1")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.concurrency, args.upstream_latency_ms, args.per_host_limit))
+    for key, value in result.items():
+        print(f"{key:>22}: {value}")
+
+    if result["pois_p99_ms"] > args.p99_budget_ms:
+        print(f"❌ p99 vượt ngưỡng {args.p99_budget_ms} ms")
+        sys.exit(1)
+    print("✅ p99 nằm trong ngưỡng")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,139 @@
+"""
+Benchmark prefetch: request của người dùng gặp cache hết hạn khi tắt/bật PREFETCH_ENABLED
+
+Chạy app với stub upstream, Open-Meteo cập nhật mỗi --weather-interval giây (thay vì 15
+phút) để số liệu thời tiết hết hạn nhiều lần trong thời gian chạy. Tải /api/explore với
+tần suất cố định, địa điểm chọn theo phân phối Zipf (vài điểm đến rất hot, đuôi dài ít
+hot). Hai lượt chạy (tắt rồi bật prefetch) dùng cùng chuỗi request, so sánh:
+- số lần request tra cache thời tiết gặp entry đã hết hạn (phải chờ Open-Meteo)
+- độ trễ p50/p99 của explore và số lời gọi Open-Meteo
+- khi bật: số khóa hot được làm mới trước khi hết hạn (renewed) và đã hết hạn trước khi
+  kịp làm mới (expired) theo loại dữ liệu, như trong /health
+
+Chạy từ thư mục backend:
+    python -m benchmarks.prefetch
+    python -m benchmarks.prefetch --duration 600 --rate 20 --weather-interval 120
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stats import percentile
+from benchmarks.stub_upstream import PROFILES
+from benchmarks.suite import app_server, load_places, stub_upstreams, wait_ready
+
+
+def zipf_sequence(places: List[str], count: int, exponent: float, rng: random.Random) -> List[str]:
+    """count tên địa điểm, tên thứ i được chọn với trọng số 1 / (i + 1)^exponent"""
+    weights = [1 / (rank + 1) ** exponent for rank in range(len(places))]
+    return rng.choices(places, weights=weights, k=count)
+
+
+async def run_once(args, queries: List[str], prefetch: bool) -> Dict:
+    extra_env = {
+        "PREFETCH_ENABLED": "1" if prefetch else "0",
+        "PREFETCH_INTERVAL": str(args.prefetch_interval),
+        "PREFETCH_TOP_N": str(args.top_n),
+    }
+    with tempfile.TemporaryDirectory(prefix="bench-prefetch-") as cache_dir, \
+            stub_upstreams(args, ["--weather-interval", str(args.weather_interval)]) as upstream_env, \
+            app_server(args, upstream_env, cache_dir, extra_env) as (process, base_url):
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            await wait_ready(client, process, timeout=120)
+            latencies: List[float] = []
+            errors = 0
+
+            async def explore(query: str):
+                nonlocal errors
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/api/explore", params={"q": query, "limit": 10})
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            # Tải mở (open loop): gửi request theo lịch cố định, không chờ request trước xong
+            tasks = []
+            start = time.monotonic()
+            for i, query in enumerate(queries):
+                delay = start + i / args.rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(explore(query)))
+            await asyncio.gather(*tasks)
+
+            health = (await client.get("/health")).json()
+
+    weather = health["cache"]["weather"]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "weather_expirations": weather["expirations"],
+        "weather_misses": weather["misses"],
+        "open_meteo_calls": weather["upstream_calls"],
+        "prefetch": health.get("prefetch"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh cache hết hạn với request của người dùng khi tắt/bật prefetch")
+    parser.add_argument("--duration", type=float, default=300, help="Thời gian tạo tải mỗi lượt (giây)")
+    parser.add_argument("--rate", type=float, default=10, help="Số request explore mỗi giây")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Số mũ Zipf (lớn hơn = tập trung vào ít điểm đến hơn)")
+    parser.add_argument("--places", type=int, default=30, help="Số tên lấy từ gazetteer (thêm vào tên trong fixture)")
+    parser.add_argument("--weather-interval", type=int, default=60, help="Chu kỳ cập nhật thời tiết của stub (giây)")
+    parser.add_argument("--prefetch-interval", type=float, default=5, help="PREFETCH_INTERVAL của app (giây)")
+    parser.add_argument("--top-n", type=int, default=20, help="PREFETCH_TOP_N của app")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="Độ trễ/lỗi của upstream")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--nominatim-rate", type=float, default=50, help="NOMINATIM_RATE của app khi chạy với stub")
+    args = parser.parse_args()
+    # app_server chỉ nạp model dịch khi có kịch bản translate
+    args.scenarios = ["explore"]
+
+    rng = random.Random(args.seed)
+    places = load_places(args.places)
+    rng.shuffle(places)
+    queries = zipf_sequence(places, int(args.duration * args.rate), args.zipf, rng)
+    print(f"{len(queries)} request explore trong {args.duration:g}s, {len(set(queries))} địa điểm khác nhau, "
+          f"thời tiết cập nhật mỗi {args.weather_interval}s")
+
+    results = {}
+    for prefetch in (False, True):
+        label = "bật" if prefetch else "tắt"
+        print(f"Đang chạy với prefetch {label}...")
+        results[label] = asyncio.run(run_once(args, queries, prefetch))
+
+    print(f"\n{'prefetch':<9} {'req':>6} {'err':>5} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'weather hết hạn':>16} {'weather miss':>13} {'Open-Meteo':>11}")
+    for label, result in results.items():
+        print(
+            f"{label:<9} {result['requests']:>6} {result['errors']:>5} {result['p50_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['weather_expirations']:>16} {result['weather_misses']:>13} "
+            f"{result['open_meteo_calls']:>11}"
+        )
+
+    stats = results["bật"]["prefetch"]
+    if stats:
+        print(f"\nPrefetch: {stats['ticks']} chu kỳ, {stats['tracked_destinations']} điểm đến được theo dõi")
+        print(f"{'loại':<10} {'renewed':>8} {'expired':>8} {'cold':>6} {'tỉ lệ expired':>14} {'gọi ok':>7} {'lỗi':>5}")
+        for kind, counts in stats["keys"].items():
+            refreshes = stats["refreshes"][kind]
+            print(
+                f"{kind:<10} {counts['renewed']:>8} {counts['expired']:>8} {counts['cold']:>6} "
+                f"{stats['expired_ratio'][kind]:>14.1%} {refreshes['ok']:>7} {refreshes['error']:>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
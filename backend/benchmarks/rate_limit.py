@@ -0,0 +1,72 @@
+"""
+Benchmark rate limiter của Nominatim (1 request/giây theo usage policy)
+
+Một đợt geocoding nền (như prefetch) xếp hàng trước, sau đó người dùng gửi
+vài truy vấn: truy vấn interactive phải được phục vụ trước phần nền còn lại.
+Báo cáo thời gian chờ trong hàng đợi tách khỏi độ trễ của upstream, và số
+request upstream thực tế mỗi giây (không được vượt NOMINATIM_RATE).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.rate_limit --background 10 --interactive 3
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_upstream import StubProfile, StubServer
+
+
+async def run(args):
+    async with StubServer(StubProfile(latency_ms=args.latency_ms)) as stub:
+        os.environ["NOMINATIM_URL"] = stub.url("/search")
+        os.environ["GAZETTEER_PATH"] = ""
+
+        from services.cache import TwoTierCache
+        from services.location_service import LocationService
+        from services.rate_limiter import background_priority
+
+        service = LocationService(geocode_cache=TwoTierCache("geocode"))
+        start = time.perf_counter()
+
+        async def geocode(name: str) -> float:
+            await service.get_coordinates(name)
+            return time.perf_counter() - start
+
+        async def background(i: int) -> float:
+            with background_priority():
+                return await geocode(f"Background place {i}")
+
+        background_tasks = [asyncio.create_task(background(i)) for i in range(args.background)]
+        await asyncio.sleep(args.user_delay)
+        interactive = await asyncio.gather(*(geocode(f"User query {i}") for i in range(args.interactive)))
+        background_done = await asyncio.gather(*background_tasks)
+        elapsed = time.perf_counter() - start
+
+        nominatim = service.upstream_stats()["nominatim"]
+        limiter = next(iter(nominatim["endpoints"].values()))["rate_limiter"]
+        await service.shutdown()
+
+    print(f"Độ trễ upstream:      {args.latency_ms:.0f}ms (stub)")
+    print(f"Upstream requests: {stub.profile.requests} trong {elapsed:.1f}s "
+          f"({stub.profile.requests / elapsed:.2f} req/s)")
+    print(f"Interactive xong lúc: {[round(t, 1) for t in interactive]} s")
+    print(f"Nền xong lúc:         {[round(t, 1) for t in sorted(background_done)]} s")
+    print(f"Chờ hàng đợi (avg):   {limiter['avg_wait_ms']}")
+    print(f"Chờ hàng đợi (max):   {limiter['max_wait_ms']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Độ công bằng / ưu tiên của rate limiter Nominatim")
+    parser.add_argument("--background", type=int, default=10, help="Số truy vấn nền xếp hàng trước")
+    parser.add_argument("--interactive", type=int, default=3, help="Số truy vấn của người dùng")
+    parser.add_argument("--user-delay", type=float, default=1.5, help="Người dùng gửi sau bao lâu (giây)")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
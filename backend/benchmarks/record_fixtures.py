@@ -0,0 +1,102 @@
+"""
+Ghi lại response thật của Nominatim, Overpass và Open-Meteo làm fixtures cho stub
+(benchmarks/fixtures), để benchmark phát lại dữ liệu thật mà không gọi mạng
+
+- Nominatim: mỗi địa điểm một request (cách nhau 1 giây theo usage policy)
+- Overpass: cùng query với app, trên bbox quanh tọa độ của từng địa điểm
+- Open-Meteo: một tọa độ, dùng làm mẫu block "current"
+
+Chạy từ thư mục backend (cần mạng):
+    python -m benchmarks.record_fixtures
+    python -m benchmarks.record_fixtures --places "Hồ Hoàn Kiếm" "Cầu Rồng" --radius-km 3
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stub_upstream import FIXTURES_DIR
+
+
+USER_AGENT = "VietnamDiscoveryApp/1.0 (benchmark fixtures)"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+
+def overpass_query(south: float, west: float, north: float, east: float) -> str:
+    """Query giống LocationService._fetch_tiles"""
+    bbox = f"{south},{west},{north},{east}"
+    return f"""
+        [out:json][timeout:25];
+        (
+          node["tourism"~"attraction|museum|viewpoint|artwork|gallery"]({bbox});
+          node["historic"]({bbox});
+          node["natural"~"beach|cave|peak|waterfall"]({bbox});
+        );
+        out body;
+        """
+
+
+def write(name: str, data, directory: str):
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+def main():
+    with open(os.path.join(FIXTURES_DIR, "nominatim.json"), encoding="utf-8") as f:
+        default_places = list(json.load(f))
+
+    parser = argparse.ArgumentParser(description="Ghi response thật của các upstream làm fixtures cho stub")
+    parser.add_argument("--places", nargs="+", default=default_places, help="Các địa điểm cần ghi")
+    parser.add_argument("--radius-km", type=float, default=5, help="Bán kính bbox Overpass quanh mỗi địa điểm")
+    parser.add_argument("--output", default=FIXTURES_DIR, help="Thư mục ghi fixtures")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    nominatim: Dict[str, List[Dict]] = {}
+    elements: Dict[int, Dict] = {}
+    with httpx.Client(headers={"User-Agent": USER_AGENT}, timeout=60) as client:
+        for place in args.places:
+            response = client.get(NOMINATIM_URL, params={"q": f"{place}, Vietnam", "format": "json", "limit": 1})
+            response.raise_for_status()
+            nominatim[place.lower()] = response.json()
+            print(f"Nominatim {place}: {len(nominatim[place.lower()])} kết quả")
+            time.sleep(1)
+
+        for place, results in nominatim.items():
+            if not results:
+                continue
+            lat, lng = float(results[0]["lat"]), float(results[0]["lon"])
+            dlat = args.radius_km / 111.32
+            dlng = args.radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+            response = client.post(
+                OVERPASS_URL, data={"data": overpass_query(lat - dlat, lng - dlng, lat + dlat, lng + dlng)}
+            )
+            response.raise_for_status()
+            found = response.json().get("elements", [])
+            elements.update((element["id"], element) for element in found)
+            print(f"Overpass {place}: {len(found)} element")
+
+        lat, lng = next(
+            (float(r[0]["lat"]), float(r[0]["lon"])) for r in nominatim.values() if r
+        )
+        response = client.get(
+            OPEN_METEO_URL, params={"latitude": lat, "longitude": lng, "current": "temperature_2m,weather_code"}
+        )
+        response.raise_for_status()
+        open_meteo = response.json()
+
+    write("nominatim.json", nominatim, args.output)
+    write("overpass.json", {"elements": list(elements.values())}, args.output)
+    write("open_meteo.json", open_meteo, args.output)
+    print(f"Đã ghi fixtures vào {args.output}: {len(nominatim)} địa điểm, {len(elements)} POI")
+
+
+if __name__ == "__main__":
+    main()
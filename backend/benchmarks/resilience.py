@@ -0,0 +1,121 @@
+"""
+Benchmark lớp resilience của upstream (circuit breaker, hedge, failover, stale cache)
+
+Dựng 2 mirror Overpass giả lập và cho chúng gặp sự cố theo từng pha:
+- healthy: cả 2 mirror bình thường
+- primary_slow: mirror chính chậm (hedge nên thắng ở mirror phụ)
+- primary_down: mirror chính lỗi 503 (breaker ngắt, chuyển hẳn sang mirror phụ)
+- all_down: cả 2 mirror lỗi, cache ô bản đồ đã hết hạn (phục vụ dữ liệu cũ)
+Mỗi pha báo cáo p50/p99 của get_points_of_interest, số lần phải trả POI mẫu
+và trạng thái breaker/hedge của Overpass.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.resilience --requests 40
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stats import percentile
+from benchmarks.stub_upstream import StubProfile, StubServer
+
+
+async def run_phase(service, name: str, coordinates, stubs) -> dict:
+    for stub in stubs:
+        stub.profile.requests = stub.profile.errors = 0
+
+    latencies = []
+    fallbacks = 0
+    for lat, lng in coordinates:
+        start = time.perf_counter()
+        pois = await service.get_points_of_interest(lat, lng, limit=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not any(poi["name"].startswith("Stub POI") for poi in pois):
+            fallbacks += 1
+
+    overpass = service.upstream_stats()["overpass"]
+    return {
+        "phase": name,
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "fallback_pois": fallbacks,
+        "stale_hits": service.poi_tile_cache.stale_hits,
+        "hedged": overpass["hedged"],
+        "failovers": overpass["failovers"],
+        "primary_requests": stubs[0].profile.requests,
+        "mirror_requests": stubs[1].profile.requests,
+        "breakers": {url: endpoint["state"] for url, endpoint in overpass["endpoints"].items()},
+    }
+
+
+async def run(args):
+    primary = StubServer(StubProfile(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, seed=1))
+    mirror = StubServer(StubProfile(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, seed=2))
+
+    async with primary, mirror:
+        # Cấu hình phải có trước khi tạo service (đọc URL upstream lúc khởi tạo)
+        os.environ["OVERPASS_URLS"] = f"{primary.url('/api/interpreter')},{mirror.url('/api/interpreter')}"
+        os.environ["NOMINATIM_URL"] = primary.url("/search")
+        os.environ["OPEN_METEO_URL"] = primary.url("/v1/forecast")
+        os.environ["POI_STORE_PATH"] = ""
+
+        import services.location_service as location_module
+        from services.cache import TwoTierCache
+        from services.location_service import LocationService
+
+        # TTL ngắn để pha cuối gặp toàn ô đã hết hạn
+        location_module.POI_TILE_TTL = args.tile_ttl
+
+        workdir = tempfile.mkdtemp(prefix="resilience-bench-")
+        tile_cache = TwoTierCache(
+            "poi_tiles", path=os.path.join(workdir, "tiles.sqlite3"), max_stale=3600
+        )
+        service = LocationService(poi_tile_cache=tile_cache, geocode_cache=TwoTierCache("geocode"))
+        # Mỗi request một vùng chưa có trong cache để luôn phải gọi Overpass
+        regions = iter((8.5 + (i // 20) * 0.5, 102.5 + (i % 20) * 0.3) for i in range(10_000))
+
+        def next_coordinates():
+            return [next(regions) for _ in range(args.requests)]
+
+        results = []
+        healthy = next_coordinates()
+        results.append(await run_phase(service, "healthy", healthy, [primary, mirror]))
+
+        primary.profile.latency_ms = args.slow_ms
+        results.append(await run_phase(service, "primary_slow", next_coordinates(), [primary, mirror]))
+
+        primary.profile.latency_ms = args.latency_ms
+        primary.profile.error_rate = 1.0
+        results.append(await run_phase(service, "primary_down", next_coordinates(), [primary, mirror]))
+
+        # Cả 2 mirror lỗi; service mới (index rỗng) đọc lại các vùng của pha healthy
+        mirror.profile.error_rate = 1.0
+        await asyncio.sleep(args.tile_ttl)
+        stale_service = LocationService(poi_tile_cache=tile_cache, geocode_cache=TwoTierCache("geocode"))
+        results.append(await run_phase(stale_service, "all_down", healthy, [primary, mirror]))
+
+        await service.shutdown()
+        await stale_service.shutdown()
+        tile_cache.close()
+
+    for result in results:
+        print(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark circuit breaker / hedge / stale cache của Overpass")
+    parser.add_argument("--requests", type=int, default=40, help="Số request mỗi pha")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Độ trễ bình thường của stub")
+    parser.add_argument("--slow-ms", type=float, default=2000, help="Độ trễ mirror chính ở pha primary_slow")
+    parser.add_argument("--tile-ttl", type=float, default=1.0, help="TTL (giây) của ô POI trong benchmark")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Hàm thống kê dùng chung cho các benchmark
+"""
+
+import os
+
+
+def percentile(samples: list, p: float) -> float:
+    """Percentile theo nearest-rank (ms)"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def cpu_seconds(pid: int) -> float:
+    """Tổng thời gian CPU (user + system) tiến trình đã dùng (từ /proc/<pid>/stat)"""
+    with open(f"/proc/{pid}/stat") as f:
+        # Bỏ phần "pid (tên)" vì tên tiến trình có thể chứa khoảng trắng
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid: int) -> float:
+    """RSS hiện tại của tiến trình (từ /proc/<pid>/status)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
@@ -0,0 +1,287 @@
+"""
+Upstream giả lập chạy local (HTTP thật qua uvicorn) cho benchmark và kiểm thử:
+trả lời theo định dạng của Nominatim, Overpass và Open-Meteo, với độ trễ và tỉ lệ
+lỗi cấu hình được (đổi được trong lúc chạy để mô phỏng sự cố)
+
+Có fixtures (benchmarks/fixtures, ghi lại bằng benchmarks.record_fixtures) thì phát
+lại response đã ghi: Nominatim theo tên địa điểm, Overpass lọc các element trong
+bbox của query, Open-Meteo theo mẫu block "current". Không có fixtures thì sinh dữ liệu giả
+
+Dùng trong code:
+    async with StubServer(StubProfile(latency_ms=50)) as stub:
+        os.environ["OVERPASS_URLS"] = stub.url("/api/interpreter")
+
+Chạy riêng (VD: để trỏ app thật vào qua biến môi trường):
+    python -m benchmarks.stub_upstream --port 9001 --latency-ms 200 --error-rate 0.1
+    python -m benchmarks.stub_upstream --port 9001 --profile flaky --fixtures
+    python -m benchmarks.stub_upstream --port 9001 --fixtures --weather-interval 60
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+
+_BBOX_RE = re.compile(r"\((-?[\d.]+),(-?[\d.]+),(-?[\d.]+),(-?[\d.]+)\)")
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Profile độ trễ/lỗi đặt sẵn (tham số của StubProfile)
+PROFILES: Dict[str, Dict] = {
+    "fast": {"latency_ms": 5},
+    "realistic": {"latency_ms": 150, "jitter_ms": 300},
+    "flaky": {"latency_ms": 150, "jitter_ms": 300, "error_rate": 0.1, "error_status": 503},
+    "throttled": {"latency_ms": 150, "jitter_ms": 100, "error_rate": 0.2, "error_status": 429},
+}
+
+# Weather code xoay vòng theo tọa độ để các ô lưới có thời tiết khác nhau
+_WEATHER_CODES = (0, 1, 2, 3, 45, 61, 80, 95)
+
+
+class StubProfile:
+    def __init__(
+        self,
+        latency_ms: float = 20,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        pois_per_query: int = 20,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            latency_ms: Độ trễ trước khi trả lời
+            jitter_ms: Độ trễ ngẫu nhiên cộng thêm (0..jitter_ms)
+            error_rate: Tỉ lệ request trả về lỗi error_status
+            error_status: Mã lỗi (503, 429, 504, ...)
+            pois_per_query: Số POI Overpass giả lập trả về cho mỗi query
+            seed: Seed cho phần ngẫu nhiên (lặp lại được)
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.pois_per_query = pois_per_query
+        self.random = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+
+    @classmethod
+    def named(cls, name: str, seed: Optional[int] = None) -> "StubProfile":
+        """Tạo profile từ tên trong PROFILES (fast, realistic, flaky, throttled)"""
+        return cls(**PROFILES[name], seed=seed)
+
+    async def delay(self) -> Optional[Response]:
+        """Chờ theo profile; trả về response lỗi nếu request này bị chọn lỗi"""
+        self.requests += 1
+        await asyncio.sleep((self.latency_ms + self.random.uniform(0, self.jitter_ms)) / 1000)
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return PlainTextResponse("stub error", status_code=self.error_status)
+        return None
+
+
+class Fixtures:
+    def __init__(self, nominatim: Dict[str, List[Dict]], overpass: List[Dict], open_meteo: Dict):
+        """
+        Args:
+            nominatim: Tên địa điểm (chữ thường) -> response JSON của /search
+            overpass: Danh sách element của các response Overpass đã ghi
+            open_meteo: Response của /v1/forecast cho một tọa độ (dùng làm mẫu)
+        """
+        self.nominatim = nominatim
+        self.overpass = overpass
+        self.open_meteo = open_meteo
+
+    @classmethod
+    def load(cls, directory: str = FIXTURES_DIR) -> "Fixtures":
+        def read(name: str):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                return json.load(f)
+
+        return cls(
+            nominatim=read("nominatim.json"),
+            overpass=read("overpass.json")["elements"],
+            open_meteo=read("open_meteo.json"),
+        )
+
+    def geocode(self, query: str) -> List[Dict]:
+        """Response Nominatim cho query (app gửi "<tên>, Vietnam"); không có thì rỗng"""
+        name = query.lower().strip()
+        if name.endswith(", vietnam"):
+            name = name[:-len(", vietnam")]
+        return self.nominatim.get(name, [])
+
+    def elements_in(self, south: float, west: float, north: float, east: float) -> List[Dict]:
+        return [
+            element for element in self.overpass
+            if south <= element["lat"] <= north and west <= element["lon"] <= east
+        ]
+
+    def forecast(self, lat: float, lng: float) -> Dict:
+        """Response mẫu với nhiệt độ/weather code suy ra từ tọa độ (ổn định giữa các lần chạy)"""
+        location = copy.deepcopy(self.open_meteo)
+        location["latitude"], location["longitude"] = lat, lng
+        h = int(abs(lat) * 1000 + abs(lng) * 1000)
+        current = location["current"]
+        # Mốc quan sát là chu kỳ hiện tại (như upstream thật) để TTL của cache thời tiết đúng thực tế
+        interval = current.get("interval", 900)
+        observed = time.time() // interval * interval
+        current["time"] = datetime.fromtimestamp(observed, timezone.utc).strftime("%Y-%m-%dT%H:%M")
+        current["temperature_2m"] = round(current["temperature_2m"] + h % 9 - 4, 1)
+        current["weather_code"] = _WEATHER_CODES[h % len(_WEATHER_CODES)]
+        return location
+
+
+def _synthetic_elements(south: float, west: float, north: float, east: float, count: int) -> List[Dict]:
+    return [
+        {
+            "type": "node",
+            "id": int(abs(south * 1e4)) * 1000 + i,
+            "lat": south + (north - south) * (i + 0.5) / count,
+            "lon": west + (east - west) * (i + 0.5) / count,
+            "tags": {"name": f"Stub POI {i}", "tourism": "attraction"},
+        }
+        for i in range(count)
+    ]
+
+
+def create_stub_app(profile: StubProfile, fixtures: Optional[Fixtures] = None) -> Starlette:
+    """App giả lập cả 3 upstream, phân biệt theo path"""
+
+    async def nominatim(request: Request):
+        error = await profile.delay()
+        if error is not None:
+            return error
+        query = request.query_params.get("q", "")
+        if fixtures is not None:
+            return JSONResponse(fixtures.geocode(query))
+        # Tọa độ suy ra từ query để mỗi địa danh có một kết quả ổn định
+        h = abs(hash(query)) % 10_000
+        return JSONResponse([{"lat": str(10 + h / 1000), "lon": str(105 + h / 5000)}])
+
+    async def overpass(request: Request):
+        error = await profile.delay()
+        if error is not None:
+            return error
+        try:
+            form = parse_qs((await request.body()).decode())
+        except ClientDisconnect:
+            # App đã hủy request (VD: hedge sang mirror khác trả lời trước)
+            return Response(status_code=499)
+        match = _BBOX_RE.search(form.get("data", [""])[0])
+        if match is None:
+            return PlainTextResponse("bad query", status_code=400)
+        south, west, north, east = (float(value) for value in match.groups())
+        elements = fixtures.elements_in(south, west, north, east) if fixtures is not None else []
+        if not elements:
+            # Vùng chưa ghi lại: sinh POI giả để tải xử lý tương đương vùng có dữ liệu
+            elements = _synthetic_elements(south, west, north, east, profile.pois_per_query)
+        return JSONResponse({"elements": elements})
+
+    async def overpass_status(request: Request):
+        return PlainTextResponse(
+            "Connected as: 0\nCurrent time: 2026-01-01T00:00:00Z\nRate limit: 2\n2 slots available now.\n"
+        )
+
+    async def open_meteo(request: Request):
+        error = await profile.delay()
+        if error is not None:
+            return error
+        latitudes = request.query_params.get("latitude", "").split(",")
+        longitudes = request.query_params.get("longitude", "").split(",")
+        if fixtures is not None:
+            locations = [fixtures.forecast(float(lat), float(lng)) for lat, lng in zip(latitudes, longitudes)]
+        else:
+            locations = [
+                {"current": {"time": "2026-01-01T00:00", "interval": 900, "temperature_2m": 28.4, "weather_code": 2}}
+                for _ in latitudes
+            ]
+        return JSONResponse(locations[0] if len(locations) == 1 else locations)
+
+    return Starlette(routes=[
+        Route("/search", nominatim),
+        Route("/api/interpreter", overpass, methods=["POST"]),
+        Route("/api/status", overpass_status),
+        Route("/v1/forecast", open_meteo),
+    ])
+
+
+class StubServer:
+    def __init__(self, profile: Optional[StubProfile] = None, port: int = 0, fixtures: Optional[Fixtures] = None):
+        """
+        Args:
+            profile: Profile độ trễ/lỗi (đổi thuộc tính trong lúc chạy được)
+            port: Port lắng nghe, 0 = port trống bất kỳ
+            fixtures: Response đã ghi để phát lại, None = sinh dữ liệu giả
+        """
+        self.profile = profile or StubProfile()
+        self.server = uvicorn.Server(uvicorn.Config(
+            create_stub_app(self.profile, fixtures), host="127.0.0.1", port=port, log_level="warning"
+        ))
+        self.port = port
+        self._task: Optional[asyncio.Task] = None
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    async def __aenter__(self) -> "StubServer":
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.should_exit = True
+        await self._task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chạy upstream giả lập (Nominatim/Overpass/Open-Meteo)")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="Profile đặt sẵn (bỏ qua các tham số dưới)")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fixtures", action="store_true", help=f"Phát lại response trong {FIXTURES_DIR}")
+    parser.add_argument("--seed", type=int, help="Seed cho độ trễ/lỗi ngẫu nhiên (lặp lại được)")
+    parser.add_argument("--weather-interval", type=int,
+                        help="Chu kỳ cập nhật số liệu thời tiết (giây, bội số của 60; mặc định theo fixture)")
+    args = parser.parse_args()
+
+    if args.profile:
+        profile = StubProfile.named(args.profile, seed=args.seed)
+    else:
+        profile = StubProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, seed=args.seed)
+    fixtures = Fixtures.load() if args.fixtures else None
+    if fixtures is not None and args.weather_interval:
+        # Cache thời tiết của app hết hạn theo chu kỳ này (benchmark prefetch)
+        fixtures.open_meteo["current"]["interval"] = args.weather_interval
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"NOMINATIM_URL={base}/search")
+    print(f"OVERPASS_URLS={base}/api/interpreter")
+    print(f"OPEN_METEO_URL={base}/v1/forecast")
+    uvicorn.run(create_stub_app(profile, fixtures), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
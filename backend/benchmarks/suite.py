@@ -0,0 +1,394 @@
+"""
+Bộ benchmark lặp lại được cho toàn bộ API, so sánh được giữa các commit
+
+- Upstream là các stub local (benchmarks.stub_upstream) phát lại response đã ghi
+  trong benchmarks/fixtures, với profile độ trễ/lỗi chọn được: Nominatim, hai mirror
+  Overpass và Open-Meteo, mỗi upstream một tiến trình riêng
+- App chạy bằng uvicorn trong tiến trình riêng, cache đặt trong thư mục tạm
+  (luôn bắt đầu lạnh), không dùng kho POI offline để đi qua đường Overpass
+- Mỗi kịch bản (coordinates, pois, weather, translate, explore = luồng tìm kiếm
+  của frontend) chạy ở nhiều mức đồng thời; chuỗi request sinh trước từ seed nên
+  hai lần chạy gửi đúng cùng các request theo cùng thứ tự
+- Báo cáo throughput, p50/p90/p99, CPU và RSS của tiến trình app; ghi ra JSON
+  để so sánh bằng benchmarks.compare
+
+Chạy từ thư mục backend:
+    python -m benchmarks.suite --concurrency 1 10 50 --requests 300
+    python -m benchmarks.suite --profile flaky --scenarios pois explore
+    python -m benchmarks.compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from benchmarks.stats import cpu_seconds, percentile, rss_mb
+from benchmarks.stub_upstream import FIXTURES_DIR, PROFILES
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Câu tiếng Anh cho /api/translate (giống mô tả POI/thời tiết thật)
+SENTENCES = [
+    "The temple was built in the eleventh century.",
+    "This museum displays artifacts from the Nguyen dynasty.",
+    "The beach is famous for its white sand and clear water.",
+    "Visitors can take a boat trip through the limestone caves.",
+    "The old quarter has many narrow streets and traditional houses.",
+    "It is partly cloudy with a light breeze this afternoon.",
+    "The bridge breathes fire every weekend evening.",
+    "The market opens early in the morning and sells local food.",
+]
+
+# (method, path, params, json) của một request
+Call = Tuple[str, str, Optional[Dict], Optional[Dict]]
+
+
+def load_places(count: int) -> List[str]:
+    """Tên địa điểm: các tên có trong fixture Nominatim + `count` tên đầu của gazetteer"""
+    with open(os.path.join(FIXTURES_DIR, "nominatim.json"), encoding="utf-8") as f:
+        places = list(json.load(f))
+    with open(os.path.join(BACKEND_DIR, "data", "vn_gazetteer.csv"), encoding="utf-8") as f:
+        gazetteer = [row["name"] for row in csv.DictReader(f)]
+    return places + gazetteer[:count]
+
+
+def load_locations(count: int, rng: random.Random) -> List[Tuple[float, float]]:
+    """Tọa độ quanh các địa điểm trong fixture (lệch ngẫu nhiên tới ~5km)"""
+    with open(os.path.join(FIXTURES_DIR, "nominatim.json"), encoding="utf-8") as f:
+        centers = [(float(r[0]["lat"]), float(r[0]["lon"])) for r in json.load(f).values() if r]
+    locations = []
+    for _ in range(count):
+        lat, lng = rng.choice(centers)
+        locations.append((round(lat + rng.uniform(-0.05, 0.05), 5), round(lng + rng.uniform(-0.05, 0.05), 5)))
+    return locations
+
+
+def scenarios(places: List[str], locations: List[Tuple[float, float]]) -> Dict[str, Callable[[random.Random], Call]]:
+    """Tên kịch bản -> hàm sinh một request ngẫu nhiên (theo rng)"""
+
+    def coordinates(rng: random.Random) -> Call:
+        return "POST", "/api/coordinates", None, {"location_name": rng.choice(places)}
+
+    def pois(rng: random.Random) -> Call:
+        lat, lng = rng.choice(locations)
+        return "POST", "/api/pois", None, {"lat": lat, "lng": lng, "limit": 10}
+
+    def weather(rng: random.Random) -> Call:
+        lat, lng = rng.choice(locations)
+        return "POST", "/api/weather", None, {"lat": lat, "lng": lng}
+
+    def translate(rng: random.Random) -> Call:
+        return "POST", "/api/translate", None, {"text": rng.choice(SENTENCES), "source_lang": "en", "target_lang": "vi"}
+
+    def explore(rng: random.Random) -> Call:
+        # Luồng tìm kiếm của frontend (exploreLocation trong App.tsx)
+        return "GET", "/api/explore", {"q": rng.choice(places), "limit": 10}, None
+
+    return {
+        "coordinates": coordinates,
+        "pois": pois,
+        "weather": weather,
+        "translate": translate,
+        "explore": explore,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> Dict[str, Optional[str]]:
+    """Commit hiện tại và có thay đổi chưa commit hay không"""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+        return {"commit": sha, "dirty": bool(dirty)}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Tiến trình port {port} đã thoát (code {process.returncode})")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Port {port} không mở sau {timeout}s")
+
+
+@contextmanager
+def stub_upstreams(args, extra_args: Sequence[str] = ()) -> Iterator[Dict[str, str]]:
+    """
+    Chạy 4 stub (Nominatim, 2 mirror Overpass, Open-Meteo), trả về biến môi trường trỏ vào chúng
+    extra_args: tham số dòng lệnh thêm cho stub (VD: --weather-interval)
+    """
+    processes = {}
+    try:
+        for i, name in enumerate(("nominatim", "overpass", "overpass_mirror", "open_meteo")):
+            port = free_port()
+            command = [
+                sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(port),
+                "--profile", args.profile, "--fixtures", "--seed", str(args.seed + i), *extra_args,
+            ]
+            processes[name] = (port, subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL))
+        for port, process in processes.values():
+            wait_for_port(port, process, timeout=30)
+
+        base = {name: f"http://127.0.0.1:{port}" for name, (port, _) in processes.items()}
+        yield {
+            "NOMINATIM_URL": f"{base['nominatim']}/search",
+            "OVERPASS_URLS": f"{base['overpass']}/api/interpreter,{base['overpass_mirror']}/api/interpreter",
+            "OPEN_METEO_URL": f"{base['open_meteo']}/v1/forecast",
+        }
+    finally:
+        for _, process in processes.values():
+            process.terminate()
+        for _, process in processes.values():
+            process.wait()
+
+
+@contextmanager
+def app_server(
+    args, upstream_env: Dict[str, str], cache_dir: str, extra_env: Optional[Dict[str, str]] = None
+) -> Iterator[Tuple[subprocess.Popen, str]]:
+    """Chạy app bằng uvicorn (1 process) trỏ vào các stub, cache trong thư mục tạm (extra_env ghi đè biến môi trường)"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update(upstream_env)
+    env.update({
+        "GEOCODE_CACHE_PATH": os.path.join(cache_dir, "geocode.sqlite3"),
+        "POI_TILE_CACHE_PATH": os.path.join(cache_dir, "poi_tiles.sqlite3"),
+        "TRANSLATION_CACHE_PATH": os.path.join(cache_dir, "translations.sqlite3"),
+        "RATE_LIMIT_STATE_DIR": os.path.join(cache_dir, "ratelimit"),
+        "WEATHER_CACHE_PATH": os.path.join(cache_dir, "weather.sqlite3"),
+        "PREFETCH_LOCK_PATH": os.path.join(cache_dir, "prefetch.lock"),
+        # Đi qua đường Overpass + cache ô bản đồ thay vì kho POI offline
+        "POI_STORE_PATH": "",
+        # Stub không có usage policy: giới hạn Nominatim thật (1/s) sẽ che mất phần còn lại
+        "NOMINATIM_RATE": str(args.nominatim_rate),
+        # Chỉ nạp model dịch khi có kịch bản translate
+        "TRANSLATION_PRELOAD": "en-vi" if "translate" in args.scenarios else "",
+        "LOG_LEVEL": "WARNING",
+    })
+    env.update(extra_env or {})
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log",
+    ]
+    # Log của app vào file để không lẫn vào bảng kết quả (in phần cuối nếu app lỗi)
+    log = open(os.path.join(cache_dir, "app.log"), "wb")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        yield process, f"http://127.0.0.1:{port}"
+    except BaseException:
+        log.flush()
+        with open(log.name, encoding="utf-8", errors="replace") as f:
+            print("".join(f.readlines()[-20:]), file=sys.stderr)
+        raise
+    finally:
+        log.close()
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float) -> Dict:
+    """Chờ /health hết 503 (model dịch đã nạp hoặc đã lỗi), trả về nội dung /health"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App đã thoát khi khởi động (code {process.returncode})")
+        try:
+            response = await client.get("/health")
+            if response.status_code != 503:
+                return response.json()
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"App chưa sẵn sàng sau {timeout}s")
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    pid: int,
+    name: str,
+    calls: List[Call],
+    concurrency: int,
+) -> Dict:
+    """Chạy `calls` với `concurrency` client song song (mỗi client gửi request kế tiếp khi xong request trước)"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_call = iter(calls)
+    peak_rss = rss_mb(pid)
+
+    async def worker():
+        for method, path, params, body in next_call:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.1)
+            peak_rss = max(peak_rss, rss_mb(pid))
+
+    sampler = asyncio.create_task(sample_rss())
+    cpu_start = cpu_seconds(pid)
+    client_cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu_used = cpu_seconds(pid) - cpu_start
+    client_cpu = time.process_time() - client_cpu_start
+    sampler.cancel()
+    peak_rss = max(peak_rss, rss_mb(pid))
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "cpu_s": round(cpu_used, 3),
+        "cpu_percent": round(cpu_used / elapsed * 100, 1),
+        "cpu_ms_per_request": round(cpu_used / len(latencies) * 1000, 3),
+        "rss_mb": round(peak_rss, 1),
+        # Gần 100% nghĩa là bộ tạo tải đã bão hòa: throughput bị giới hạn bởi client, không phải app
+        "client_cpu_percent": round(client_cpu / elapsed * 100, 1),
+    }
+
+
+def print_result(result: Dict):
+    print(
+        f"{result['scenario']:<12} {result['concurrency']:>4} {result['requests']:>6} {result['errors']:>5} "
+        f"{result['throughput_rps']:>9.1f} {result['p50_ms']:>8.1f} {result['p90_ms']:>8.1f} "
+        f"{result['p99_ms']:>8.1f} {result['cpu_percent']:>6.1f} {result['rss_mb']:>7.1f} "
+        f"{result['client_cpu_percent']:>10.1f}"
+    )
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    places = load_places(args.places)
+    locations = load_locations(args.locations, rng)
+    builders = scenarios(places, locations)
+
+    report = {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": {"name": args.profile, **PROFILES[args.profile]},
+            "args": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": [],
+        "skipped": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-cache-") as cache_dir, \
+            stub_upstreams(args) as upstream_env, \
+            app_server(args, upstream_env, cache_dir) as (process, base_url):
+        limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            health = await wait_ready(client, process, args.startup_timeout)
+            report["meta"]["startup_s"] = round(time.perf_counter() - started, 2)
+            report["meta"]["startup_rss_mb"] = round(rss_mb(process.pid), 1)
+            print(f"App sẵn sàng sau {report['meta']['startup_s']}s, RSS {report['meta']['startup_rss_mb']} MB "
+                  f"(profile upstream: {args.profile})")
+
+            print(f"{'scenario':<12} {'c':>4} {'req':>6} {'err':>5} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} "
+                  f"{'p99 ms':>8} {'cpu%':>6} {'rss MB':>7} {'client cpu%':>10}")
+            for name in args.scenarios:
+                translation = health["translation_models"]
+                if name == "translate" and not translation["ready"]:
+                    reason = (translation["warmup_error"] or "model dịch chưa sẵn sàng").splitlines()[0]
+                    report["skipped"][name] = reason
+                    print(f"{name:<12} bỏ qua: {reason}")
+                    continue
+                for concurrency in args.concurrency:
+                    calls = [builders[name](rng) for _ in range(args.requests)]
+                    result = await run_level(client, process.pid, name, calls, concurrency)
+                    report["results"].append(result)
+                    print_result(result)
+
+            # Trạng thái cache/upstream cuối cùng (số lời gọi upstream, hit rate, ...)
+            health = (await client.get("/health")).json()
+            report["health"] = {key: health.get(key) for key in ("cache", "single_flight", "upstreams")}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark toàn bộ API với upstream giả lập, ghi kết quả JSON")
+    parser.add_argument("--scenarios", nargs="+", default=["coordinates", "pois", "weather", "translate", "explore"],
+                        choices=["coordinates", "pois", "weather", "translate", "explore"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Các mức đồng thời")
+    parser.add_argument("--requests", type=int, default=200, help="Số request mỗi mức đồng thời")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic", help="Độ trễ/lỗi của upstream")
+    parser.add_argument("--seed", type=int, default=42, help="Seed cho chuỗi request và độ trễ của stub")
+    parser.add_argument("--places", type=int, default=30, help="Số tên lấy từ gazetteer (thêm vào tên trong fixture)")
+    parser.add_argument("--locations", type=int, default=60, help="Số tọa độ khác nhau cho pois/weather")
+    parser.add_argument("--nominatim-rate", type=float, default=50, help="NOMINATIM_RATE của app khi chạy với stub")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout mỗi request (giây)")
+    parser.add_argument("--startup-timeout", type=float, default=600, help="Thời gian chờ app sẵn sàng (giây)")
+    parser.add_argument("--output", help="File JSON kết quả (mặc định benchmarks/results/<thời gian>-<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark các backend inference dịch thuật (CPU, model thật)
+
+Với mỗi backend (pytorch, quantized, onnx) và mỗi chiều dịch (en->vi, vi->en):
+- Thời gian nạp model và RSS của tiến trình sau khi nạp
+- Độ trễ từng câu (batch=1) p50/p99 và throughput khi dịch theo batch
+- BLEU của bản dịch so với bản dịch của backend pytorch fp32 (độ lệch chất lượng,
+  100 = giống hệt)
+
+Mỗi backend chạy trong một tiến trình con riêng để số đo RSS không lẫn nhau.
+Backend onnx cần cài thêm optimum[onnxruntime].
+
+Chạy từ thư mục backend:
+    python -m benchmarks.translation_backends --backends pytorch quantized onnx
+"""
+
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.stats import percentile
+
+
+SAMPLES = {
+    ("en", "vi"): [
+        "The old quarter is full of narrow streets and street food stalls.",
+        "This museum preserves the cultural and historical heritage of the region.",
+        "The beach has white sand and clear water, ideal for relaxing.",
+        "Visitors can explore the natural cave with its stunning stalactites.",
+        "The pagoda is a peaceful place of worship with unique architecture.",
+        "From the viewpoint you can see a panoramic view of the bay.",
+        "The waterfall is surrounded by lush green forest.",
+        "The memorial honors the national heroes of Vietnam.",
+        "It is sunny with a light breeze, perfect for sightseeing.",
+        "The market opens early in the morning and closes at noon.",
+    ],
+    ("vi", "en"): [
+        "Phố cổ có nhiều con phố nhỏ và quán ăn đường phố.",
+        "Bảo tàng lưu giữ di sản văn hóa và lịch sử của vùng.",
+        "Bãi biển có cát trắng và nước trong xanh, lý tưởng để nghỉ ngơi.",
+        "Du khách có thể khám phá hang động tự nhiên với thạch nhũ tuyệt đẹp.",
+        "Ngôi chùa là nơi thờ cúng yên bình với kiến trúc độc đáo.",
+        "Từ điểm ngắm cảnh có thể nhìn toàn cảnh vịnh.",
+        "Thác nước được bao quanh bởi rừng xanh tươi tốt.",
+        "Đài tưởng niệm tôn vinh các anh hùng dân tộc Việt Nam.",
+        "Trời nắng nhẹ có gió, rất thích hợp để tham quan.",
+        "Chợ mở cửa từ sáng sớm và đóng cửa lúc trưa.",
+    ],
+}
+
+MODELS = {
+    ("en", "vi"): "Helsinki-NLP/opus-mt-en-vi",
+    ("vi", "en"): "Helsinki-NLP/opus-mt-vi-en",
+}
+
+
+def rss_mb() -> float:
+    """RSS hiện tại của tiến trình (Linux)"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return round(pages * 4096 / 1024 / 1024, 1)
+
+
+def bleu(hypotheses: List[str], references: List[str], max_n: int = 4) -> float:
+    """Corpus BLEU (một bản tham chiếu, tách từ theo khoảng trắng)"""
+    matches = [0] * max_n
+    totals = [0] * max_n
+    hyp_len = ref_len = 0
+    for hypothesis, reference in zip(hypotheses, references):
+        hyp, ref = hypothesis.lower().split(), reference.lower().split()
+        hyp_len += len(hyp)
+        ref_len += len(ref)
+        for n in range(1, max_n + 1):
+            hyp_ngrams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+            ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+            matches[n - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            totals[n - 1] += max(len(hyp) - n + 1, 0)
+
+    if hyp_len == 0 or min(matches) == 0:
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_n
+    brevity = 1.0 if hyp_len > ref_len else math.exp(1 - ref_len / hyp_len)
+    return round(100 * brevity * math.exp(log_precision), 2)
+
+
+def run_backend(kind: str, batch_size: int, rounds: int) -> Dict:
+    """Đo một backend trong tiến trình hiện tại"""
+    from services.translation_backends import create_backend
+
+    result = {"backend": kind, "rss_before_mb": rss_mb(), "pairs": {}}
+    for pair, sentences in SAMPLES.items():
+        start = time.perf_counter()
+        backend = create_backend(kind, MODELS[pair])
+        load_seconds = time.perf_counter() - start
+        backend.translate(["warm up"])
+
+        latencies = []
+        outputs = []
+        for _ in range(rounds):
+            outputs = []
+            for sentence in sentences:
+                start = time.perf_counter()
+                outputs.extend(backend.translate([sentence]))
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        batch = (sentences * math.ceil(batch_size / len(sentences)))[:batch_size]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            backend.translate(batch)
+        batch_seconds = time.perf_counter() - start
+
+        result["pairs"]["-".join(pair)] = {
+            "load_seconds": round(load_seconds, 2),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "batch_sentences_per_sec": round(rounds * len(batch) / batch_seconds, 2),
+            "outputs": outputs,
+        }
+    result["rss_after_mb"] = rss_mb()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh các backend inference dịch thuật")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "quantized", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3, help="Số lượt lặp mỗi phép đo")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_backend(args.single, args.batch_size, args.rounds), ensure_ascii=False))
+        return
+
+    results = {}
+    for kind in args.backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.translation_backends", "--single", kind,
+             "--batch-size", str(args.batch_size), "--rounds", str(args.rounds)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{kind}: lỗi\n{proc.stderr.strip()[-2000:]}")
+            continue
+        results[kind] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    baseline = results.get("pytorch")
+    for kind, result in results.items():
+        print(f"\n== {kind} (RSS {result['rss_after_mb']} MB) ==")
+        for pair, measured in result["pairs"].items():
+            drift = (
+                bleu(measured["outputs"], baseline["pairs"][pair]["outputs"])
+                if baseline else "n/a"
+            )
+            print(
+                f"{pair}: load={measured['load_seconds']}s p50={measured['p50_ms']}ms "
+                f"p99={measured['p99_ms']}ms batch={measured['batch_sentences_per_sec']} câu/s "
+                f"BLEU vs pytorch={drift}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark dynamic micro-batching cho dịch thuật (CPU, model thật)
+
+So sánh không batch (max_batch_size=1) với các kích thước batch khác nhau
+ở nhiều mức đồng thời; báo cáo throughput (câu/giây) và độ trễ p50/p99.
+
+Chạy từ thư mục backend (lần đầu sẽ tải model từ HuggingFace Hub):
+    python -m benchmarks.translation_batching --concurrency 1 4 16 32 --batch-sizes 1 8 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stats import percentile
+from services.huggingface_service import HuggingFaceService
+from services.translation_batcher import TranslationBatcher
+
+
+SAMPLE_SENTENCES = [
+    "The old quarter is full of narrow streets and street food stalls.",
+    "This museum preserves the cultural and historical heritage of the region.",
+    "The beach has white sand and clear water, ideal for relaxing.",
+    "Visitors can explore the natural cave with its stunning stalactites.",
+    "The pagoda is a peaceful place of worship with unique architecture.",
+    "From the viewpoint you can see a panoramic view of the bay.",
+    "The waterfall is surrounded by lush green forest.",
+    "The memorial honors the national heroes of Vietnam.",
+]
+
+
+async def run_level(service: HuggingFaceService, concurrency: int, requests: int) -> dict:
+    """Bắn `requests` câu với tối đa `concurrency` request đồng thời"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await service.batcher.submit("en", "vi", SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sentences_per_sec": round(requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "avg_batch_size": service.batcher.stats()["avg_batch_size"],
+    }
+
+
+async def run(concurrency_levels, batch_sizes, requests, max_wait_ms):
+    service = HuggingFaceService()
+    # Nạp model và chạy thử một lần để không tính thời gian tải vào kết quả
+    service._translate_batch("en", "vi", ["warm up"])
+
+    for batch_size in batch_sizes:
+        for concurrency in concurrency_levels:
+            service.batcher = TranslationBatcher(
+                service._translate_batch, max_batch_size=batch_size, max_wait_ms=max_wait_ms
+            )
+            result = await run_level(service, concurrency, requests)
+            print(f"batch={batch_size:>3} concurrency={concurrency:>3} -> {result}")
+            await service.batcher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batching dịch thuật trên CPU")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Số câu mỗi lượt đo")
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.concurrency, args.batch_sizes, args.requests, args.max_wait_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark cách ly dịch thuật với các endpoint địa điểm (CPU, model thật)
+
+Bắn liên tục các request /api/translate (đủ để đầy hàng đợi) trong khi đo độ trễ
+của /api/pois (upstream giả lập). So sánh inference trong process API
+(--workers 0) với pool tiến trình (--workers N); báo cáo p50/p99 của /api/pois,
+số request dịch thành công / bị từ chối 503 và mức sử dụng worker.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.translation_isolation --workers 0
+    python -m benchmarks.translation_isolation --workers 2 --threads-per-worker 2
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+
+
+TEXT = (
+    "The old quarter is full of narrow streets and street food stalls. "
+    "This museum preserves the cultural and historical heritage of the region."
+)
+
+
+async def run(args) -> dict:
+    # Cấu hình phải có trước khi import main (service được tạo lúc import)
+    os.environ["TRANSLATION_WORKERS"] = str(args.workers)
+    os.environ["TRANSLATION_THREADS_PER_WORKER"] = str(args.threads_per_worker)
+    os.environ["TRANSLATION_MAX_QUEUE"] = str(args.max_queue)
+    os.environ["TRANSLATION_PRELOAD"] = "en-vi"
+    main = importlib.import_module("main")
+    from benchmarks.load_pois import make_stub_transport
+    from services.cache import TwoTierCache
+    from services.http_client import HttpClient
+    from services.location_service import LocationService
+
+    main.location_service = LocationService(
+        http_client=HttpClient(per_host_limit=50, transport=make_stub_transport(0.02)),
+        geocode_cache=TwoTierCache("geocode"),
+        poi_tile_cache=TwoTierCache("poi_tiles"),
+    )
+    # Không dùng cache bản dịch: mọi request đều phải chạy model
+    main.huggingface_service.translation_cache = TwoTierCache("translations", max_entries=0)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        while not main.huggingface_service.ready:
+            if main.huggingface_service.warmup_error:
+                raise RuntimeError(main.huggingface_service.warmup_error)
+            await asyncio.sleep(0.2)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            statuses = []
+            stop = asyncio.Event()
+
+            async def translate_loop(i: int):
+                n = 0
+                while not stop.is_set():
+                    n += 1
+                    response = await client.post("/api/translate", json={
+                        "text": f"{TEXT} ({i}-{n})", "source_lang": "en", "target_lang": "vi"
+                    })
+                    statuses.append(response.status_code)
+                    if response.status_code == 503:
+                        await asyncio.sleep(float(response.headers.get("Retry-After", 1)) / 10)
+
+            load = [asyncio.create_task(translate_loop(i)) for i in range(args.translate_concurrency)]
+            await asyncio.sleep(1)
+
+            pois_latencies = []
+            for _ in range(args.pois_requests):
+                start = time.perf_counter()
+                (await client.post("/api/pois", json={"lat": 21.0285, "lng": 105.8542})).raise_for_status()
+                pois_latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.05)
+
+            stop.set()
+            await asyncio.gather(*load)
+            health = (await client.get("/health")).json()
+
+    return {
+        "workers": args.workers,
+        "pois_p50_ms": round(statistics.median(pois_latencies), 1),
+        "pois_p99_ms": round(percentile(pois_latencies, 99), 1),
+        "translate_ok": statuses.count(200),
+        "translate_rejected_503": statuses.count(503),
+        "translation_batcher": health["translation_batcher"],
+        "translation_pool": health["translation_models"]["pool"],
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Độ trễ /api/pois khi đang tải dịch thuật")
+    parser.add_argument("--workers", type=int, default=0, help="0 = inference trong process API")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--translate-concurrency", type=int, default=32)
+    parser.add_argument("--pois-requests", type=int, default=100)
+    args = parser.parse_args()
+
+    for key, value in asyncio.run(run(args)).items():
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main_cli()
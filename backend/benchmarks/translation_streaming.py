@@ -0,0 +1,81 @@
+"""
+Benchmark dịch theo stream: thời gian tới câu đầu tiên (time-to-first-token)
+so với tổng thời gian, và so với /api/translate trả về một lần
+
+Mỗi lượt dùng đoạn văn có hậu tố khác nhau để không trúng cache bản dịch.
+Cần server đang chạy (ASGITransport của httpx không stream được response):
+    python main.py
+    python -m benchmarks.translation_streaming --base-url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+
+
+PARAGRAPH = [
+    "The old quarter is full of narrow streets and street food stalls.",
+    "This museum preserves the cultural and historical heritage of the region.",
+    "The beach has white sand and clear water, ideal for relaxing.",
+    "Visitors can explore the natural cave with its stunning stalactites.",
+    "The pagoda is a peaceful place of worship with unique architecture.",
+    "From the viewpoint you can see a panoramic view of the bay.",
+]
+
+
+def paragraph(run: int) -> str:
+    return " ".join(f"{sentence[:-1]} ({run})." for sentence in PARAGRAPH)
+
+
+async def measure_stream(client: httpx.AsyncClient, text: str):
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/api/translate/stream", json={"text": text}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first is None and line.strip():
+                first = time.perf_counter() - start
+    return first * 1000, (time.perf_counter() - start) * 1000
+
+
+async def measure_blocking(client: httpx.AsyncClient, text: str) -> float:
+    start = time.perf_counter()
+    (await client.post("/api/translate", json={"text": text})).raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+def summary(samples) -> str:
+    return f"p50={statistics.median(samples):.0f}ms p99={percentile(samples, 99):.0f}ms"
+
+
+async def run(base_url: str, runs: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        ttft, stream_total, blocking = [], [], []
+        for i in range(runs):
+            first, total = await measure_stream(client, paragraph(2 * i))
+            ttft.append(first)
+            stream_total.append(total)
+            blocking.append(await measure_blocking(client, paragraph(2 * i + 1)))
+
+    print(f"Đoạn văn {len(PARAGRAPH)} câu, {runs} lượt")
+    print(f"  stream - câu đầu tiên: {summary(ttft)}")
+    print(f"  stream - toàn bộ:      {summary(stream_total)}")
+    print(f"  /api/translate:        {summary(blocking)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo time-to-first-token của /api/translate/stream")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.base_url, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cấu hình gunicorn cho production:
+    gunicorn -c gunicorn.conf.py main:app
+
+preload_app: app (và model dịch) được nạp một lần trong master trước khi fork,
+các worker dùng chung trang nhớ chứa trọng số model (copy-on-write) thay vì
+mỗi worker giữ một bản riêng. Warmup vẫn chạy trong lifespan của từng worker.
+"""
+
+import gc
+import os
+import sys
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+# Worker đọc lại số process để chia giới hạn upstream theo IP (Nominatim 1 request/giây
+# dùng chung qua file trong RATE_LIMIT_STATE_DIR, slot Overpass chia đều cho các worker)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+# Nạp model lần đầu có thể lâu hơn timeout mặc định 30s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+
+def when_ready(server):
+    """Chạy trong master sau khi nạp app, trước khi fork các worker"""
+    if not preload_app:
+        return
+    from main import huggingface_service
+
+    # APP_PROFILE=geo: process không phục vụ dịch thuật, không có model để nạp
+    if huggingface_service is not None and huggingface_service.preload_pairs:
+        try:
+            # Master không chạy inference: giữ torch 1 thread để không tạo thread pool
+            # OpenMP trước khi fork (worker con có thể bị treo)
+            import torch
+            torch.set_num_threads(1)
+            huggingface_service.load_models(fork_safe_only=True)
+        except Exception as e:
+            server.log.warning(f"Preload translation models failed, workers will load lazily: {e}")
+
+    # Đưa các object đã có vào generation vĩnh viễn: GC của worker không ghi
+    # lên các trang nhớ này nên chúng vẫn được dùng chung sau fork
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Chia đều CPU cho các worker để inference không tranh thread lẫn nhau"""
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        threads = int(os.getenv("TORCH_NUM_THREADS", max(1, (os.cpu_count() or 1) // workers)))
+        torch.set_num_threads(threads)
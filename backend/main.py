@@ -4,25 +4,106 @@ Sử dụng FastAPI để cung cấp các endpoint cho frontend
 Tích hợp Gemini AI và HuggingFace models
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal
 from dotenv import load_dotenv
+import asyncio
+import json
+import logging
 import os
 import uvicorn
 
 # Import các service
-from services.location_service import LocationService
-from services.huggingface_service import HuggingFaceService
+from services import http_cache, metrics
+from services.logging_config import configure_logging
+from services.translation_batcher import TranslationQueueFull
 
 # Load biến môi trường từ file .env
 load_dotenv()
+configure_logging()
+logger = logging.getLogger("main")
+
+# Nhóm route process này phục vụ: all (mặc định), geo (địa điểm/POI/thời tiết)
+# hoặc translation (dịch thuật) - để scale hai phần độc lập với nhau
+APP_PROFILES = ("all", "geo", "translation")
+APP_PROFILE = os.getenv("APP_PROFILE", "all").strip().lower()
+if APP_PROFILE not in APP_PROFILES:
+    raise ValueError(f"APP_PROFILE không hợp lệ: '{APP_PROFILE}' (chọn một trong {', '.join(APP_PROFILES)})")
+SERVE_GEO = APP_PROFILE in ("all", "geo")
+SERVE_TRANSLATION = APP_PROFILE in ("all", "translation")
+
+# Khởi tạo các service (chỉ import/khởi tạo service mà profile cần:
+# process geo không tạo batcher/thread dịch và không bao giờ nạp model)
+location_service = None
+huggingface_service = None
+if SERVE_GEO:
+    from services.location_service import (
+        GEOCODE_MAX_STALE, GEOCODE_NEGATIVE_TTL, GEOCODE_TTL, POI_TILE_MAX_STALE,
+        WEATHER_MAX_STALE, WEATHER_MIN_TTL, LocationService
+    )
+    from services.prefetch import Prefetcher
+    location_service = LocationService()
+if SERVE_TRANSLATION:
+    from services.huggingface_service import HuggingFaceService
+    huggingface_service = HuggingFaceService()
+
+# Làm mới trước cache (tọa độ, ô POI, thời tiết) của các điểm đến được tìm nhiều
+# bằng một task nền; tắt bằng PREFETCH_ENABLED=0
+prefetcher = None
+if location_service is not None and os.getenv("PREFETCH_ENABLED", "1") == "1":
+    prefetcher = Prefetcher(location_service)
+
+# Số chữ số thập phân của tọa độ trong các route GET (~11m): các tọa độ gần như trùng
+# nhau dùng chung một URL/ETag để trình duyệt và CDN cache được
+COORD_DECIMALS = 4
+
+# Timeout cho từng bước của /api/explore (giây)
+EXPLORE_GEOCODE_TIMEOUT = float(os.getenv("EXPLORE_GEOCODE_TIMEOUT", 10))
+EXPLORE_POI_TIMEOUT = float(os.getenv("EXPLORE_POI_TIMEOUT", 15))
+EXPLORE_WEATHER_TIMEOUT = float(os.getenv("EXPLORE_WEATHER_TIMEOUT", 3))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Mở/đóng connection pool dùng chung, task prefetch, translation batcher/pool theo vòng đời của app"""
+    warmup = None
+    if location_service is not None:
+        await location_service.startup()
+    if prefetcher is not None:
+        prefetcher.start()
+    if huggingface_service is not None:
+        await huggingface_service.startup()
+        # Warmup chạy nền: /health báo chưa sẵn sàng (503) cho tới khi xong
+        warmup = asyncio.create_task(huggingface_service.warmup())
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        if prefetcher is not None:
+            await prefetcher.stop()
+        if location_service is not None:
+            await location_service.shutdown()
+        if huggingface_service is not None:
+            await huggingface_service.shutdown()
+
 
 # Khởi tạo FastAPI app
 app = FastAPI(
     title="Vietnam Discovery API",
     description="Backend API cho ứng dụng khám phá địa điểm Việt Nam (HuggingFace + OpenStreetMap)",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
+)
+
+# Nén gzip/brotli response lớn hơn ngưỡng (trong cùng: ETag của bản nén có hậu tố riêng)
+app.add_middleware(
+    http_cache.CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESS_MIN_SIZE", 1024))
 )
 
 # Cấu hình CORS - cho phép frontend gọi API
@@ -34,13 +115,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Khởi tạo các service
-location_service = LocationService()
-huggingface_service = HuggingFaceService()
+# Đo độ trễ/số request đang xử lý theo route (ngoài cùng để tính cả CORS), xuất ở /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Tách thời gian hàm endpoint khỏi phần validate/serialize của FastAPI
+app.router.route_class = metrics.InstrumentedRoute
+
+# Route theo nhóm, chỉ nhóm thuộc APP_PROFILE được gắn vào app (cuối file)
+geo_router = APIRouter(route_class=metrics.InstrumentedRoute, tags=["geo"])
+translation_router = APIRouter(route_class=metrics.InstrumentedRoute, tags=["translation"])
 
 
 # ==================== MODELS (Request/Response) ====================
 
+# Ngôn ngữ của mô tả POI/thời tiết (lấy từ bộ câu dịch sẵn, không chạy model)
+Language = Literal["vi", "en"]
+
 class LocationRequest(BaseModel):
     """Request để tìm tọa độ của một địa điểm"""
     location_name: str
@@ -54,11 +143,22 @@ class POIRequest(BaseModel):
     """Request để lấy điểm ưa thích xung quanh tọa độ"""
     lat: float
     lng: float
+    limit: int = Field(5, ge=1, le=50)
+    radius_km: float = Field(10.0, gt=0, le=50)
+    categories: list[Literal["tourism", "historic", "natural"]] | None = None
+    include_weather: bool = False
+    lang: Language = "vi"
 
 class WeatherRequest(BaseModel):
     """Request để lấy thời tiết tại tọa độ"""
     lat: float
     lng: float
+    lang: Language = "vi"
+
+class WeatherBatchRequest(BaseModel):
+    """Request để lấy thời tiết cho nhiều tọa độ cùng lúc"""
+    coordinates: list[CoordinatesResponse] = Field(..., max_length=100)
+    lang: Language = "vi"
 
 class WeatherInfo(BaseModel):
     """Thông tin thời tiết"""
@@ -71,8 +171,21 @@ class PointOfInterest(BaseModel):
     name: str
     description: str
     coordinates: CoordinatesResponse
+    distance_km: float | None = None
     weather: WeatherInfo | None = None
 
+class TranslationBatchRequest(BaseModel):
+    """Request để dịch nhiều văn bản cùng lúc"""
+    texts: list[str] = Field(..., max_length=100)
+    source_lang: str = "en"
+    target_lang: str = "vi"
+
+class ExploreResponse(BaseModel):
+    """Kết quả tìm kiếm gộp: tọa độ địa điểm và các POI kèm thời tiết"""
+    query: str
+    coordinates: CoordinatesResponse
+    pois: list[PointOfInterest]
+
 class TranslationRequest(BaseModel):
     """Request để dịch văn bản"""
     text: str
@@ -87,20 +200,33 @@ async def root():
     """
     Endpoint gốc - kiểm tra API hoạt động
     """
+    endpoints = {}
+    if SERVE_GEO:
+        endpoints.update({
+            "coordinates": "/api/coordinates",
+            "pois": "/api/pois",
+            "weather": "/api/weather",
+            "weather_batch": "/api/weather/batch",
+            "explore": "/api/explore"
+        })
+    if SERVE_TRANSLATION:
+        endpoints.update({
+            "translate": "/api/translate",
+            "translate_batch": "/api/translate/batch",
+            "translate_stream": "/api/translate/stream"
+        })
+    endpoints["metrics"] = "/metrics"
+    
     return {
         "message": "Vietnam Discovery API đang hoạt động! 🇻🇳",
         "version": "2.0.0",
         "tech_stack": "HuggingFace + OpenStreetMap + Open-Meteo",
-        "endpoints": {
-            "coordinates": "/api/coordinates",
-            "pois": "/api/pois",
-            "weather": "/api/weather",
-            "translate": "/api/translate"
-        }
+        "profile": APP_PROFILE,
+        "endpoints": endpoints
     }
 
 
-@app.post("/api/coordinates", response_model=CoordinatesResponse)
+@geo_router.post("/api/coordinates", response_model=CoordinatesResponse)
 async def get_coordinates(request: LocationRequest):
     """
     Lấy tọa độ (lat, lng) của một địa điểm tại Việt Nam
@@ -122,6 +248,7 @@ async def get_coordinates(request: LocationRequest):
                 status_code=404, 
                 detail=f"Không tìm thấy tọa độ cho '{request.location_name}'"
             )
+        _record_destination(coords, name=request.location_name)
         return coords
     except HTTPException:
         raise
@@ -129,46 +256,266 @@ async def get_coordinates(request: LocationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/pois", response_model=list[PointOfInterest])
+@geo_router.get("/api/coordinates", response_model=CoordinatesResponse)
+async def get_coordinates_cached(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Tên địa điểm")
+):
+    """
+    Như POST /api/coordinates nhưng cache được bởi trình duyệt/CDN
+    (ETag + Cache-Control theo TTL của cache geocoding)
+    
+    Args:
+        q: Tên địa điểm (VD: "Hà Nội")
+        
+    Returns:
+        CoordinatesResponse, hoặc 304 nếu If-None-Match khớp
+        
+    Raises:
+        HTTPException: 404 (cache được trong GEOCODE_NEGATIVE_TTL) nếu không tìm thấy tọa độ
+    """
+    coords = await location_service.get_coordinates(q)
+    if not coords:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Không tìm thấy tọa độ cho '{q}'",
+            headers={"Cache-Control": http_cache.cache_control(GEOCODE_NEGATIVE_TTL)}
+        )
+    _record_destination(coords, name=q)
+    return http_cache.cached_json(request, coords, GEOCODE_TTL, GEOCODE_MAX_STALE)
+
+
+@geo_router.post("/api/pois", response_model=list[PointOfInterest])
 async def get_points_of_interest(request: POIRequest):
     """
-    Lấy 5 điểm ưa thích (POI) xung quanh một tọa độ
+    Lấy các điểm ưa thích (POI) gần một tọa độ nhất (mặc định 5 điểm trong 10km)
     Sử dụng Overpass API (OpenStreetMap)
     
     Args:
-        request: POIRequest với lat và lng
+        request: POIRequest với lat, lng và tùy chọn limit, radius_km, categories,
+            include_weather (điền sẵn thời tiết cho từng POI), lang (ngôn ngữ mô tả)
         
     Returns:
-        Danh sách các PointOfInterest
+        Danh sách các PointOfInterest, sắp xếp từ gần đến xa
     """
     try:
-        pois = await location_service.get_points_of_interest(request.lat, request.lng)
-        return pois
+        pois = await location_service.get_points_of_interest(
+            request.lat,
+            request.lng,
+            limit=request.limit,
+            radius_km=request.radius_km,
+            categories=request.categories,
+            lang=request.lang
+        )
+        if request.include_weather:
+            pois = await location_service.attach_weather(pois, request.lang)
+        _record_destination(
+            {"lat": request.lat, "lng": request.lng}, radius_km=request.radius_km,
+            limit=request.limit, weather=request.include_weather
+        )
+        # Serialize bằng orjson thay vì validate lại qua response_model
+        return http_cache.FastJSONResponse(pois)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/weather", response_model=WeatherInfo | None)
+@geo_router.get("/api/pois", response_model=list[PointOfInterest])
+async def get_points_of_interest_cached(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    limit: int = Query(5, ge=1, le=50),
+    radius_km: float = Query(10.0, gt=0, le=50),
+    categories: list[Literal["tourism", "historic", "natural"]] | None = Query(None),
+    include_weather: bool = False,
+    lang: Language = Query("vi", description="Ngôn ngữ mô tả")
+):
+    """
+    Như POST /api/pois nhưng cache được bởi trình duyệt/CDN
+    Tọa độ làm tròn COORD_DECIMALS chữ số và categories được sắp xếp, nên các truy vấn
+    tương đương cho cùng một response/ETag; max-age là thời gian còn lại của các ô POI
+    (và của số liệu thời tiết nếu include_weather)
+    Danh sách POI mẫu (không tìm được POI) trả kèm Cache-Control: no-store
+    
+    Returns:
+        Danh sách PointOfInterest, hoặc 304 nếu If-None-Match khớp
+    """
+    lat, lng = round(lat, COORD_DECIMALS), round(lng, COORD_DECIMALS)
+    categories = sorted(set(categories)) if categories else None
+    try:
+        pois, fallback = await location_service.search_points_of_interest(
+            lat, lng, limit=limit, radius_km=radius_km, categories=categories, lang=lang
+        )
+        max_age = location_service.poi_ttl(lat, lng, radius_km)
+        stale_if_error = POI_TILE_MAX_STALE
+        if include_weather:
+            pois = await location_service.attach_weather(pois, lang)
+            max_age = min(max_age, _weather_max_age(pois))
+            stale_if_error = WEATHER_MAX_STALE
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _record_destination({"lat": lat, "lng": lng}, radius_km=radius_km, limit=limit, weather=include_weather)
+    if fallback:
+        # Danh sách mẫu (không tìm được POI/upstream lỗi): không để trình duyệt/CDN lưu lại
+        return http_cache.uncached_json(pois)
+    return http_cache.cached_json(request, pois, max_age, stale_if_error)
+
+
+def _record_destination(coords: dict, name: str | None = None, radius_km: float = 0.0,
+                        limit: int = 0, weather: bool = False):
+    """Ghi nhận lượt truy vấn của người dùng cho prefetch (bỏ qua nếu prefetch bị tắt)"""
+    if prefetcher is not None:
+        prefetcher.record(
+            coords["lat"], coords["lng"], name=name, radius_km=radius_km, limit=limit, weather=weather
+        )
+
+
+def _weather_max_age(pois: list[dict]) -> float:
+    """Thời gian còn hạn của thời tiết gắn trong các POI (ngắn nếu có POI thiếu thời tiết)"""
+    if any(poi.get("weather") is None for poi in pois):
+        return WEATHER_MIN_TTL
+    return location_service.weather_ttl([
+        (poi["coordinates"]["lat"], poi["coordinates"]["lng"]) for poi in pois
+    ])
+
+
+@geo_router.post("/api/weather", response_model=WeatherInfo | None)
 async def get_weather(request: WeatherRequest):
     """
     Lấy thông tin thời tiết hiện tại tại một tọa độ
     Sử dụng Open-Meteo API (miễn phí, không cần API key)
     
     Args:
-        request: WeatherRequest với lat và lng
+        request: WeatherRequest với lat, lng và tùy chọn lang
         
     Returns:
         WeatherInfo hoặc None nếu không lấy được
     """
     try:
-        weather = await location_service.get_weather(request.lat, request.lng)
+        weather = await location_service.get_weather(request.lat, request.lng, request.lang)
         return weather
     except Exception as e:
-        print(f"Weather error: {e}")
+        logger.warning("Weather error: %s", e)
         return None
 
 
-@app.post("/api/translate")
+@geo_router.get("/api/weather", response_model=WeatherInfo | None)
+async def get_weather_cached(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    lang: Language = Query("vi", description="Ngôn ngữ mô tả")
+):
+    """
+    Như POST /api/weather nhưng cache được bởi trình duyệt/CDN: mọi tọa độ trong cùng
+    ô lưới có cùng response/ETag, max-age kéo dài tới lần cập nhật kế tiếp của Open-Meteo
+    
+    Returns:
+        WeatherInfo (hoặc null), hoặc 304 nếu If-None-Match khớp
+    """
+    try:
+        weather = await location_service.get_weather(lat, lng, lang)
+    except Exception as e:
+        logger.warning("Weather error: %s", e)
+        weather = None
+    if weather is None:
+        # Không lấy được thời tiết: chỉ cho cache ngắn để sớm thử lại
+        return http_cache.cached_json(request, None, WEATHER_MIN_TTL)
+    return http_cache.cached_json(
+        request, weather, location_service.weather_ttl([(lat, lng)]), WEATHER_MAX_STALE
+    )
+
+
+@geo_router.post("/api/weather/batch", response_model=list[WeatherInfo | None])
+async def get_weather_batch(request: WeatherBatchRequest):
+    """
+    Lấy thời tiết hiện tại cho nhiều tọa độ bằng một lời gọi Open-Meteo
+    
+    Args:
+        request: WeatherBatchRequest với danh sách tọa độ (tối đa 100)
+        
+    Returns:
+        Danh sách WeatherInfo (hoặc None) theo đúng thứ tự đầu vào; toàn None nếu lỗi
+    """
+    try:
+        return await location_service.get_weather_batch(
+            [(coords.lat, coords.lng) for coords in request.coordinates],
+            request.lang
+        )
+    except Exception as e:
+        logger.warning("Weather batch error: %s", e)
+        return [None] * len(request.coordinates)
+
+
+@geo_router.get("/api/explore", response_model=ExploreResponse)
+async def explore(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Tên địa điểm"),
+    limit: int = Query(5, ge=1, le=50),
+    radius_km: float = Query(10.0, gt=0, le=50),
+    lang: Language = Query("vi", description="Ngôn ngữ mô tả")
+):
+    """
+    Tìm kiếm trọn gói trong 1 request: tọa độ -> POI -> thời tiết cho mọi POI
+    Mỗi bước có timeout riêng; thời tiết chậm thì POI trả về với weather = null
+    
+    Args:
+        q: Tên địa điểm (VD: "Hoàn Kiếm")
+        limit: Số POI tối đa
+        radius_km: Bán kính tìm POI (km)
+        lang: Ngôn ngữ mô tả POI/thời tiết (vi, en)
+        
+    Returns:
+        ExploreResponse với coordinates và danh sách PointOfInterest (kèm ETag,
+        Cache-Control), hoặc 304 nếu If-None-Match khớp
+        
+    Raises:
+        HTTPException: 404 nếu không tìm thấy tọa độ, 504 nếu geocoding/POI quá chậm
+    """
+    try:
+        coords = await asyncio.wait_for(
+            location_service.get_coordinates(q), timeout=EXPLORE_GEOCODE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tìm tọa độ quá thời gian chờ")
+    if not coords:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy tọa độ cho '{q}'")
+    
+    try:
+        pois, fallback = await asyncio.wait_for(
+            location_service.search_points_of_interest(
+                coords["lat"], coords["lng"], limit=limit, radius_km=radius_km, lang=lang
+            ),
+            timeout=EXPLORE_POI_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tìm địa điểm quá thời gian chờ")
+    
+    # Lời gọi thời tiết được shield: quá hạn thì trả về ngay với weather = null,
+    # còn lời gọi vẫn chạy tiếp để làm ấm cache cho lần sau
+    weather_task = asyncio.ensure_future(location_service.attach_weather(pois, lang))
+    try:
+        pois = await asyncio.wait_for(asyncio.shield(weather_task), timeout=EXPLORE_WEATHER_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.info("Explore weather timeout for %r, returning POIs without weather", q)
+        pois = [{**poi, "weather": None} for poi in pois]
+    
+    _record_destination(coords, name=q, radius_km=radius_km, limit=limit, weather=True)
+    
+    result = {"query": q, "coordinates": coords, "pois": pois}
+    if fallback:
+        # POI mẫu: không để trình duyệt/CDN lưu lại
+        return http_cache.uncached_json(result)
+    
+    # Hết hạn theo phần dữ liệu hết hạn sớm nhất (ô POI hoặc số liệu thời tiết)
+    max_age = min(
+        location_service.poi_ttl(coords["lat"], coords["lng"], radius_km),
+        _weather_max_age(pois)
+    )
+    return http_cache.cached_json(request, result, max_age, WEATHER_MAX_STALE)
+
+
+@translation_router.post("/api/translate")
 async def translate_text(request: TranslationRequest):
     """
     Dịch văn bản sử dụng HuggingFace translation model
@@ -189,24 +536,228 @@ async def translate_text(request: TranslationRequest):
             request.target_lang
         )
         return {"translated_text": translated}
+    except TranslationQueueFull as e:
+        # Quá tải: trả lỗi ngay để client thử lại sau, thay vì chờ trong hàng đợi
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@translation_router.post("/api/translate/batch")
+async def translate_batch(request: TranslationBatchRequest):
+    """
+    Dịch nhiều văn bản trong một request (VD: mô tả của tất cả POI)
+    Văn bản được tách câu; câu đã từng dịch lấy từ cache, chỉ câu mới chạy model
+    
+    Args:
+        request: TranslationBatchRequest với texts, source_lang, target_lang
+        
+    Returns:
+        Dict với translated_texts (cùng thứ tự đầu vào)
+        
+    Raises:
+        HTTPException: Nếu dịch thất bại
+    """
+    try:
+        translated = await huggingface_service.translate_many(
+            request.texts,
+            request.source_lang,
+            request.target_lang
+        )
+        return {"translated_texts": translated}
+    except TranslationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Lỗi dịch thuật: {str(e)}")
+
+
+
+@translation_router.post("/api/translate/stream")
+async def translate_stream(request: TranslationRequest):
+    """
+    Dịch văn bản dài theo từng câu, trả về dạng NDJSON (mỗi dòng một JSON):
+    mỗi câu được gửi ngay khi dịch xong thay vì chờ cả đoạn
+    
+    Args:
+        request: TranslationRequest với text, source_lang, target_lang
+        
+    Returns:
+        Stream application/x-ndjson các dòng {"index", "text", "separator"},
+        dòng cuối {"done": true} (hoặc {"error": ...} nếu lỗi giữa chừng)
+    """
+    try:
+        chunks = huggingface_service.translate_stream(
+            request.text,
+            request.source_lang,
+            request.target_lang
+        )
+    except TranslationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    async def ndjson():
+        try:
+            async for chunk in chunks:
+                yield json.dumps(chunk, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        except Exception as e:
+            # Header 200 đã gửi đi, chỉ có thể báo lỗi trong stream
+            yield json.dumps({"error": f"Lỗi dịch thuật: {str(e)}"}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.get("/health")
-async def health_check():
+async def health_check(response: Response):
     """
     Health check endpoint - kiểm tra trạng thái API
+    Trả về 503 cho tới khi model dịch được nạp và warmup xong (profile có dịch thuật)
     """
-    return {
-        "status": "healthy",
-        "services": {
-            "location": "OpenStreetMap/Nominatim",
-            "weather": "Open-Meteo",
-            "translation": "HuggingFace"
-        },
-        "huggingface_configured": bool(os.getenv("HUGGINGFACE_TOKEN"))
-    }
+    status = "healthy"
+    result = {"status": status, "profile": APP_PROFILE, "services": {}}
+    
+    if location_service is not None:
+        result["services"].update({"location": "OpenStreetMap/Nominatim", "weather": "Open-Meteo"})
+        result.update({
+            "cache": location_service.cache_stats(),
+            "single_flight": location_service.single_flight_stats(),
+            "upstreams": location_service.upstream_stats()
+        })
+        if prefetcher is not None:
+            result["prefetch"] = prefetcher.stats()
+    
+    if huggingface_service is not None:
+        translation = huggingface_service.readiness()
+        if translation["ready"]:
+            status = "healthy"
+        elif translation["warmup_error"] or (translation["pool"] and not translation["pool"]["healthy"]):
+            # Model lỗi hoặc pool worker đang được tạo lại: các chức năng địa điểm/thời tiết
+            # vẫn phục vụ được
+            status = "degraded"
+        else:
+            status = "starting"
+            response.status_code = 503
+        result["services"]["translation"] = "HuggingFace"
+        result.update({
+            "status": status,
+            "huggingface_configured": bool(os.getenv("HUGGINGFACE_TOKEN")),
+            "translation_models": translation,
+            "translation_batcher": huggingface_service.batcher.stats(),
+            "translation_cache": huggingface_service.translation_cache.stats()
+        })
+    
+    return result
+
+
+def collect_service_metrics():
+    """Chuyển các bộ đếm sẵn có của service thành metric lúc scrape (không tốn gì trên hot path)"""
+    family = metrics.MetricFamily
+    sample = metrics.Sample
+
+    caches = {}
+    if location_service is not None:
+        caches.update(location_service.cache_stats())
+    if huggingface_service is not None:
+        caches["translations"] = huggingface_service.translation_cache.stats()
+    hits, misses, stale, evictions, ratio, entries = [], [], [], [], [], []
+    for name, stats in caches.items():
+        cache = {"cache": name}
+        if "hits" in stats:
+            # Gazetteer: chỉ có hit/miss
+            cache_hits = stats["hits"]
+            hits.append(sample("_total", {**cache, "tier": "index"}, cache_hits))
+        else:
+            cache_hits = stats["memory_hits"] + stats["disk_hits"]
+            hits.append(sample("_total", {**cache, "tier": "memory"}, stats["memory_hits"]))
+            hits.append(sample("_total", {**cache, "tier": "disk"}, stats["disk_hits"]))
+            stale.append(sample("_total", cache, stats["stale_hits"]))
+            evictions.append(sample("_total", cache, stats["evictions"]))
+            entries.append(sample("", cache, stats["memory_entries"]))
+        misses.append(sample("_total", cache, stats["misses"]))
+        lookups = cache_hits + stats["misses"]
+        ratio.append(sample("", cache, cache_hits / lookups if lookups else 0.0))
+    yield family("cache_hits_total", "counter", "Số lần tra cache trúng", hits)
+    yield family("cache_misses_total", "counter", "Số lần tra cache trượt (gồm hết hạn)", misses)
+    yield family("cache_stale_hits_total", "counter", "Số lần dùng dữ liệu hết hạn khi upstream lỗi", stale)
+    yield family("cache_evictions_total", "counter", "Số entry bị loại khỏi tầng LRU", evictions)
+    yield family("cache_hit_ratio", "gauge", "Tỉ lệ trúng cache kể từ khi khởi động", ratio)
+    yield family("cache_memory_entries", "gauge", "Số entry trong tầng LRU", entries)
+
+    if location_service is not None:
+        yield from collect_geo_metrics()
+    if huggingface_service is not None:
+        yield from collect_translation_metrics()
+
+
+def collect_geo_metrics():
+    """Metric của single flight, các upstream địa điểm/thời tiết và prefetch"""
+    family = metrics.MetricFamily
+    sample = metrics.Sample
+
+    flights = location_service.single_flight_stats()
+    yield family("single_flight_deduplicated_total", "counter", "Số lời gọi upstream được gộp chung", [
+        sample("_total", {"flight": name}, stats["deduplicated"]) for name, stats in flights.items()
+    ])
+
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    breaker, queued, hedged, failovers, timeouts = [], [], [], [], []
+    for name, stats in location_service.upstream_stats().items():
+        hedged.append(sample("_total", {"upstream": name}, stats["hedged"]))
+        failovers.append(sample("_total", {"upstream": name}, stats["failovers"]))
+        timeouts.append(sample("", {"upstream": name}, stats["timeout_s"]))
+        for url, endpoint in stats["endpoints"].items():
+            labels = {"upstream": name, "endpoint": url}
+            breaker.append(sample("", labels, states[endpoint["state"]]))
+            for priority, count in endpoint.get("rate_limiter", {}).get("queued", {}).items():
+                queued.append(sample("", {**labels, "priority": priority}, count))
+    yield family("upstream_circuit_state", "gauge", "Trạng thái circuit breaker (0 closed, 1 half-open, 2 open)", breaker)
+    yield family("upstream_queued_requests", "gauge", "Số request đang chờ rate limiter", queued)
+    yield family("upstream_hedged_total", "counter", "Số lần gửi song song tới mirror kế tiếp", hedged)
+    yield family("upstream_failovers_total", "counter", "Số lần chuyển sang mirror khác sau lỗi", failovers)
+    yield family("upstream_timeout_seconds", "gauge", "Timeout thích ứng hiện tại", timeouts)
+
+    if prefetcher is not None:
+        yield family("prefetch_tracked_destinations", "gauge", "Số điểm đến đang được theo dõi độ phổ biến", [
+            sample("", {}, len(prefetcher.tracker))
+        ])
+
+
+def collect_translation_metrics():
+    """Metric của hàng đợi dịch, trạng thái model và pool worker"""
+    family = metrics.MetricFamily
+    sample = metrics.Sample
+
+    batcher = huggingface_service.batcher.stats()
+    yield family("translation_queued_sentences", "gauge", "Số câu đang chờ dịch", [sample("", {}, batcher["queued"])])
+    yield family("translation_running_batches", "gauge", "Số batch đang chạy", [sample("", {}, batcher["running_batches"])])
+    yield family("translation_rejected_total", "counter", "Số câu bị từ chối do hàng đợi đầy", [
+        sample("_total", {}, batcher["rejected"])
+    ])
+    readiness = huggingface_service.readiness()
+    yield family("translation_ready", "gauge", "Model dịch đã nạp và warmup xong", [
+        sample("", {"backend": readiness["backend"]}, int(readiness["ready"]))
+    ])
+    if readiness["pool"] is not None:
+        yield family("translation_pool_busy_workers", "gauge", "Số worker dịch đang bận", [
+            sample("", {}, readiness["pool"]["busy_workers"])
+        ])
+        yield family("translation_pool_restarts_total", "counter", "Số lần pool worker dịch hỏng và được tạo lại", [
+            sample("_total", {}, readiness["pool"]["restarts"])
+        ])
+
+
+metrics.REGISTRY.register_collector(collect_service_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metric theo Prometheus text format (số liệu của process đang trả lời)"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# Gắn các nhóm route theo APP_PROFILE (sau khi đã khai báo hết route)
+if SERVE_GEO:
+    app.include_router(geo_router)
+if SERVE_TRANSLATION:
+    app.include_router(translation_router)
 
 
 # ==================== MAIN ====================
@@ -215,11 +766,9 @@ if __name__ == "__main__":
     # Lấy port từ biến môi trường hoặc dùng 8000
     port = int(os.getenv("PORT", 8000))
     
-    print("=" * 50)
-    print("🚀 Vietnam Discovery API đang khởi động...")
-    print(f"📍 URL: http://localhost:{port}")
-    print(f"📖 Docs: http://localhost:{port}/docs")
-    print("=" * 50)
+    logger.info("🚀 Vietnam Discovery API đang khởi động (profile: %s)...", APP_PROFILE)
+    logger.info("📍 URL: http://localhost:%d", port)
+    logger.info("📖 Docs: http://localhost:%d/docs", port)
     
     # Chạy server
     uvicorn.run(
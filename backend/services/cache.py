@@ -0,0 +1,223 @@
+"""
+Two-tier Cache - Cache 2 tầng dùng chung cho các service:
+- Tầng 1: LRU trong bộ nhớ process (giới hạn số entry)
+- Tầng 2: SQLite trên đĩa, giữ lại dữ liệu qua các lần restart
+Mỗi entry có TTL riêng (cho phép cache kết quả rỗng với TTL ngắn hơn)
+Entry hết hạn có thể được giữ thêm max_stale giây để dùng tạm khi upstream lỗi
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TwoTierCache:
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        max_entries: int = 1024,
+        max_stale: float = 0,
+    ):
+        """
+        Khởi tạo cache
+
+        Args:
+            namespace: Tên bảng SQLite (mỗi loại dữ liệu một bảng)
+            path: Đường dẫn file SQLite, None = chỉ dùng bộ nhớ
+            max_entries: Số entry tối đa của tầng LRU
+            max_stale: Số giây giữ lại entry sau khi hết hạn cho get(allow_stale=True)
+        """
+        self.namespace = namespace
+        self.path = path
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+
+        # key -> (value, expires_at); expires_at = None nghĩa là không hết hạn
+        self._memory: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+        if path:
+            self._open_db(path)
+
+    def _open_db(self, path: str):
+        """Mở file SQLite và tạo bảng nếu chưa có"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.namespace}" '
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _check_fork(self):
+        """
+        Kết nối SQLite không được dùng chung qua fork (gunicorn preload_app tạo
+        service trong master): worker con mở kết nối riêng ở lần dùng đầu tiên
+        """
+        if self._pid != os.getpid() and self._db is not None:
+            # Giữ lại (không close) kết nối của master: close trong worker sẽ nhả
+            # khóa POSIX của file SQLite mà kết nối mới đang giữ
+            self._inherited_db = self._db
+            self._open_db(self.path)
+
+    def get(self, key: str, allow_stale: bool = False) -> Tuple[bool, Any]:
+        """
+        Tra cứu cache (bộ nhớ trước, đĩa sau)
+
+        Args:
+            key: Khóa đã chuẩn hóa
+            allow_stale: Chấp nhận entry đã hết hạn nhưng còn trong khoảng max_stale
+                         (dùng khi upstream lỗi hoặc circuit breaker đang ngắt)
+
+        Returns:
+            (found, value) - found = False nếu không có hoặc đã hết hạn
+        """
+        now = time.time()
+        stale: Optional[Tuple[Any]] = None
+        expired = False
+        with self._lock:
+            self._check_fork()
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return True, value
+                expired = True
+                if expires_at + self.max_stale > now:
+                    stale = (value,)
+                else:
+                    del self._memory[key]
+
+            # Bản trên đĩa có thể mới hơn (process khác đã ghi lại)
+            if self._db is not None:
+                row = self._db.execute(
+                    f'SELECT value, expires_at FROM "{self.namespace}" WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at is None or expires_at > now:
+                        self._remember(key, value, expires_at)
+                        self.disk_hits += 1
+                        return True, value
+                    expired = True
+                    if expires_at + self.max_stale > now:
+                        stale = stale or (value,)
+                    else:
+                        self._db.execute(f'DELETE FROM "{self.namespace}" WHERE key = ?', (key,))
+
+            if allow_stale and stale is not None:
+                self.stale_hits += 1
+                return True, stale[0]
+            if expired:
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Ghi vào cả 2 tầng
+
+        Args:
+            key: Khóa đã chuẩn hóa
+            value: Giá trị (phải serialize được bằng JSON)
+            ttl: Thời gian sống (giây), None = không hết hạn
+        """
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._check_fork()
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    f'INSERT OR REPLACE INTO "{self.namespace}" (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value, ensure_ascii=False), expires_at),
+                )
+
+    def ttl(self, key: str) -> Optional[float]:
+        """
+        Số giây còn lại của entry còn hạn trong tầng LRU (VD: để đặt Cache-Control)
+
+        Returns:
+            Số giây còn lại, inf nếu entry không hết hạn, None nếu không có trong bộ nhớ
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at = entry[1]
+        if expires_at is None:
+            return float("inf")
+        remaining = expires_at - time.time()
+        return remaining if remaining > 0 else None
+
+    def peek_ttl(self, key: str) -> Optional[float]:
+        """
+        Như ttl() nhưng đọc cả SQLite khi entry không có trong bộ nhớ (VD: sau restart),
+        không có tác dụng phụ: không nạp entry vào LRU, không tính vào hit/miss
+
+        Returns:
+            Số giây còn lại, inf nếu entry không hết hạn, None nếu không có hoặc đã hết hạn
+        """
+        with self._lock:
+            self._check_fork()
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at = entry[1]
+            elif self._db is not None:
+                row = self._db.execute(
+                    f'SELECT expires_at FROM "{self.namespace}" WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                expires_at = row[0]
+            else:
+                return None
+        if expires_at is None:
+            return float("inf")
+        remaining = expires_at - time.time()
+        return remaining if remaining > 0 else None
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]):
+        """Đưa entry vào tầng LRU, loại entry cũ nhất khi đầy"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Bộ đếm hit/miss/eviction của cache"""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        """Đóng kết nối SQLite"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,330 @@
+"""
+Gazetteer - Geocoding offline cho địa danh Việt Nam:
+- Index dựng sẵn từ danh sách tỉnh/thành, quận/huyện, danh lam (data/vn_gazetteer.csv)
+- Khớp chính xác, theo tiền tố và gần đúng (trigram) trên tên đã bỏ dấu
+- File index được memory-map nên các worker dùng chung page của hệ điều hành
+
+Dựng index (bước build riêng, chạy từ thư mục backend):
+    python -m services.gazetteer build data/vn_gazetteer.csv data/gazetteer.idx
+
+Tra thử:
+    python -m services.gazetteer lookup data/gazetteer.idx "vinh ha long"
+"""
+
+import argparse
+import csv
+import mmap
+import struct
+import sys
+import zlib
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from services.text import normalize_place_name
+
+
+MAGIC = b"VNGZ"
+VERSION = 1
+# magic, version, số entry, số trigram, số posting, độ dài blob tên
+HEADER = struct.Struct("<4sIIIII")
+
+# Ngưỡng Dice tối thiểu để chấp nhận một kết quả khớp gần đúng
+DEFAULT_MIN_SIMILARITY = 0.75
+# Tên ngắn có ít trigram nên một ký tự khác cũng cho điểm Dice cao: ngưỡng chặt hơn
+SHORT_NAME_LENGTH = 8
+SHORT_NAME_MIN_SIMILARITY = 0.85
+
+
+def trigrams(normalized: str) -> set:
+    """Tập trigram của chuỗi đã chuẩn hóa (có đệm khoảng trắng 2 đầu)"""
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_key(trigram: str) -> int:
+    """Mã hóa trigram thành số 32-bit (trùng mã chỉ sinh thêm ứng viên, không sai kết quả)"""
+    return zlib.crc32(trigram.encode("utf-8"))
+
+
+def _tokens_match(query: str, candidate: str) -> bool:
+    """
+    Hai từ (đã chuẩn hóa) được coi là cùng một từ: giống hệt, hoặc sai đúng một ký tự
+    (thêm/bớt/thay) với từ dài từ 3 ký tự. Số phải giống hệt ("10" khác "1")
+    """
+    if query == candidate:
+        return True
+    if query.isdigit() or candidate.isdigit() or min(len(query), len(candidate)) < 3:
+        return False
+    if abs(len(query) - len(candidate)) > 1:
+        return False
+    if len(query) == len(candidate):
+        return sum(a != b for a, b in zip(query, candidate)) == 1
+    shorter, longer = sorted((query, candidate), key=len)
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            return True
+    return False
+
+
+def plausible_match(query: str, candidate: str) -> bool:
+    """
+    Kiểm tra một kết quả khớp gần đúng có thực sự cùng địa danh không (tên đã chuẩn hóa):
+    hai tên phải có cùng số từ, từng từ tương ứng khớp nhau và chỉ tối đa một từ trong
+    mỗi 3 từ bị sai chính tả. Loại các trường hợp Dice cao nhưng sai địa danh:
+    "quan 10" -> "quan 1", "ben thanh" -> "cho ben thanh"
+    """
+    query_tokens, candidate_tokens = query.split(), candidate.split()
+    if len(query_tokens) != len(candidate_tokens):
+        return False
+    misspelled = 0
+    for q, c in zip(query_tokens, candidate_tokens):
+        if not _tokens_match(q, c):
+            return False
+        misspelled += q != c
+    return misspelled <= max(1, len(query_tokens) // 3)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def build_index(csv_path: str, output_path: str) -> int:
+    """
+    Dựng file index nhị phân từ CSV (cột: name, lat, lng, kind)
+
+    Bố cục file (little-endian, mỗi section căn 8 byte):
+        header | coords f64[2n] | trigram_counts u32[n] | name_offsets u32[n+1]
+        | trigram_keys u32[t] | posting_offsets u32[t+1] | postings u32[p] | names
+
+    Returns:
+        Số entry đã ghi
+    """
+    entries: Dict[str, Tuple[float, float, str, str]] = {}
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = normalize_place_name(row["name"])
+            if key and key not in entries:
+                entries[key] = (float(row["lat"]), float(row["lng"]), row["name"], row["kind"])
+
+    # Sắp xếp theo tên chuẩn hóa để tra chính xác/tiền tố bằng binary search
+    keys = sorted(entries)
+    postings: Dict[int, List[int]] = {}
+    coords: List[float] = []
+    trigram_counts: List[int] = []
+    names = bytearray()
+    name_offsets = [0]
+
+    for entry_id, key in enumerate(keys):
+        lat, lng, display, kind = entries[key]
+        coords.extend((lat, lng))
+        grams = {_trigram_key(g) for g in trigrams(key)}
+        trigram_counts.append(len(grams))
+        for gram in grams:
+            postings.setdefault(gram, []).append(entry_id)
+        names += f"{key}\t{display}\t{kind}".encode("utf-8")
+        name_offsets.append(len(names))
+
+    trigram_keys = sorted(postings)
+    posting_offsets = [0]
+    flat_postings: List[int] = []
+    for gram in trigram_keys:
+        flat_postings.extend(postings[gram])
+        posting_offsets.append(len(flat_postings))
+
+    sections = [
+        struct.pack(f"<{len(coords)}d", *coords),
+        struct.pack(f"<{len(trigram_counts)}I", *trigram_counts),
+        struct.pack(f"<{len(name_offsets)}I", *name_offsets),
+        struct.pack(f"<{len(trigram_keys)}I", *trigram_keys),
+        struct.pack(f"<{len(posting_offsets)}I", *posting_offsets),
+        struct.pack(f"<{len(flat_postings)}I", *flat_postings),
+        bytes(names),
+    ]
+
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(trigram_keys), len(flat_postings), len(names)))
+        for section in sections:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(section)
+
+    return len(keys)
+
+
+class Gazetteer:
+    def __init__(self, path: str, min_similarity: float = DEFAULT_MIN_SIMILARITY):
+        """
+        Mở file index bằng mmap (chỉ đọc)
+
+        Args:
+            path: Đường dẫn file index do build_index tạo ra
+            min_similarity: Ngưỡng Dice cho khớp gần đúng (0..1); tên ngắn hơn
+                SHORT_NAME_LENGTH ký tự dùng ngưỡng cao hơn (SHORT_NAME_MIN_SIMILARITY)
+        """
+        if sys.byteorder != "little":
+            raise RuntimeError("Gazetteer index chỉ hỗ trợ máy little-endian")
+
+        self.min_similarity = min_similarity
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, n, t, p, names_len = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"File gazetteer không hợp lệ: {path}")
+
+        offset = HEADER.size
+
+        def take(count: int, fmt: str, itemsize: int):
+            nonlocal offset
+            offset = _align(offset)
+            section = view[offset:offset + count * itemsize].cast(fmt)
+            offset += count * itemsize
+            return section
+
+        self._coords = take(2 * n, "d", 8)
+        self._trigram_counts = take(n, "I", 4)
+        self._name_offsets = take(n + 1, "I", 4)
+        self._trigram_keys = take(t, "I", 4)
+        self._posting_offsets = take(t + 1, "I", 4)
+        self._postings = take(p, "I", 4)
+        offset = _align(offset)
+        self._names = view[offset:offset + names_len]
+        self.size = n
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def stats(self) -> Dict[str, int]:
+        """Bộ đếm hit/miss của gazetteer"""
+        return {"hits": self.hits, "misses": self.misses, "entries": self.size}
+
+    def close(self):
+        """Giải phóng mmap"""
+        for attr in ("_coords", "_trigram_counts", "_name_offsets",
+                     "_trigram_keys", "_posting_offsets", "_postings", "_names"):
+            getattr(self, attr).release()
+        self._mmap.close()
+        self._file.close()
+
+    def _record(self, entry_id: int) -> Tuple[str, str, str]:
+        """(tên chuẩn hóa, tên hiển thị, loại) của một entry"""
+        start, end = self._name_offsets[entry_id], self._name_offsets[entry_id + 1]
+        key, display, kind = bytes(self._names[start:end]).decode("utf-8").split("\t")
+        return key, display, kind
+
+    def _key(self, entry_id: int) -> str:
+        return self._record(entry_id)[0]
+
+    def _result(self, entry_id: int, score: float) -> Dict:
+        _, display, kind = self._record(entry_id)
+        return {
+            "name": display,
+            "kind": kind,
+            "lat": self._coords[2 * entry_id],
+            "lng": self._coords[2 * entry_id + 1],
+            "score": score,
+        }
+
+    def _lower_bound(self, key: str) -> int:
+        """Binary search vị trí đầu tiên có tên chuẩn hóa >= key"""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Gợi ý các địa danh có tên bắt đầu bằng prefix (không phân biệt dấu)"""
+        key = normalize_place_name(prefix)
+        results = []
+        entry_id = self._lower_bound(key)
+        while entry_id < self.size and len(results) < limit and self._key(entry_id).startswith(key):
+            results.append(self._result(entry_id, 1.0))
+            entry_id += 1
+        return results
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """
+        Tìm địa danh khớp nhất với tên
+
+        Args:
+            name: Tên địa điểm (có dấu, không dấu hoặc sai chính tả nhẹ)
+
+        Returns:
+            Dict với name, kind, lat, lng, score hoặc None nếu không đủ giống
+            (caller nên hỏi Nominatim thay vì đoán sai địa danh)
+        """
+        key = normalize_place_name(name)
+        if not key:
+            self.misses += 1
+            return None
+
+        # 1. Khớp chính xác
+        entry_id = self._lower_bound(key)
+        if entry_id < self.size and self._key(entry_id) == key:
+            self.hits += 1
+            return self._result(entry_id, 1.0)
+
+        # 2. Khớp gần đúng: đếm trigram chung qua posting list
+        query_grams = {_trigram_key(g) for g in trigrams(key)}
+        overlaps: Counter = Counter()
+        for gram in query_grams:
+            index = bisect_left(self._trigram_keys, gram)
+            if index < len(self._trigram_keys) and self._trigram_keys[index] == gram:
+                start, end = self._posting_offsets[index], self._posting_offsets[index + 1]
+                overlaps.update(self._postings[start:end])
+
+        min_similarity = self.min_similarity
+        if len(key) < SHORT_NAME_LENGTH:
+            min_similarity = max(min_similarity, SHORT_NAME_MIN_SIMILARITY)
+
+        # Xét ứng viên theo điểm giảm dần, lấy ứng viên đầu tiên thực sự cùng địa danh
+        scored = sorted(
+            (
+                (2 * shared / (len(query_grams) + self._trigram_counts[candidate]), candidate)
+                for candidate, shared in overlaps.items()
+            ),
+            reverse=True
+        )
+        for score, candidate in scored:
+            if score < min_similarity:
+                break
+            if plausible_match(key, self._key(candidate)):
+                self.hits += 1
+                return self._result(candidate, round(score, 3))
+
+        self.misses += 1
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dựng/tra cứu gazetteer địa danh Việt Nam")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Dựng file index từ CSV")
+    build.add_argument("csv_path")
+    build.add_argument("output_path")
+
+    lookup = subparsers.add_parser("lookup", help="Tra một tên trong index")
+    lookup.add_argument("index_path")
+    lookup.add_argument("name")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        count = build_index(args.csv_path, args.output_path)
+        print(f"✅ Đã ghi {count} địa danh vào {args.output_path}")
+    else:
+        gazetteer = Gazetteer(args.index_path)
+        print(gazetteer.lookup(args.name))
+        gazetteer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+HTTP Cache - Cho phép trình duyệt/CDN cache các response GET:
+- Serialize JSON bằng orjson (nhanh hơn json/pydantic ~10 lần với danh sách POI)
+- ETag mạnh tính từ nội dung response, trả 304 khi If-None-Match khớp
+- Cache-Control theo TTL của dữ liệu bên dưới (geocode, ô POI, chu kỳ Open-Meteo)
+- Nén gzip/brotli các response lớn hơn ngưỡng; ETag của bản nén có thêm hậu tố
+  "-gzip"/"-br" để mỗi cách mã hóa có một ETag riêng (như mod_deflate)
+"""
+
+import hashlib
+import json
+import math
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.types import Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn: thiếu thì dùng json chuẩn
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn: thiếu thì chỉ nén gzip
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+# Hậu tố thêm vào ETag theo Content-Encoding của response
+_ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize JSON (UTF-8, không escape tiếng Việt)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSONResponse serialize bằng orjson (trả thẳng từ endpoint, bỏ qua bước validate response_model)"""
+
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def etag_for(body: bytes) -> str:
+    """ETag mạnh: hash nội dung response"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _matching_tag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    Tag trong If-None-Match khớp với etag (so sánh yếu theo RFC 9110, bỏ hậu tố
+    mã hóa nén), None nếu không khớp
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    opaque = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        value = tag[2:] if tag.startswith("W/") else tag
+        value = value.strip('"')
+        for suffix in _ENCODING_SUFFIXES:
+            if value.endswith(suffix):
+                value = value[:-len(suffix)]
+                break
+        if value == opaque:
+            return tag
+    return None
+
+
+def cache_control(max_age: float, stale_if_error: float = 0) -> str:
+    """Header Cache-Control cho dữ liệu còn hạn `max_age` giây"""
+    max_age = max(0, math.floor(max_age))
+    value = f"public, max-age={max_age}"
+    if stale_if_error:
+        value += f", stale-if-error={math.floor(stale_if_error)}"
+    return value
+
+
+def cached_json(request: Request, content: Any, max_age: float, stale_if_error: float = 0) -> Response:
+    """
+    Response JSON có ETag và Cache-Control; trả 304 (không body) nếu client đã có bản này
+
+    Args:
+        request: Request hiện tại (đọc If-None-Match)
+        content: Dữ liệu trả về
+        max_age: Số giây dữ liệu còn hạn (theo TTL của cache bên dưới)
+        stale_if_error: Số giây client/CDN được dùng bản cũ khi server lỗi
+    """
+    body = dumps(content)
+    etag = etag_for(body)
+    # CompressionMiddleware chỉ thêm Vary khi thực sự nén (không bao giờ với 304 không có
+    # body), nên đặt sẵn ở đây; middleware gộp lại nếu trùng
+    headers = {"Cache-Control": cache_control(max_age, stale_if_error), "Vary": "Accept-Encoding"}
+
+    matched = _matching_tag(request.headers.get("if-none-match"), etag)
+    if matched is not None:
+        # 304 mang cùng Cache-Control/Vary như 200 (RFC 9110 §15.4.5) để cache cập nhật
+        # đúng entry; trả lại đúng tag client gửi (gồm hậu tố nén) để khớp bản client đang giữ
+        return Response(status_code=304, headers={**headers, "ETag": matched})
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers={**headers, "ETag": etag})
+
+
+def uncached_json(content: Any) -> Response:
+    """
+    Response JSON không được lưu ở trình duyệt/CDN (Cache-Control: no-store), VD dữ liệu
+    mẫu thay thế khi không tìm được kết quả thật
+    """
+    return Response(dumps(content), media_type=JSON_MEDIA_TYPE, headers={"Cache-Control": "no-store"})
+
+
+def _encoded_etag(send: Send) -> Send:
+    """
+    Bọc send: thêm hậu tố mã hóa vào ETag mạnh khi response thực sự được nén, và gộp
+    các giá trị Vary trùng (route đã đặt Vary: Accept-Encoding, middleware nén thêm lần nữa)
+    """
+
+    async def send_tagged(message: Message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            etag = headers.get("etag")
+            encoding = headers.get("content-encoding")
+            if etag and not etag.startswith("W/") and encoding in ("gzip", "br"):
+                headers["etag"] = f'{etag[:-1]}-{encoding}"'
+            vary = ", ".join(headers.getlist("vary"))
+            if vary:
+                fields = {}
+                for field in vary.split(","):
+                    fields.setdefault(field.strip().lower(), field.strip())
+                headers["vary"] = ", ".join(field for field in fields.values() if field)
+        await send(message)
+
+    return send_tagged
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = 4):
+        super().__init__(app, minimum_size)
+        self._compressor = brotli.Compressor(quality=quality)
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            # Response dạng stream (NDJSON): flush từng phần để client nhận ngay
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Nén response lớn hơn minimum_size: brotli nếu client nhận "br" và đã cài
+    brotli, nếu không thì gzip (GZipMiddleware của Starlette)
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 6, brotli_quality: int = 4):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        send = _encoded_etag(send)
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and "br" in accept:
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+            await responder(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
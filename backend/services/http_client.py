@@ -0,0 +1,100 @@
+"""
+HTTP Client - Client async dùng chung cho mọi lời gọi ra ngoài:
+- Giữ kết nối keep-alive (connection pooling) giữa các request
+- Giới hạn số request đồng thời tới từng host (Nominatim, Overpass, Open-Meteo)
+- Được mở/đóng theo vòng đời (lifespan) của FastAPI app
+"""
+
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class HttpClient:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_limit: int = 10,
+        host_limits: Optional[Dict[str, int]] = None,
+        timeout: float = 30.0,
+        user_agent: str = "vietnam-discovery-app",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Khởi tạo HTTP Client
+
+        Args:
+            max_connections: Tổng số kết nối tối đa trong pool
+            max_keepalive_connections: Số kết nối keep-alive được giữ lại
+            per_host_limit: Số request đồng thời tối đa mặc định cho mỗi host
+            host_limits: Giới hạn riêng cho từng host (VD: {"nominatim.openstreetmap.org": 1})
+            timeout: Timeout mặc định (giây)
+            user_agent: User-Agent gửi kèm mọi request (Nominatim bắt buộc)
+            transport: Transport tùy chỉnh (dùng cho load test với upstream giả lập)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.per_host_limit = per_host_limit
+        self.host_limits = host_limits or {}
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self):
+        """Mở connection pool (gọi khi app khởi động)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                headers={"User-Agent": self.user_agent},
+                transport=self.transport,
+            )
+
+    async def aclose(self):
+        """Đóng connection pool (gọi khi app tắt)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Lấy semaphore giới hạn đồng thời cho host (kèm port nếu có) của URL"""
+        parts = urlsplit(url)
+        semaphore = self._semaphores.get(parts.netloc)
+        if semaphore is None:
+            limit = self.host_limits.get(parts.netloc, self.host_limits.get(parts.hostname or "", self.per_host_limit))
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[parts.netloc] = semaphore
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Gửi request qua connection pool dùng chung
+
+        Args:
+            method: HTTP method (GET, POST, ...)
+            url: URL đích
+            **kwargs: Tham số truyền thẳng cho httpx (params, data, timeout, ...)
+
+        Returns:
+            httpx.Response
+        """
+        if self._client is None:
+            # Cho phép dùng service ngoài lifespan (script, REPL)
+            await self.start()
+
+        async with self._get_semaphore(url):
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
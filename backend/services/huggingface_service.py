@@ -5,8 +5,20 @@ HuggingFace Service - Sử dụng các model HuggingFace cho:
 """
 
 import os
-from typing import Optional
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+import time
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+from services.cache import TwoTierCache
+from services.text import split_sentences
+from services.translation_backends import BACKENDS, WARMUP_TEXTS, create_backend
+from services.translation_batcher import TranslationBatcher, TranslationQueueFull
+from services.translation_pool import TranslationPool, translate_in_worker
+
+
+logger = logging.getLogger(__name__)
 
 
 class HuggingFaceService:
@@ -14,51 +26,175 @@ class HuggingFaceService:
         """Khởi tạo HuggingFace Service"""
         self.api_token = os.getenv("HUGGINGFACE_TOKEN")
         
-        # Translation pipelines sẽ được khởi tạo lazy (khi cần)
-        self.translator_en_vi = None
-        self.translator_vi_en = None
+        # Backend inference: pytorch (mặc định), quantized (int8) hoặc onnx (ONNX Runtime)
+        self.backend = os.getenv("TRANSLATION_BACKEND", "pytorch")
+        
+        # Translation backend theo model, khởi tạo lazy (khi cần)
+        self.translators = {}
+        
+        # Các cặp ngôn ngữ nạp sẵn và chạy thử khi khởi động (VD: "en-vi,vi-en"; rỗng = lazy)
+        self.preload_pairs = [
+            tuple(pair.strip().split("-", 1))
+            for pair in os.getenv("TRANSLATION_PRELOAD", "en-vi,vi-en").split(",")
+            if pair.strip()
+        ]
+        # Sẵn sàng nhận request dịch khi warmup xong (không preload thì sẵn sàng ngay)
+        self.ready = not self.preload_pairs
+        self.warmup_seconds = None
+        self.warmup_error = None
         
         # Các model sử dụng (nhẹ nhất cho translation)
         self.translation_model_en_vi = "Helsinki-NLP/opus-mt-en-vi"  # Dịch Anh -> Việt
         self.translation_model_vi_en = "Helsinki-NLP/opus-mt-vi-en"  # Dịch Việt -> Anh
         
+        # Số tiến trình worker chạy inference (0 = một thread trong process API)
+        self.workers = int(os.getenv("TRANSLATION_WORKERS", 0))
+        self.threads_per_worker = int(os.getenv(
+            "TRANSLATION_THREADS_PER_WORKER", max(1, (os.cpu_count() or 1) // max(self.workers, 1))
+        ))
+        # Pool được tạo trong startup() (mỗi process API một pool, không tạo trước khi fork)
+        self.pool = None
+        
+        # Gom các request dịch đồng thời thành batch, inference trên worker thread riêng
+        self.batcher = self._create_batcher(self._translate_batch)
+        
+        # Cache bản dịch theo từng câu (content-addressed): LRU + SQLite
+        self.translation_cache = TwoTierCache(
+            namespace="translations",
+            path=os.getenv("TRANSLATION_CACHE_PATH", "cache/translations.sqlite3"),
+            max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", 8192))
+        )
     
-    def _get_translator(self, source_lang: str, target_lang: str):
-        """Lazy load translation pipeline"""
+    
+    def _create_batcher(self, run_batch, executor=None, concurrency: int = 1) -> TranslationBatcher:
+        return TranslationBatcher(
+            run_batch,
+            max_batch_size=int(os.getenv("TRANSLATION_MAX_BATCH", 16)),
+            max_wait_ms=float(os.getenv("TRANSLATION_MAX_WAIT_MS", 5)),
+            executor=executor,
+            max_concurrent_batches=concurrency,
+            # Số câu tối đa chờ dịch, vượt quá thì trả 503 + Retry-After
+            max_queue=int(os.getenv("TRANSLATION_MAX_QUEUE", 256))
+        )
+    
+    
+    async def startup(self):
+        """Tạo pool tiến trình worker (nếu cấu hình) - gọi trong lifespan của FastAPI"""
+        if self.workers > 0 and self.pool is None:
+            self.pool = TranslationPool(
+                workers=self.workers,
+                threads_per_worker=self.threads_per_worker,
+                backend=self.backend,
+                models={
+                    ("en", "vi"): self.translation_model_en_vi,
+                    ("vi", "en"): self.translation_model_vi_en,
+                },
+                default_pair=("en", "vi"),
+                preload_pairs=self.preload_pairs,
+                token=self.api_token
+            )
+            await self.batcher.shutdown()
+            self.batcher = self._create_batcher(translate_in_worker, self.pool, self.workers)
+    
+    
+    def load_models(self, fork_safe_only: bool = False):
+        """
+        Nạp model cho các cặp ngôn ngữ cấu hình sẵn (không chạy inference)
+        
+        Args:
+            fork_safe_only: Chỉ nạp khi backend dùng chung được qua fork
+                            (gọi trong gunicorn master trước khi fork worker)
+        """
+        if fork_safe_only and not getattr(BACKENDS.get(self.backend), "fork_safe", False):
+            return
+        if self.workers > 0:
+            # Model nằm trong các tiến trình của pool
+            return
+        for source_lang, target_lang in self.preload_pairs:
+            self._get_translator(source_lang, target_lang)
+    
+    
+    async def warmup(self):
+        """
+        Nạp model (nếu master chưa nạp sẵn) và dịch thử một câu cho mỗi cặp ngôn ngữ
+        trên worker của batcher, để request đầu tiên không phải chờ - gọi trong lifespan
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
         try:
-            if source_lang == "en" and target_lang == "vi":
-                if self.translator_en_vi is None:
-                    print(f"Loading translation model: {self.translation_model_en_vi}")
-                    self.translator_en_vi = pipeline(
-                        "translation",
-                        model=self.translation_model_en_vi,
-                        tokenizer=self.translation_model_en_vi,
-                        token=self.api_token
-                    )
-                return self.translator_en_vi
-            elif source_lang == "vi" and target_lang == "en":
-                if self.translator_vi_en is None:
-                    print(f"Loading translation model: {self.translation_model_vi_en}")
-                    self.translator_vi_en = pipeline(
-                        "translation",
-                        model=self.translation_model_vi_en,
-                        tokenizer=self.translation_model_vi_en,
-                        token=self.api_token
-                    )
-                return self.translator_vi_en
+            if self.pool is not None:
+                # Mỗi worker nạp và chạy thử model trong initializer của nó
+                await asyncio.gather(*(asyncio.wrap_future(future) for future in self.pool.start()))
             else:
-                # Default: Anh -> Việt
-                if self.translator_en_vi is None:
-                    self.translator_en_vi = pipeline(
-                        "translation",
-                        model=self.translation_model_en_vi,
-                        tokenizer=self.translation_model_en_vi,
-                        token=self.api_token
+                for source_lang, target_lang in self.preload_pairs:
+                    await loop.run_in_executor(
+                        self.batcher.executor, self._translate_batch,
+                        source_lang, target_lang, [WARMUP_TEXTS.get(source_lang, "Hello.")]
                     )
-                return self.translator_en_vi
+            self.ready = True
         except Exception as e:
-            print(f"Error loading translation model: {e}")
-            raise
+            logger.error("Translation warmup error: %s", e)
+            self.warmup_error = str(e)
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - start, 2)
+            logger.info(
+                "Translation warmup finished in %ss", self.warmup_seconds,
+                extra={"warmup_seconds": self.warmup_seconds, "backend": self.backend}
+            )
+    
+    
+    def readiness(self) -> dict:
+        """Trạng thái nạp model cho /health (pool đang tạo lại sau khi hỏng = chưa sẵn sàng)"""
+        pool = self.pool.stats() if self.pool is not None else None
+        return {
+            "ready": self.ready and (pool is None or pool["healthy"]),
+            "backend": self.backend,
+            "loaded_models": sorted(self.translators),
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+            "pool": pool,
+        }
+    
+    
+    async def shutdown(self):
+        """Dừng batcher và worker thread/pool - gọi trong lifespan của FastAPI"""
+        await self.batcher.shutdown()
+        self.translation_cache.close()
+    
+    
+    def _model_for(self, source_lang: str, target_lang: str) -> str:
+        """Tên model dùng cho cặp ngôn ngữ (khớp với _get_translator)"""
+        if source_lang == "vi" and target_lang == "en":
+            return self.translation_model_vi_en
+        return self.translation_model_en_vi
+    
+    
+    def _cache_key(self, model: str, sentence: str) -> str:
+        """Khóa cache theo nội dung: hash của model + backend + câu nguồn
+        (backend lượng tử hóa/ONNX có thể cho bản dịch khác chút ít)"""
+        return hashlib.sha256(f"{model}\0{self.backend}\0{sentence}".encode("utf-8")).hexdigest()
+    
+    
+    def _get_translator(self, source_lang: str, target_lang: str):
+        """Lazy load translation backend cho cặp ngôn ngữ (mặc định: Anh -> Việt)"""
+        model = self._model_for(source_lang, target_lang)
+        translator = self.translators.get(model)
+        if translator is None:
+            try:
+                logger.info("Loading translation model: %s (backend: %s)", model, self.backend)
+                translator = self.translators[model] = create_backend(self.backend, model, token=self.api_token)
+            except Exception as e:
+                logger.error("Error loading translation model %s: %s", model, e)
+                raise
+        return translator
+    
+    
+    def _translate_batch(self, source_lang: str, target_lang: str, texts: List[str]) -> List[str]:
+        """
+        Dịch một batch câu (chạy trên worker thread của batcher)
+        Backend tự pad các câu trong batch về cùng độ dài
+        """
+        return self._get_translator(source_lang, target_lang).translate(texts, max_length=512)
     
     
     async def translate(self, text: str, source_lang: str = "en", target_lang: str = "vi") -> str:
@@ -74,29 +210,145 @@ class HuggingFaceService:
             Văn bản đã dịch
         """
         try:
-            print(f"Translating from {source_lang} to {target_lang}: {text}")
+            logger.debug("Translating from %s to %s: %s", source_lang, target_lang, text)
             
-            # Lấy translator pipeline
-            translator = self._get_translator(source_lang, target_lang)
+            translated_text = (await self.translate_many([text], source_lang, target_lang))[0]
             
-            # Thực hiện dịch
-            result = translator(text, max_length=512)
+            logger.debug("Translation result: %s", translated_text)
             
-            print(f"Translation result: {result}")
-            
-            # Parse kết quả
-            if isinstance(result, list) and len(result) > 0:
-                translated_text = result[0].get('translation_text', '')
-                if translated_text:
-                    return translated_text
+            if translated_text:
+                return translated_text
             
             raise Exception("Model không trả về kết quả dịch")
             
+        except TranslationQueueFull:
+            raise
         except Exception as e:
-            print(f"Translation error: {e}")
+            logger.warning("Translation error: %s", e)
             raise Exception(f"Lỗi dịch thuật: {str(e)}")
     
     
+    async def translate_many(self, texts: List[str], source_lang: str = "en", target_lang: str = "vi") -> List[str]:
+        """
+        Dịch nhiều văn bản: tách câu, lấy câu đã dịch từ cache,
+        chỉ gửi các câu chưa gặp vào model (qua batcher) rồi ghép lại theo thứ tự
+        
+        Args:
+            texts: Danh sách văn bản cần dịch
+            source_lang: Ngôn ngữ nguồn (en, vi)
+            target_lang: Ngôn ngữ đích (en, vi)
+            
+        Returns:
+            Danh sách văn bản đã dịch, cùng thứ tự đầu vào
+        """
+        model = self._model_for(source_lang, target_lang)
+        segmented = [split_sentences(text) for text in texts]
+        
+        # Gom các câu khác nhau trên toàn bộ đầu vào (đoạn rỗng chỉ là khoảng trắng đầu văn bản)
+        sentences = {}
+        for segments in segmented:
+            for sentence, _ in segments:
+                if sentence:
+                    sentences.setdefault(self._cache_key(model, sentence), sentence)
+        
+        translated, pending = self._start_translations(sentences, source_lang, target_lang)
+        if pending:
+            try:
+                results = await asyncio.gather(*pending.values())
+            except BaseException:
+                # Một câu lỗi (hoặc request bị hủy): bỏ các câu còn lại khỏi hàng đợi
+                for task in pending.values():
+                    task.cancel()
+                raise
+            translated.update(zip(pending, results))
+        
+        return [
+            "".join(
+                (translated[self._cache_key(model, sentence)] if sentence else "") + separator
+                for sentence, separator in segments
+            )
+            for segments in segmented
+        ]
+    
+    
+    def translate_stream(self, text: str, source_lang: str = "en", target_lang: str = "vi") -> AsyncIterator[dict]:
+        """
+        Dịch văn bản theo từng câu, trả về mỗi câu ngay khi dịch xong (đúng thứ tự)
+        Các câu vẫn được gửi vào batcher cùng lúc nên được batch như translate_many
+        
+        Args:
+            text: Văn bản cần dịch
+            source_lang: Ngôn ngữ nguồn (en, vi)
+            target_lang: Ngôn ngữ đích (en, vi)
+            
+        Returns:
+            Async iterator các dict {"index", "text", "separator"}
+            
+        Raises:
+            TranslationQueueFull: Ngay khi gọi (trước khi stream bắt đầu) nếu hàng đợi đầy
+        """
+        model = self._model_for(source_lang, target_lang)
+        segments = split_sentences(text)
+        # Đoạn rỗng (khoảng trắng đầu văn bản) không có khóa, không cần dịch
+        keys = [self._cache_key(model, sentence) if sentence else None for sentence, _ in segments]
+        translated, pending = self._start_translations(
+            {key: sentence for key, (sentence, _) in zip(keys, segments) if key is not None},
+            source_lang, target_lang
+        )
+        return self._stream_segments(segments, keys, translated, pending)
+    
+    
+    async def _stream_segments(self, segments, keys, translated, pending) -> AsyncIterator[dict]:
+        try:
+            for index, ((_, separator), key) in enumerate(zip(segments, keys)):
+                if key is None:
+                    yield {"index": index, "text": "", "separator": separator}
+                    continue
+                if key not in translated:
+                    translated[key] = await pending[key]
+                yield {"index": index, "text": translated[key], "separator": separator}
+        finally:
+            # Client ngắt kết nối giữa chừng: bỏ các câu chưa dịch khỏi hàng đợi
+            for task in pending.values():
+                task.cancel()
+    
+    
+    def _start_translations(self, sentences: Dict[str, str], source_lang: str, target_lang: str):
+        """
+        Lấy các câu đã dịch từ cache, gửi các câu còn lại vào batcher
+        
+        Args:
+            sentences: {khóa cache: câu nguồn}
+            
+        Returns:
+            (bản dịch có sẵn {khóa: câu}, task đang dịch {khóa: task})
+        """
+        translated = {}
+        for key in sentences:
+            found, value = self.translation_cache.get(key)
+            if found:
+                translated[key] = value
+        
+        misses = [key for key in sentences if key not in translated]
+        pending = {}
+        if misses:
+            # Cả lô vào hàng đợi trong một bước: quá tải thì từ chối cả request ngay
+            futures = self.batcher.enqueue(source_lang, target_lang, [sentences[key] for key in misses])
+            for key, future in zip(misses, futures):
+                task = pending[key] = asyncio.ensure_future(self._store_translation(key, future))
+                # Task bị hủy trước khi kịp chờ future: hủy luôn future để batcher bỏ câu này
+                task.add_done_callback(lambda done, future=future: done.cancelled() and future.cancel())
+        return translated, pending
+    
+    
+    async def _store_translation(self, key: str, future: asyncio.Future) -> str:
+        """Chờ bản dịch một câu từ batcher và ghi cache"""
+        value = await future
+        if value:
+            self.translation_cache.set(key, value)
+        return value
+    
+    
     async def get_location_info(self, location_name: str) -> dict:
         """
         Lấy thông tin về địa điểm sử dụng Question Answering model
@@ -5,19 +5,206 @@ Location Service - Sử dụng Nominatim (OpenStreetMap) để:
 - Lấy thông tin thời tiết từ Open-Meteo API
 """
 
-import requests
-from typing import Optional, List, Dict
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+import os
+import math
+import asyncio
+import logging
+import httpx
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+from urllib.parse import urlsplit
+
+from services import metrics
+from services.cache import TwoTierCache
+from services.gazetteer import Gazetteer
+from services.http_client import HttpClient
+from services.phrases import DEFAULT_LANG, TagClassifier, phrase, weather as weather_phrase
+from services.poi_store import PoiStore
+from services.rate_limiter import worker_processes
+from services.resilience import CircuitOpenError, Upstream
+from services.single_flight import SingleFlight
+from services.spatial_index import SpatialIndex, StoreIndex
+from services.text import normalize_place_name
+from services.tiles import Tile, lat_lng_to_tile, tile_bounds, tile_key, tiles_for_bbox
+from services.weather_cache import MAX_STALE as WEATHER_MAX_STALE, MIN_TTL as WEATHER_MIN_TTL, WeatherCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# TTL cho cache geocoding (giây): tọa độ gần như không đổi,
+# kết quả "không tìm thấy" giữ ngắn hơn để sớm thử lại
+GEOCODE_TTL = 30 * 24 * 3600
+GEOCODE_NEGATIVE_TTL = 3600
+
+# TTL cho cache POI theo ô bản đồ (giây)
+POI_TILE_TTL = 6 * 3600
+
+# Thời gian giữ dữ liệu đã hết hạn để dùng tạm khi upstream lỗi/bị ngắt (giây)
+GEOCODE_MAX_STALE = 30 * 24 * 3600
+POI_TILE_MAX_STALE = 7 * 24 * 3600
+
+# Các mirror Overpass tương đương, theo thứ tự ưu tiên
+DEFAULT_OVERPASS_URLS = (
+    "https://overpass-api.de/api/interpreter,"
+    "https://overpass.kumi.systems/api/interpreter"
+)
+
+# Số tọa độ tối đa trong một lời gọi Open-Meteo (giữ URL ngắn)
+WEATHER_BATCH_SIZE = 100
 
 
 class LocationService:
-    def __init__(self):
-        """Khởi tạo Location Service với Nominatim"""
-        # Nominatim yêu cầu user_agent để tracking
-        self.geolocator = Nominatim(user_agent="vietnam-discovery-app")
-        self.overpass_url = "https://overpass-api.de/api/interpreter"
-        self.weather_api = "https://api.open-meteo.com/v1/forecast"
+    def __init__(
+        self,
+        http_client: Optional[HttpClient] = None,
+        geocode_cache: Optional[TwoTierCache] = None,
+        gazetteer: Optional[Gazetteer] = None,
+        poi_tile_cache: Optional[TwoTierCache] = None,
+        poi_store: Optional[PoiStore] = None,
+        weather_cache: Optional[WeatherCache] = None
+    ):
+        """
+        Khởi tạo Location Service với Nominatim
+
+        Args:
+            http_client: Client async dùng chung (mặc định tạo mới với giới hạn theo host)
+            geocode_cache: Cache geocoding (mặc định LRU + SQLite tại GEOCODE_CACHE_PATH)
+            gazetteer: Index địa danh offline (mặc định mở GAZETTEER_PATH nếu đã build)
+            poi_tile_cache: Cache POI theo ô bản đồ (mặc định LRU + SQLite tại POI_TILE_CACHE_PATH)
+            poi_store: Kho POI offline (mặc định nạp POI_STORE_PATH nếu đã import)
+            weather_cache: Cache thời tiết theo ô lưới (mặc định ô WEATHER_GRID_DEG độ)
+        """
+        self.nominatim_url = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+        self.overpass_urls = [
+            url.strip() for url in os.getenv("OVERPASS_URLS", DEFAULT_OVERPASS_URLS).split(",") if url.strip()
+        ]
+        self.weather_api = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+        # Nominatim chỉ cho phép 1 request đồng thời, Overpass cấp ~2 slot mỗi IP
+        # Nominatim yêu cầu user_agent để tracking (HttpClient gửi kèm mọi request)
+        self.http = http_client or HttpClient(
+            host_limits={
+                urlsplit(self.nominatim_url).netloc: 1,
+                **{urlsplit(url).netloc: 2 for url in self.overpass_urls},
+            }
+        )
+
+        # Circuit breaker + timeout thích ứng cho từng upstream; Overpass hedge/failover giữa các mirror
+        # Nominatim: tối đa NOMINATIM_RATE request/giây theo usage policy (mặc định 1) cho cả máy:
+        # các worker (WEB_CONCURRENCY) dùng chung một token bucket trong RATE_LIMIT_STATE_DIR
+        # Overpass: số slot đồng thời theo /api/status của từng mirror, chia đều cho các worker
+        processes = worker_processes()
+        rate_state_dir = os.getenv("RATE_LIMIT_STATE_DIR", "cache/ratelimit")
+        self.nominatim = Upstream(
+            "nominatim", self.http, [self.nominatim_url], min_timeout=2, max_timeout=10,
+            rate=float(os.getenv("NOMINATIM_RATE", 1.0)), max_concurrent=1,
+            processes=processes, rate_state_dir=rate_state_dir
+        )
+        self.overpass = Upstream(
+            "overpass", self.http, self.overpass_urls, min_timeout=5, max_timeout=30,
+            max_concurrent=2, slot_status=True, processes=processes
+        )
+        self.open_meteo = Upstream("open_meteo", self.http, [self.weather_api], min_timeout=1, max_timeout=10)
+
+        # Cache tọa độ: LRU trong process + SQLite sống qua restart
+        self.geocode_cache = geocode_cache or TwoTierCache(
+            namespace="geocode",
+            path=os.getenv("GEOCODE_CACHE_PATH", "cache/geocode.sqlite3"),
+            max_entries=int(os.getenv("GEOCODE_CACHE_SIZE", 2048)),
+            max_stale=GEOCODE_MAX_STALE
+        )
+
+        # Cache POI theo ô slippy-map cố định (mặc định zoom 12, ~9km mỗi ô)
+        self.poi_tile_zoom = int(os.getenv("POI_TILE_ZOOM", 12))
+        self.poi_tile_cache = poi_tile_cache or TwoTierCache(
+            namespace="poi_tiles",
+            path=os.getenv("POI_TILE_CACHE_PATH", "cache/poi_tiles.sqlite3"),
+            max_entries=int(os.getenv("POI_TILE_CACHE_SIZE", 4096)),
+            max_stale=POI_TILE_MAX_STALE
+        )
+
+        # Spatial index trên các POI đã tải, dùng để xếp hạng theo khoảng cách
+        # Mỗi ô là một nhóm trong index; số ô được giữ giới hạn như tầng LRU của cache ô,
+        # ô ít dùng nhất bị gỡ khỏi index (khi cần lại sẽ được nạp lại từ cache/Overpass)
+        self.poi_index = SpatialIndex()
+        self._indexed_tiles: "OrderedDict[str, None]" = OrderedDict()
+
+        # Kho POI offline: nếu có thì phục vụ POI hoàn toàn không cần Overpass
+        poi_store_path = os.getenv("POI_STORE_PATH", "data/pois.store")
+        if poi_store is None and os.path.exists(poi_store_path):
+            poi_store = PoiStore(poi_store_path)
+        self.offline_pois = poi_store is not None
+        if poi_store is not None:
+            # Truy vấn thẳng trên các cột của kho (đã xếp theo KD-tree khi import): không
+            # dựng cây lúc khởi động, không tạo dict cho từng POI
+            self.poi_index = StoreIndex(poi_store)
+            logger.info("Loaded %d POIs from offline store", len(poi_store))
+
+        # Cache thời tiết theo ô lưới, hết hạn theo chu kỳ cập nhật của Open-Meteo
+        self.weather_cache = weather_cache or WeatherCache(
+            grid_deg=float(os.getenv("WEATHER_GRID_DEG", 0.02)),
+            path=os.getenv("WEATHER_CACHE_PATH", "cache/weather.sqlite3") or None
+        )
+
+        # Mô tả POI/thời tiết dịch sẵn theo ngôn ngữ (không cần chạy model dịch)
+        self.classifier = TagClassifier()
+
+        # Gộp các lời gọi upstream trùng nhau đang chạy đồng thời
+        self.geocode_flight = SingleFlight("geocode")
+        self.poi_flight = SingleFlight("poi_tiles")
+        self.weather_flight = SingleFlight("weather")
+
+        # Gazetteer offline: trả lời phần lớn truy vấn mà không cần gọi Nominatim
+        self.gazetteer = gazetteer
+        gazetteer_path = os.getenv("GAZETTEER_PATH", "data/gazetteer.idx")
+        if self.gazetteer is None and os.path.exists(gazetteer_path):
+            self.gazetteer = Gazetteer(gazetteer_path)
+        elif self.gazetteer is None:
+            logger.info("Gazetteer index not found at %s, geocoding via Nominatim only", gazetteer_path)
+    
+    
+    async def startup(self):
+        """Mở connection pool - gọi trong lifespan của FastAPI"""
+        await self.http.start()
+    
+    
+    async def shutdown(self):
+        """Đóng connection pool - gọi trong lifespan của FastAPI"""
+        await self.http.aclose()
+        self.geocode_cache.close()
+        self.poi_tile_cache.close()
+        self.weather_cache.close()
+        if self.gazetteer is not None:
+            self.gazetteer.close()
+    
+    
+    def single_flight_stats(self) -> Dict[str, Dict[str, int]]:
+        """Số lời gọi upstream thực sự và số caller được gộp, theo từng upstream"""
+        return {
+            flight.name: flight.stats()
+            for flight in (self.geocode_flight, self.poi_flight, self.weather_flight)
+        }
+    
+    
+    def upstream_stats(self) -> Dict[str, Dict]:
+        """Trạng thái circuit breaker, timeout thích ứng và hedge của từng upstream"""
+        return {
+            upstream.name: upstream.stats()
+            for upstream in (self.nominatim, self.overpass, self.open_meteo)
+        }
+    
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Bộ đếm hit/miss/eviction của các cache"""
+        stats = {
+            "geocode": self.geocode_cache.stats(),
+            "poi_tiles": self.poi_tile_cache.stats(),
+            "weather": self.weather_cache.stats()
+        }
+        if self.gazetteer is not None:
+            stats["gazetteer"] = self.gazetteer.stats()
+        return stats
     
     
     async def get_coordinates(self, location_name: str) -> Optional[Dict[str, float]]:
@@ -30,190 +217,335 @@ class LocationService:
         Returns:
             Dict với lat và lng, hoặc None nếu không tìm thấy
         """
+        # Tra gazetteer offline trước (vài micro giây, không giới hạn tốc độ)
+        if self.gazetteer is not None:
+            match = self.gazetteer.lookup(location_name)
+            if match:
+                return {"lat": match["lat"], "lng": match["lng"]}
+        
+        # Các biến thể hoa/thường, khoảng trắng, dấu dùng chung một entry
+        cache_key = normalize_place_name(location_name)
+        found, cached = self.geocode_cache.get(cache_key)
+        if found:
+            return cached
+        
+        # Các request đồng thời cho cùng địa điểm dùng chung một lời gọi Nominatim
+        return await self.geocode_flight.do(
+            cache_key, lambda: self._fetch_coordinates(location_name, cache_key)
+        )
+    
+    
+    async def _fetch_coordinates(self, location_name: str, cache_key: str) -> Optional[Dict[str, float]]:
+        """Gọi Nominatim Search API và ghi kết quả vào cache geocoding"""
         try:
             # Thêm "Vietnam" vào query để tăng độ chính xác
             query = f"{location_name}, Vietnam"
             
-            # Gọi Nominatim API
-            location = self.geolocator.geocode(query, timeout=10)
+            # Gọi Nominatim Search API
+            response = await self.nominatim.request(
+                "GET",
+                params={"q": query, "format": "json", "limit": 1}
+            )
+            response.raise_for_status()
             
-            if location:
-                return {
-                    "lat": location.latitude,
-                    "lng": location.longitude
+            results = response.json()
+            if results:
+                coords = {
+                    "lat": float(results[0]["lat"]),
+                    "lng": float(results[0]["lon"])
                 }
+                self.geocode_cache.set(cache_key, coords, ttl=GEOCODE_TTL)
+                return coords
             
+            # Chỉ cache "không tìm thấy" khi Nominatim trả lời rỗng (không cache lỗi mạng)
+            self.geocode_cache.set(cache_key, None, ttl=GEOCODE_NEGATIVE_TTL)
             return None
             
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            print(f"Geocoding error: {e}")
-            return None
+        except (httpx.HTTPError, asyncio.TimeoutError, CircuitOpenError, ValueError, KeyError) as e:
+            logger.warning("Geocoding error for %r: %s", location_name, e)
+            # Nominatim lỗi/bị ngắt: dùng tạm tọa độ đã hết hạn trong cache nếu còn
+            found, stale = self.geocode_cache.get(cache_key, allow_stale=True)
+            return stale if found else None
     
     
-    async def get_points_of_interest(self, lat: float, lng: float) -> List[Dict]:
+    def geocode_ttl(self, location_name: str) -> Optional[float]:
         """
-        Tìm các điểm du lịch (POI) xung quanh tọa độ
-        Sử dụng Overpass API (OpenStreetMap)
+        Số giây tới khi tọa độ của địa điểm hết hạn trong cache (dùng cho prefetch)
+        
+        Returns:
+            inf nếu tra được trong gazetteer (không bao giờ hết hạn),
+            None nếu chưa có hoặc đã hết hạn
+        """
+        if self.gazetteer is not None and self.gazetteer.lookup(location_name):
+            return float("inf")
+        return self.geocode_cache.peek_ttl(normalize_place_name(location_name))
+    
+    
+    async def refresh_coordinates(self, location_name: str) -> Optional[Dict[str, float]]:
+        """
+        Gọi lại Nominatim và ghi đè cache geocoding, kể cả khi entry còn hạn
+        (dùng cho prefetch; request đồng thời cho cùng địa điểm vẫn chờ chung)
+        """
+        cache_key = normalize_place_name(location_name)
+        return await self.geocode_flight.do(
+            cache_key, lambda: self._fetch_coordinates(location_name, cache_key)
+        )
+    
+    
+    async def get_points_of_interest(
+        self,
+        lat: float,
+        lng: float,
+        limit: int = 5,
+        radius_km: float = 10.0,
+        categories: Optional[List[str]] = None,
+        lang: str = DEFAULT_LANG
+    ) -> List[Dict]:
+        """
+        Tìm các điểm du lịch (POI) gần tọa độ nhất (danh sách mẫu nếu không tìm được),
+        xem search_points_of_interest
+        """
+        pois, _ = await self.search_points_of_interest(lat, lng, limit, radius_km, categories, lang)
+        return pois
+    
+    
+    async def search_points_of_interest(
+        self,
+        lat: float,
+        lng: float,
+        limit: int = 5,
+        radius_km: float = 10.0,
+        categories: Optional[List[str]] = None,
+        lang: str = DEFAULT_LANG
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Tìm các điểm du lịch (POI) gần tọa độ nhất
+        Dữ liệu từ kho POI offline nếu có, nếu không thì từ Overpass API
+        (OpenStreetMap) qua cache theo ô bản đồ; xếp hạng bằng spatial index
         
         Args:
             lat: Vĩ độ
             lng: Kinh độ
+            limit: Số POI tối đa
+            radius_km: Bán kính tìm kiếm (km)
+            categories: Lọc theo nhóm (tourism, historic, natural), None = tất cả
+            lang: Ngôn ngữ của mô tả (vi, en)
             
         Returns:
-            List các POI với name, description, coordinates
+            (List các POI với name, description, coordinates, distance_km,
+             True nếu đó là danh sách mẫu do không tìm được/lỗi - không được cache)
         """
         try:
-            # Bán kính tìm kiếm (độ) - khoảng 10km
-            radius = 0.1
-            
-            # Overpass QL query để tìm các POI du lịch
-            # Tìm: tourism, historic, natural features
-            overpass_query = f"""
-            [out:json][timeout:25];
-            (
-              node["tourism"~"attraction|museum|viewpoint|artwork|gallery"]({lat-radius},{lng-radius},{lat+radius},{lng+radius});
-              node["historic"]({lat-radius},{lng-radius},{lat+radius},{lng+radius});
-              node["natural"~"beach|cave|peak|waterfall"]({lat-radius},{lng-radius},{lat+radius},{lng+radius});
-            );
-            out body 5;
-            """
+            if not self.offline_pois:
+                await self._ensure_tiles_indexed(*self._radius_bbox(lat, lng, radius_km))
+                # Dựng lại KD-tree trong thread; không có await nào giữa đây và nearest
+                # nên cây đã chứa mọi ô vừa nạp
+                await self.poi_index.build_async()
             
-            response = requests.post(
-                self.overpass_url,
-                data={"data": overpass_query},
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            elements = data.get("elements", [])
+            with metrics.stage("poi_rank"):
+                nearest = self.poi_index.nearest(
+                    lat, lng, k=limit, radius_km=radius_km, categories=categories
+                )
             
             # Parse kết quả
             pois = []
-            for element in elements[:5]:  # Lấy tối đa 5 POI
-                tags = element.get("tags", {})
-                name = tags.get("name", "Địa điểm không tên")
-                
-                # Tạo mô tả từ tags
-                description = self._generate_description(tags)
-                
-                pois.append({
-                    "name": name,
-                    "description": description,
-                    "coordinates": {
-                        "lat": element.get("lat"),
-                        "lng": element.get("lon")
-                    }
-                })
+            with metrics.stage("poi_describe"):
+                for distance_km, element in nearest:
+                    tags = element.get("tags", {})
+                    name = tags.get("name") or phrase("poi.unnamed", lang)
+                    
+                    # Tạo mô tả từ tags
+                    description = self.classifier.describe(tags, lang)
+                    
+                    pois.append({
+                        "name": name,
+                        "description": description,
+                        "coordinates": {
+                            "lat": element.get("lat"),
+                            "lng": element.get("lon")
+                        },
+                        "distance_km": round(distance_km, 3)
+                    })
             
             # Nếu không tìm được POI, trả về danh sách mẫu
             if not pois:
-                pois = self._get_fallback_pois(lat, lng)
+                return self._get_fallback_pois(lat, lng, lang), True
             
-            return pois
+            return pois, False
             
         except Exception as e:
-            print(f"POI search error: {e}")
+            logger.warning("POI search error: %s", e, extra={"lat": lat, "lng": lng})
             # Trả về danh sách mẫu nếu lỗi
-            return self._get_fallback_pois(lat, lng)
+            return self._get_fallback_pois(lat, lng, lang), True
+    
+    
+    @staticmethod
+    def _radius_bbox(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+        """Bbox (south, west, north, east) bao bán kính tìm kiếm (đổi km sang độ)"""
+        dlat = radius_km / 111.32
+        dlng = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+    
+    
+    def poi_ttl(self, lat: float, lng: float, radius_km: float = 10.0) -> float:
+        """
+        Số giây nhỏ nhất tới khi các ô POI phủ bán kính tìm kiếm hết hạn (dùng cho
+        Cache-Control); ô không còn trong bộ nhớ (hoặc tải lỗi) tính là 0
+        """
+        if self.offline_pois:
+            return POI_TILE_TTL
+        zoom = self.poi_tile_zoom
+        remaining = [
+            self.poi_tile_cache.ttl(tile_key(tile, zoom))
+            for tile in tiles_for_bbox(*self._radius_bbox(lat, lng, radius_km), zoom)
+        ]
+        return min((ttl or 0 for ttl in remaining), default=0)
+    
+    
+    def poi_tile_ttls(self, lat: float, lng: float, radius_km: float = 10.0) -> Dict[Tile, Optional[float]]:
+        """
+        Số giây tới khi từng ô POI phủ bán kính tìm kiếm hết hạn (dùng cho prefetch);
+        None nếu ô chưa có hoặc đã hết hạn, rỗng nếu dùng kho POI offline
+        """
+        if self.offline_pois:
+            return {}
+        zoom = self.poi_tile_zoom
+        return {
+            tile: self.poi_tile_cache.peek_ttl(tile_key(tile, zoom))
+            for tile in tiles_for_bbox(*self._radius_bbox(lat, lng, radius_km), zoom)
+        }
     
     
-    def _generate_description(self, tags: dict) -> str:
-        """Tạo mô tả chi tiết từ OSM tags"""
-        tourism = tags.get("tourism", "")
-        historic = tags.get("historic", "")
-        natural = tags.get("natural", "")
-        amenity = tags.get("amenity", "")
-        building = tags.get("building", "")
+    async def refresh_poi_tiles(self, tiles: List[Tile]):
+        """
+        Tải lại các ô POI từ Overpass (một query), ghi đè cache và cập nhật spatial index
+        kể cả khi ô còn hạn (dùng cho prefetch); lỗi upstream được ném ra cho caller
+        """
+        if self.offline_pois or not tiles:
+            return
+        zoom = self.poi_tile_zoom
+        fetched = await self.poi_flight.do_many(tiles, self._fetch_tiles)
+        for tile, elements in fetched.items():
+            self._index_tile(tile_key(tile, zoom), elements)
+    
+    
+    def _index_tile(self, key: str, elements: List[Dict]):
+        """
+        Thay các POI của một ô trong spatial index (POI đã bị xóa trên OSM biến mất
+        khi ô được tải lại), rồi gỡ các ô ít dùng nhất nếu vượt giới hạn
+        """
+        self.poi_index.replace(key, elements)
+        self._indexed_tiles[key] = None
+        self._indexed_tiles.move_to_end(key)
+        while len(self._indexed_tiles) > self.poi_tile_cache.max_entries:
+            evicted, _ = self._indexed_tiles.popitem(last=False)
+            self.poi_index.remove(evicted)
+    
+    
+    async def _ensure_tiles_indexed(self, south: float, west: float, north: float, east: float):
+        """
+        Bảo đảm mọi ô bản đồ phủ bbox đã có trong spatial index
+        Ô lấy từ cache (kể cả cache trên đĩa sau restart) được nạp vào index một lần;
+        chỉ các ô chưa có (hoặc hết hạn) mới được tải từ Overpass, gộp trong 1 query
+        """
+        zoom = self.poi_tile_zoom
+        missing: List[Tile] = []
+        for tile in tiles_for_bbox(south, west, north, east, zoom):
+            key = tile_key(tile, zoom)
+            found, cached = self.poi_tile_cache.get(key)
+            if not found:
+                missing.append(tile)
+            elif key in self._indexed_tiles:
+                self._indexed_tiles.move_to_end(key)
+            else:
+                self._index_tile(key, cached)
         
-        # Lấy thông tin bổ sung
-        wikipedia = tags.get("wikipedia", "")
-        wikidata = tags.get("wikidata", "")
-        description = tags.get("description", "")
+        if missing:
+            # Các ô đang được request khác tải thì chờ chung, còn lại gộp 1 query
+            try:
+                fetched = await self.poi_flight.do_many(missing, self._fetch_tiles)
+            except Exception as e:
+                # Overpass lỗi/bị ngắt: dùng tạm các ô đã hết hạn còn trong cache
+                fetched = {}
+                for tile in missing:
+                    found, stale = self.poi_tile_cache.get(tile_key(tile, zoom), allow_stale=True)
+                    if found:
+                        fetched[tile] = stale
+                if not fetched:
+                    raise
+                logger.warning(
+                    "Overpass unavailable (%s), serving %d/%d stale tiles", e, len(fetched), len(missing)
+                )
+            for tile, elements in fetched.items():
+                self._index_tile(tile_key(tile, zoom), elements)
+    
+    
+    async def _fetch_tiles(self, tiles: List[Tile]) -> Dict[Tile, List[Dict]]:
+        """
+        Tải POI cho các ô bằng một Overpass query trên bbox bao các ô,
+        chia element về từng ô rồi ghi cache (kể cả ô rỗng)
+        """
+        zoom = self.poi_tile_zoom
+        bounds = [tile_bounds(tile, zoom) for tile in tiles]
+        south = min(b[0] for b in bounds)
+        west = min(b[1] for b in bounds)
+        north = max(b[2] for b in bounds)
+        east = max(b[3] for b in bounds)
+        bbox = f"{south},{west},{north},{east}"
         
-        # Tạo mô tả dựa trên loại địa điểm
-        base_desc = ""
+        # Overpass QL query để tìm các POI du lịch
+        # Tìm: tourism, historic, natural features
+        overpass_query = f"""
+        [out:json][timeout:25];
+        (
+          node["tourism"~"attraction|museum|viewpoint|artwork|gallery"]({bbox});
+          node["historic"]({bbox});
+          node["natural"~"beach|cave|peak|waterfall"]({bbox});
+        );
+        out body;
+        """
         
-        if tourism == "attraction":
-            base_desc = "Điểm tham quan du lịch nổi tiếng"
-        elif tourism == "museum":
-            base_desc = "Bảo tàng lưu giữ di sản văn hóa và lịch sử"
-        elif tourism == "viewpoint":
-            base_desc = "Điểm ngắm cảnh đẹp, view panorama tuyệt vời"
-        elif tourism == "artwork":
-            base_desc = "Tác phẩm nghệ thuật công cộng, điểm check-in độc đáo"
-        elif tourism == "gallery":
-            base_desc = "Phòng tranh nghệ thuật, triển lãm đa dạng"
-        elif historic == "memorial":
-            base_desc = "Đài tưởng niệm lịch sử, nơi tôn vinh các anh hùng dân tộc"
-        elif historic == "monument":
-            base_desc = "Di tích lịch sử quan trọng, kiến trúc đặc sắc"
-        elif historic == "archaeological_site":
-            base_desc = "Khu di tích khảo cổ học, dấu tích văn minh cổ đại"
-        elif historic == "castle":
-            base_desc = "Lâu đài cổ kính, kiến trúc thời phong kiến"
-        elif historic == "ruins":
-            base_desc = "Tàn tích lịch sử, dấu vết của thời gian"
-        elif natural == "beach":
-            base_desc = "Bãi biển đẹp, cát trắng nước trong, lý tưởng để nghỉ dưỡng"
-        elif natural == "cave":
-            base_desc = "Hang động tự nhiên, khám phá thạch nhũ kỳ thú"
-        elif natural == "peak":
-            base_desc = "Đỉnh núi hùng vĩ, chinh phục và ngắm cảnh từ trên cao"
-        elif natural == "waterfall":
-            base_desc = "Thác nước hùng vĩ, khung cảnh thiên nhiên tuyệt đẹp"
-        elif amenity == "place_of_worship":
-            base_desc = "Nơi thờ cúng tâm linh, kiến trúc tôn giáo độc đáo"
-        else:
-            # Fallback description
-            if tourism:
-                base_desc = f"Địa điểm du lịch thú vị - {tourism}"
-            elif historic:
-                base_desc = f"Di tích lịch sử - {historic}"
-            elif natural:
-                base_desc = f"Kỳ quan thiên nhiên - {natural}"
-            else:
-                base_desc = "Địa điểm đáng khám phá tại Việt Nam"
+        response = await self.overpass.request("POST", data={"data": overpass_query})
+        response.raise_for_status()
+        
+        with metrics.stage("overpass_parse"):
+            data = response.json()
+            
+            result: Dict[Tile, List[Dict]] = {tile: [] for tile in tiles}
+            for element in data.get("elements", []):
+                if element.get("lat") is None or element.get("lon") is None:
+                    continue
+                tile = lat_lng_to_tile(element["lat"], element["lon"], zoom)
+                if tile in result:
+                    result[tile].append({
+                        "type": element.get("type", "node"),
+                        "id": element.get("id"),
+                        "lat": element["lat"],
+                        "lon": element["lon"],
+                        "tags": element.get("tags", {})
+                    })
         
-        # Thêm thông tin từ description tag nếu có
-        if description:
-            base_desc += f". {description}"
+        with metrics.stage("poi_tile_cache_write"):
+            for tile, elements in result.items():
+                self.poi_tile_cache.set(tile_key(tile, zoom), elements, ttl=POI_TILE_TTL)
         
-        return base_desc
+        return result
     
     
-    def _get_fallback_pois(self, lat: float, lng: float) -> List[Dict]:
+    def _get_fallback_pois(self, lat: float, lng: float, lang: str = DEFAULT_LANG) -> List[Dict]:
         """Trả về danh sách POI mẫu khi không tìm được"""
+        offsets = [(0.01, 0.01), (-0.01, 0.01), (0.01, -0.01), (-0.01, -0.01), (0, 0)]
         return [
             {
-                "name": "Địa điểm 1",
-                "description": "Điểm tham quan thú vị gần đây",
-                "coordinates": {"lat": lat + 0.01, "lng": lng + 0.01}
-            },
-            {
-                "name": "Địa điểm 2", 
-                "description": "Khu vực văn hóa lịch sử",
-                "coordinates": {"lat": lat - 0.01, "lng": lng + 0.01}
-            },
-            {
-                "name": "Địa điểm 3",
-                "description": "Điểm du lịch nổi tiếng",
-                "coordinates": {"lat": lat + 0.01, "lng": lng - 0.01}
-            },
-            {
-                "name": "Địa điểm 4",
-                "description": "Cảnh quan thiên nhiên đẹp",
-                "coordinates": {"lat": lat - 0.01, "lng": lng - 0.01}
-            },
-            {
-                "name": "Địa điểm 5",
-                "description": "Khu vực ẩm thực đặc sản",
-                "coordinates": {"lat": lat, "lng": lng}
+                "name": phrase("poi.sample", lang, str(i)),
+                "description": phrase(f"poi.sample.{i}", lang),
+                "coordinates": {"lat": lat + dlat, "lng": lng + dlng}
             }
+            for i, (dlat, dlng) in enumerate(offsets, start=1)
         ]
     
     
-    async def get_weather(self, lat: float, lng: float) -> Optional[Dict]:
+    async def get_weather(self, lat: float, lng: float, lang: str = DEFAULT_LANG) -> Optional[Dict]:
         """
         Lấy thông tin thời tiết hiện tại
         Sử dụng Open-Meteo API (miễn phí, không cần API key)
@@ -221,49 +553,167 @@ class LocationService:
         Args:
             lat: Vĩ độ
             lng: Kinh độ
+            lang: Ngôn ngữ của mô tả (vi, en)
             
         Returns:
             Dict với temperature, description, icon
         """
-        try:
-            url = f"{self.weather_api}?latitude={lat}&longitude={lng}&current=temperature_2m,weather_code"
-            
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            current = data.get("current", {})
-            
-            temperature = round(current.get("temperature_2m", 0))
-            weather_code = current.get("weather_code", 0)
-            
-            # Map weather code sang icon và mô tả
-            weather_info = self._map_weather_code(weather_code)
-            
-            return {
-                "temperature": temperature,
-                "description": weather_info["description"],
-                "icon": weather_info["icon"]
-            }
+        results = await self.get_weather_batch([(lat, lng)], lang)
+        return results[0]
+    
+    
+    async def get_weather_batch(
+        self,
+        coordinates: List[Tuple[float, float]],
+        lang: str = DEFAULT_LANG
+    ) -> List[Optional[Dict]]:
+        """
+        Lấy thời tiết hiện tại cho nhiều tọa độ
+        Tọa độ được quy về ô lưới của weather cache; chỉ các ô chưa có trong cache
+        (và chưa có lời gọi nào đang chạy) mới được gửi lên Open-Meteo trong một lời gọi
+        
+        Args:
+            coordinates: List (lat, lng)
+            lang: Ngôn ngữ của mô tả (vi, en); cache lưu weather code nên dùng chung mọi ngôn ngữ
             
-        except Exception as e:
-            print(f"Weather error: {e}")
-            return None
+        Returns:
+            List weather (hoặc None nếu lỗi) theo đúng thứ tự đầu vào
+        """
+        cache = self.weather_cache
+        keys = [cache.key(lat, lng) for lat, lng in coordinates]
+        
+        resolved: Dict[str, Optional[Dict]] = {}
+        centers: Dict[str, Tuple[float, float]] = {}
+        for key, (lat, lng) in zip(keys, coordinates):
+            if key in resolved or key in centers:
+                continue
+            found, weather = cache.get(key)
+            if found:
+                resolved[key] = weather
+            else:
+                centers[key] = cache.snap(lat, lng)
+        
+        if centers:
+            resolved.update(await self._load_weather(centers))
+        
+        return [self._localize_weather(resolved[key], lang) for key in keys]
     
     
-    def _map_weather_code(self, code: int) -> Dict[str, str]:
-        """Map WMO weather code sang mô tả và icon"""
-        weather_map = {
-            0: {"description": "Trời quang", "icon": "☀️"},
-            1: {"description": "Ít mây", "icon": "🌤️"},
-            2: {"description": "Mây rải rác", "icon": "☁️"},
-            3: {"description": "U ám", "icon": "🌥️"},
-            45: {"description": "Sương mù", "icon": "🌫️"},
-            48: {"description": "Sương mù", "icon": "🌫️"},
-            51: {"description": "Mưa phùn", "icon": "🌦️"},
-            61: {"description": "Mưa", "icon": "🌧️"},
-            80: {"description": "Mưa rào", "icon": "⛈️"},
-            95: {"description": "Dông", "icon": "🌩️"},
-        }
+    async def _load_weather(self, centers: Dict[str, Tuple[float, float]]) -> Dict[str, Optional[Dict]]:
+        """
+        Lấy thời tiết từ Open-Meteo cho các ô (khóa cache -> tâm ô) và ghi cache
+        Ô đang được request khác lấy thì chờ chung, còn lại gộp 1 lời gọi
+        """
+        cache = self.weather_cache
+        
+        async def fetch(missing: List[str]) -> Dict[str, Optional[Dict]]:
+            fetched = await self._fetch_weather([centers[key] for key in missing])
+            results: Dict[str, Optional[Dict]] = {}
+            for key, item in zip(missing, fetched):
+                if item is not None:
+                    weather, current = item
+                    cache.set(key, weather, current)
+                    results[key] = weather
+                else:
+                    # Open-Meteo lỗi/bị ngắt: dùng tạm số liệu cũ nếu còn
+                    found, stale = cache.get(key, allow_stale=True)
+                    results[key] = stale if found else None
+            return results
+        
+        return await self.weather_flight.do_many(centers, fetch)
+    
+    
+    async def _fetch_weather(self, coordinates: List[Tuple[float, float]]) -> List[Optional[Tuple[Dict, Dict]]]:
+        """
+        Gọi Open-Meteo cho nhiều tọa độ (latitude/longitude dạng danh sách
+        phân tách bằng dấu phẩy), chia thành các lô tối đa WEATHER_BATCH_SIZE
+        
+        Returns:
+            List (weather, block "current" gốc) hoặc None nếu lỗi, theo thứ tự đầu vào
+        """
+        results: List[Optional[Tuple[Dict, Dict]]] = []
+        for start in range(0, len(coordinates), WEATHER_BATCH_SIZE):
+            chunk = coordinates[start:start + WEATHER_BATCH_SIZE]
+            try:
+                self.weather_cache.record_upstream()
+                response = await self.open_meteo.request(
+                    "GET",
+                    params={
+                        "latitude": ",".join(str(lat) for lat, _ in chunk),
+                        "longitude": ",".join(str(lng) for _, lng in chunk),
+                        "current": "temperature_2m,weather_code"
+                    }
+                )
+                response.raise_for_status()
+                
+                data = response.json()
+                # Một tọa độ: Open-Meteo trả về object, nhiều tọa độ: trả về list
+                locations = data if isinstance(data, list) else [data]
+                if len(locations) != len(chunk):
+                    raise ValueError(f"Open-Meteo trả về {len(locations)} kết quả cho {len(chunk)} tọa độ")
+                
+                for location in locations:
+                    current = location.get("current", {})
+                    results.append((self._parse_weather(current), current))
+                
+            except Exception as e:
+                logger.warning("Weather error: %s", e)
+                results.extend([None] * len(chunk))
         
-        return weather_map.get(code, {"description": "Không xác định", "icon": "🤷"})
+        return results
+    
+    
+    def weather_ttl(self, coordinates: List[Tuple[float, float]]) -> float:
+        """
+        Số giây nhỏ nhất tới khi số liệu thời tiết của các tọa độ hết hạn trong cache
+        (dùng cho Cache-Control); ô không có trong cache tính là MIN_TTL
+        """
+        remaining = [self.weather_cache.ttl(self.weather_cache.key(lat, lng)) for lat, lng in coordinates]
+        return min((ttl if ttl is not None else WEATHER_MIN_TTL for ttl in remaining), default=WEATHER_MIN_TTL)
+    
+    
+    def weather_cell_ttls(self, coordinates: List[Tuple[float, float]]) -> Dict[Tuple[float, float], Optional[float]]:
+        """
+        Số giây tới khi số liệu thời tiết của từng ô lưới chứa các tọa độ hết hạn
+        (dùng cho prefetch); khóa là tâm ô, None nếu ô chưa có hoặc đã hết hạn
+        """
+        cache = self.weather_cache
+        return {
+            cache.snap(lat, lng): cache.ttl(cache.key(lat, lng))
+            for lat, lng in coordinates
+        }
+    
+    
+    async def refresh_weather(self, coordinates: List[Tuple[float, float]]):
+        """
+        Gọi lại Open-Meteo cho các ô lưới chứa các tọa độ (một lời gọi) và ghi đè
+        cache kể cả khi số liệu còn hạn (dùng cho prefetch)
+        """
+        cache = self.weather_cache
+        centers = {cache.key(lat, lng): cache.snap(lat, lng) for lat, lng in coordinates}
+        if centers:
+            await self._load_weather(centers)
+    
+    
+    async def attach_weather(self, pois: List[Dict], lang: str = DEFAULT_LANG) -> List[Dict]:
+        """Điền trường weather cho danh sách POI bằng một lời gọi batch"""
+        if not pois:
+            return pois
+        coordinates = [(poi["coordinates"]["lat"], poi["coordinates"]["lng"]) for poi in pois]
+        weather = await self.get_weather_batch(coordinates, lang)
+        return [{**poi, "weather": info} for poi, info in zip(pois, weather)]
+    
+    
+    def _parse_weather(self, current: Dict) -> Dict:
+        """Chuyển block "current" của Open-Meteo sang temperature và weather code (giá trị được cache)"""
+        return {
+            "temperature": round(current.get("temperature_2m", 0)),
+            "weather_code": current.get("weather_code", 0)
+        }
+    
+    
+    def _localize_weather(self, weather: Optional[Dict], lang: str) -> Optional[Dict]:
+        """Weather code -> temperature, description (theo ngôn ngữ), icon"""
+        if weather is None:
+            return None
+        return {"temperature": weather["temperature"], **weather_phrase(weather["weather_code"], lang)}
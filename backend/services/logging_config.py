@@ -0,0 +1,62 @@
+"""
+Logging - Cấu hình log dùng chung cho app và các service:
+- LOG_FORMAT=json: mỗi dòng một JSON (thời gian, level, logger, message và các
+  trường truyền qua extra=...), dễ lọc/truy vấn trên nền tảng log
+- LOG_FORMAT=text (mặc định): dạng dòng dễ đọc khi phát triển local
+- LOG_LEVEL: mức log (mặc định INFO)
+"""
+
+import json
+import logging
+import os
+import time
+
+
+# Thuộc tính có sẵn của LogRecord, không phải trường truyền qua extra
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Mỗi bản ghi log thành một dòng JSON, kèm các trường extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """
+    Cấu hình root logger (gọi một lần khi app khởi động)
+
+    Args:
+        level: Mức log, mặc định LOG_LEVEL hoặc INFO
+        fmt: "json" hoặc "text", mặc định LOG_FORMAT hoặc text
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # httpx log mọi request ở mức INFO: quá nhiều cho production
+    for noisy in ("httpx", "httpcore"):
+        logging.getLogger(noisy).setLevel(max(logging.WARNING, root.level))
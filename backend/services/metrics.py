@@ -0,0 +1,402 @@
+"""
+Metrics - Bộ đo nhẹ cho hot path, xuất ở /metrics theo Prometheus text format 0.0.4:
+- Counter, Gauge, Histogram có label; mỗi lần ghi chỉ là vài phép cộng (histogram
+  tìm bucket bằng bisect) nên để bật thường trực trong production được
+- Collector: hàm chạy lúc scrape, chuyển các bộ đếm sẵn có (cache, batcher, breaker)
+  thành metric mà không tốn gì thêm trên đường xử lý request
+- MetricsMiddleware (ASGI thuần): độ trễ, số request và số request đang xử lý theo route
+- InstrumentedRoute: tách thời gian hàm endpoint khỏi phần validate request +
+  serialize response (Pydantic) của FastAPI
+Số liệu tính riêng cho từng process (mỗi worker gunicorn một bộ)
+"""
+
+import abc
+import functools
+import inspect
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+
+# Bucket mặc định (giây): từ vài trăm micro giây (tra cache) tới vài chục giây (Overpass)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Sample(NamedTuple):
+    suffix: str
+    labels: Dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    """Một metric cùng các sample của nó (đơn vị xuất ra của collector)"""
+    name: str
+    kind: str
+    documentation: str
+    samples: List[Sample]
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, labels: Dict[str, str]) -> List[Sample]:
+        return [Sample("_total", labels, self.value)]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self, labels: Dict[str, str]) -> List[Sample]:
+        return [Sample("", labels, self.value)]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # counts[i] = số mẫu rơi vào đúng bucket i (bucket cuối là +Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, labels: Dict[str, str]) -> List[Sample]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), self.counts):
+            cumulative += count
+            samples.append(Sample("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append(Sample("_sum", labels, self.sum))
+        samples.append(Sample("_count", labels, cumulative))
+        return samples
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Child mới cho một bộ giá trị label"""
+
+    def labels(self, *values) -> object:
+        """Child theo giá trị label (theo đúng thứ tự labelnames); nên giữ lại child để dùng lại"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} cần label {self.labelnames}, nhận {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def collect(self) -> MetricFamily:
+        samples = []
+        for key, child in list(self._children.items()):
+            samples.extend(child.samples(dict(zip(self.labelnames, key))))
+        return MetricFamily(self.name, self.kind, self.documentation, samples)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Module bị import lại (VD: reload): dùng lại metric đã có
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """Đăng ký hàm trả về các MetricFamily, gọi mỗi lần scrape"""
+        self._collectors.append(collector)
+
+    def collect(self) -> Iterator[MetricFamily]:
+        for metric in list(self._metrics.values()):
+            yield metric.collect()
+        for collector in self._collectors:
+            yield from collector()
+
+    def render(self) -> str:
+        """Toàn bộ metric theo Prometheus text format"""
+        lines = []
+        for family in self.collect():
+            name = family.name
+            if family.kind == "counter" and name.endswith("_total"):
+                # Tên family của counter không có hậu tố _total (sample mới có)
+                name = name[:-len("_total")]
+            lines.append(f"# HELP {name} {family.documentation}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for suffix, labels, value in family.samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Các công đoạn trên hot path (parse JSON Overpass, xếp hạng, sinh mô tả, ...)
+STAGE_SECONDS = REGISTRY.histogram(
+    "app_stage_duration_seconds", "Thời gian của từng công đoạn xử lý", ["stage"]
+)
+
+
+def stage(name: str):
+    """
+    Đo thời gian một công đoạn
+
+    VD:
+        with metrics.stage("poi_describe"):
+            ...
+    """
+    return STAGE_SECONDS.labels(name).time()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: Registry = REGISTRY):
+        """
+        Middleware ASGI đo mọi request HTTP theo route (template, không phải path thật
+        để số label không tăng theo dữ liệu người dùng)
+        """
+        self.app = app
+        self.requests = registry.counter(
+            "http_requests_total", "Số request HTTP đã xử lý", ["method", "route", "status"]
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Thời gian xử lý request HTTP (tới byte cuối)", ["method", "route"]
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "Số request HTTP đang xử lý", ["route"]
+        )
+        # (method, path) -> route template; giới hạn kích thước vì path do client gửi lên
+        self._route_cache: Dict[Tuple[str, str], str] = {}
+
+    def _route(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        route_path = self._route_cache.get(key)
+        if route_path is None:
+            route_path = "unmatched"
+            for route in scope["app"].router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    route_path = getattr(route, "path", "unmatched")
+                    break
+            if len(self._route_cache) < 1024:
+                self._route_cache[key] = route_path
+        return route_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = self.in_flight.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            self.latency.labels(method, route).observe(time.perf_counter() - start)
+            self.requests.labels(method, route, status).inc()
+
+
+ENDPOINT_SECONDS = REGISTRY.histogram(
+    "http_endpoint_duration_seconds", "Thời gian chạy hàm endpoint (không gồm validate/serialize)", ["route"]
+)
+FRAMEWORK_SECONDS = REGISTRY.histogram(
+    "http_framework_duration_seconds", "Thời gian validate request + serialize response của FastAPI", ["route"]
+)
+
+# Thời gian hàm endpoint của request hiện tại (endpoint async chạy trong cùng task với route)
+_endpoint_seconds: ContextVar[List[float]] = ContextVar("endpoint_seconds")
+
+
+def _timed_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _endpoint_seconds.get(None)
+            if timings is not None:
+                timings.append(time.perf_counter() - start)
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    Route FastAPI đo riêng hàm endpoint và phần còn lại (parse/validate body,
+    serialize response_model) - dùng: app.router.route_class = InstrumentedRoute
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # functools.wraps giữ nguyên signature nên FastAPI vẫn đọc được tham số
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def instrumented(request):
+            timings: List[float] = []
+            token = _endpoint_seconds.set(timings)
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                total = time.perf_counter() - start
+                _endpoint_seconds.reset(token)
+                if timings:
+                    ENDPOINT_SECONDS.labels(self.path).observe(timings[0])
+                    FRAMEWORK_SECONDS.labels(self.path).observe(max(0.0, total - timings[0]))
+
+        return instrumented
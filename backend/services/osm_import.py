@@ -0,0 +1,179 @@
+"""
+OSM Import - Nhập hàng loạt POI từ bản trích OSM vào kho POI offline:
+- Đọc dạng stream (bộ nhớ không phụ thuộc kích thước file đầu vào)
+- Hỗ trợ Overpass JSON dump và .osm.pbf (cần cài pyosmium; node và way, chưa có relation)
+- Báo cáo throughput (element/giây) và peak RSS để định cỡ job chạy hằng đêm
+
+Chạy từ thư mục backend:
+    python -m services.osm_import vietnam-latest.osm.pbf data/pois.store
+    python -m services.osm_import overpass_dump.json data/pois.store
+"""
+
+import argparse
+import json
+import re
+import resource
+import sys
+import time
+from typing import Dict, Iterator
+
+from services.poi_store import PoiStoreWriter, is_poi
+
+
+_SKIP_RE = re.compile(r"[\s,]*")
+
+
+def iter_overpass_json(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Duyệt từng element trong mảng "elements" của Overpass JSON mà không nạp cả file
+
+    Args:
+        path: Đường dẫn file JSON
+        chunk_size: Số ký tự đọc mỗi lần
+
+    Yields:
+        Từng element (dict)
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        # Tìm tới dấu "[" mở đầu mảng elements
+        buffer = ""
+        while True:
+            key = buffer.find('"elements"')
+            bracket = buffer.find("[", key) if key >= 0 else -1
+            if bracket >= 0:
+                pos = bracket + 1
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            # Giữ lại phần đuôi phòng khi khóa "elements" bị cắt giữa 2 chunk
+            buffer = (buffer[key:] if key >= 0 else buffer[-16:]) + chunk
+
+        while True:
+            pos = _SKIP_RE.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                element, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element bị cắt ở cuối buffer: đọc thêm rồi thử lại
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield element
+
+
+def iter_pbf(path: str) -> Iterator[Dict]:
+    """
+    Duyệt các node và way có tag du lịch trong file .osm.pbf (cần pyosmium >= 3.7)
+
+    Way được quy về tâm (trung bình tọa độ các node, như "out center" của Overpass).
+    Relation (VD multipolygon khu di tích) chưa được hỗ trợ vì cần ghép hình học từ
+    các way thành viên; dùng Overpass JSON dump nếu cần cả relation.
+
+    Yields:
+        Element dạng Overpass (type, id, lat, lon, tags)
+    """
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Đọc .osm.pbf cần cài pyosmium: pip install osmium")
+
+    # with_locations() gắn tọa độ vào node ref của way (chỉ mục vị trí node trong bộ nhớ)
+    processor = osmium.FileProcessor(path, osmium.osm.NODE | osmium.osm.WAY).with_locations()
+    for obj in processor:
+        # Lọc sớm trên tags trước khi tạo dict để giữ throughput cao
+        tags = obj.tags
+        if not ("tourism" in tags or "historic" in tags or "natural" in tags):
+            continue
+
+        if obj.is_node():
+            if not obj.location.valid():
+                continue
+            element_type, lat, lon = "node", obj.location.lat, obj.location.lon
+        else:
+            refs = [ref for ref in obj.nodes if ref.location.valid()]
+            # Way khép kín lặp lại node đầu ở cuối, bỏ đi để không lệch tâm
+            if len(refs) > 1 and refs[0].ref == refs[-1].ref:
+                refs.pop()
+            if not refs:
+                continue
+            element_type = "way"
+            lat = sum(ref.lat for ref in refs) / len(refs)
+            lon = sum(ref.lon for ref in refs) / len(refs)
+
+        yield {
+            "type": element_type,
+            "id": obj.id,
+            "lat": lat,
+            "lon": lon,
+            "tags": {tag.k: tag.v for tag in tags},
+        }
+
+
+def import_extract(input_path: str, output_path: str, progress_every: int = 100_000) -> Dict:
+    """
+    Nhập POI từ bản trích OSM và ghi kho POI
+
+    Returns:
+        Dict thống kê: scanned, kept, seconds, elements_per_sec, peak_rss_mb
+    """
+    if input_path.endswith(".pbf"):
+        elements = iter_pbf(input_path)
+    else:
+        elements = iter_overpass_json(input_path)
+
+    writer = PoiStoreWriter()
+    scanned = 0
+    start = time.perf_counter()
+
+    for element in elements:
+        scanned += 1
+        if progress_every and scanned % progress_every == 0:
+            print(f"... {scanned:,} elements, giữ {len(writer):,}", file=sys.stderr)
+
+        tags = element.get("tags") or {}
+        if not is_poi(tags):
+            continue
+
+        # Way/relation xuất bằng "out center" có tọa độ trong "center"
+        lat = element.get("lat", element.get("center", {}).get("lat"))
+        lon = element.get("lon", element.get("center", {}).get("lon"))
+        if lat is None or lon is None:
+            continue
+
+        writer.add(element["id"], lat, lon, tags, element.get("type", "node"))
+
+    writer.save(output_path)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss tính bằng KB trên Linux, byte trên macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+    return {
+        "scanned": scanned,
+        "kept": len(writer),
+        "seconds": round(seconds, 2),
+        "elements_per_sec": round(scanned / seconds) if seconds > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhập POI từ bản trích OSM vào kho POI offline")
+    parser.add_argument("input_path", help="File .osm.pbf hoặc Overpass JSON")
+    parser.add_argument("output_path", help="File kho POI đầu ra (VD: data/pois.store)")
+    args = parser.parse_args()
+
+    stats = import_extract(args.input_path, args.output_path)
+    for key, value in stats.items():
+        print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Phrases - Bộ câu mô tả dịch sẵn (vi/en) cho nội dung do server tự sinh:
+- Mô tả POI theo loại địa điểm (phân loại OSM tags bằng bảng luật, biên dịch một lần)
+- Mô tả thời tiết theo WMO weather code
+Trả về ngôn ngữ được yêu cầu mà không cần chạy model dịch; chỉ phần
+description tự do của OSM là giữ nguyên văn
+"""
+
+from typing import Dict, Optional, Tuple
+
+
+LANGUAGES = ("vi", "en")
+DEFAULT_LANG = "vi"
+
+
+# Câu theo ngôn ngữ; {value} là giá trị tag OSM (VD: "Di tích lịch sử - pagoda")
+PHRASES: Dict[str, Dict[str, str]] = {
+    "tourism.attraction": {
+        "vi": "Điểm tham quan du lịch nổi tiếng",
+        "en": "Famous tourist attraction",
+    },
+    "tourism.museum": {
+        "vi": "Bảo tàng lưu giữ di sản văn hóa và lịch sử",
+        "en": "Museum preserving cultural and historical heritage",
+    },
+    "tourism.viewpoint": {
+        "vi": "Điểm ngắm cảnh đẹp, view panorama tuyệt vời",
+        "en": "Scenic viewpoint with a stunning panoramic view",
+    },
+    "tourism.artwork": {
+        "vi": "Tác phẩm nghệ thuật công cộng, điểm check-in độc đáo",
+        "en": "Public artwork, a unique photo spot",
+    },
+    "tourism.gallery": {
+        "vi": "Phòng tranh nghệ thuật, triển lãm đa dạng",
+        "en": "Art gallery with diverse exhibitions",
+    },
+    "historic.memorial": {
+        "vi": "Đài tưởng niệm lịch sử, nơi tôn vinh các anh hùng dân tộc",
+        "en": "Historical memorial honoring national heroes",
+    },
+    "historic.monument": {
+        "vi": "Di tích lịch sử quan trọng, kiến trúc đặc sắc",
+        "en": "Important historical monument with distinctive architecture",
+    },
+    "historic.archaeological_site": {
+        "vi": "Khu di tích khảo cổ học, dấu tích văn minh cổ đại",
+        "en": "Archaeological site with traces of ancient civilization",
+    },
+    "historic.castle": {
+        "vi": "Lâu đài cổ kính, kiến trúc thời phong kiến",
+        "en": "Ancient castle with feudal-era architecture",
+    },
+    "historic.ruins": {
+        "vi": "Tàn tích lịch sử, dấu vết của thời gian",
+        "en": "Historical ruins, traces of times past",
+    },
+    "natural.beach": {
+        "vi": "Bãi biển đẹp, cát trắng nước trong, lý tưởng để nghỉ dưỡng",
+        "en": "Beautiful beach with white sand and clear water, ideal for relaxing",
+    },
+    "natural.cave": {
+        "vi": "Hang động tự nhiên, khám phá thạch nhũ kỳ thú",
+        "en": "Natural cave with fascinating stalactites to explore",
+    },
+    "natural.peak": {
+        "vi": "Đỉnh núi hùng vĩ, chinh phục và ngắm cảnh từ trên cao",
+        "en": "Majestic peak to climb and enjoy the view from above",
+    },
+    "natural.waterfall": {
+        "vi": "Thác nước hùng vĩ, khung cảnh thiên nhiên tuyệt đẹp",
+        "en": "Majestic waterfall in beautiful natural scenery",
+    },
+    "amenity.place_of_worship": {
+        "vi": "Nơi thờ cúng tâm linh, kiến trúc tôn giáo độc đáo",
+        "en": "Place of worship with unique religious architecture",
+    },
+    "fallback.tourism": {
+        "vi": "Địa điểm du lịch thú vị - {value}",
+        "en": "Interesting tourist spot - {value}",
+    },
+    "fallback.historic": {
+        "vi": "Di tích lịch sử - {value}",
+        "en": "Historic site - {value}",
+    },
+    "fallback.natural": {
+        "vi": "Kỳ quan thiên nhiên - {value}",
+        "en": "Natural wonder - {value}",
+    },
+    "fallback.default": {
+        "vi": "Địa điểm đáng khám phá tại Việt Nam",
+        "en": "A place worth exploring in Vietnam",
+    },
+    "poi.unnamed": {
+        "vi": "Địa điểm không tên",
+        "en": "Unnamed place",
+    },
+    "poi.sample": {
+        "vi": "Địa điểm {value}",
+        "en": "Place {value}",
+    },
+    "poi.sample.1": {
+        "vi": "Điểm tham quan thú vị gần đây",
+        "en": "Interesting attraction nearby",
+    },
+    "poi.sample.2": {
+        "vi": "Khu vực văn hóa lịch sử",
+        "en": "Cultural and historical area",
+    },
+    "poi.sample.3": {
+        "vi": "Điểm du lịch nổi tiếng",
+        "en": "Famous tourist destination",
+    },
+    "poi.sample.4": {
+        "vi": "Cảnh quan thiên nhiên đẹp",
+        "en": "Beautiful natural scenery",
+    },
+    "poi.sample.5": {
+        "vi": "Khu vực ẩm thực đặc sản",
+        "en": "Local specialty food area",
+    },
+    "weather.clear": {"vi": "Trời quang", "en": "Clear sky"},
+    "weather.mainly_clear": {"vi": "Ít mây", "en": "Mainly clear"},
+    "weather.partly_cloudy": {"vi": "Mây rải rác", "en": "Partly cloudy"},
+    "weather.overcast": {"vi": "U ám", "en": "Overcast"},
+    "weather.fog": {"vi": "Sương mù", "en": "Fog"},
+    "weather.drizzle": {"vi": "Mưa phùn", "en": "Drizzle"},
+    "weather.rain": {"vi": "Mưa", "en": "Rain"},
+    "weather.showers": {"vi": "Mưa rào", "en": "Rain showers"},
+    "weather.thunderstorm": {"vi": "Dông", "en": "Thunderstorm"},
+    "weather.unknown": {"vi": "Không xác định", "en": "Unknown"},
+}
+
+
+# Luật phân loại theo thứ tự ưu tiên (giống chuỗi if/elif trước đây):
+# luật đứng trước thắng khi POI khớp nhiều luật
+DESCRIPTION_RULES = [
+    ("tourism", "attraction"),
+    ("tourism", "museum"),
+    ("tourism", "viewpoint"),
+    ("tourism", "artwork"),
+    ("tourism", "gallery"),
+    ("historic", "memorial"),
+    ("historic", "monument"),
+    ("historic", "archaeological_site"),
+    ("historic", "castle"),
+    ("historic", "ruins"),
+    ("natural", "beach"),
+    ("natural", "cave"),
+    ("natural", "peak"),
+    ("natural", "waterfall"),
+    ("amenity", "place_of_worship"),
+]
+
+# Không khớp luật nào: mô tả chung theo tag đầu tiên có giá trị
+FALLBACK_TAGS = ("tourism", "historic", "natural")
+
+# WMO weather code -> (câu mô tả, icon)
+WEATHER_CODES: Dict[int, Tuple[str, str]] = {
+    0: ("weather.clear", "☀️"),
+    1: ("weather.mainly_clear", "🌤️"),
+    2: ("weather.partly_cloudy", "☁️"),
+    3: ("weather.overcast", "🌥️"),
+    45: ("weather.fog", "🌫️"),
+    48: ("weather.fog", "🌫️"),
+    51: ("weather.drizzle", "🌦️"),
+    61: ("weather.rain", "🌧️"),
+    80: ("weather.showers", "⛈️"),
+    95: ("weather.thunderstorm", "🌩️"),
+}
+UNKNOWN_WEATHER = ("weather.unknown", "🤷")
+
+
+def phrase(phrase_id: str, lang: str = DEFAULT_LANG, value: str = "") -> str:
+    """
+    Lấy câu theo ngôn ngữ (ngôn ngữ không hỗ trợ thì dùng tiếng Việt)
+
+    Args:
+        phrase_id: Khóa trong PHRASES (VD: "tourism.museum")
+        lang: Mã ngôn ngữ (vi, en)
+        value: Giá trị điền vào {value} nếu câu có chỗ trống
+    """
+    texts = PHRASES[phrase_id]
+    text = texts.get(lang) or texts[DEFAULT_LANG]
+    return text.format(value=value) if "{value}" in text else text
+
+
+class TagClassifier:
+    def __init__(self, rules=DESCRIPTION_RULES, fallback_tags=FALLBACK_TAGS):
+        """
+        Biên dịch bảng luật thành dict (tag, value) -> (thứ tự ưu tiên, câu mô tả)
+        để mỗi POI chỉ cần vài lần tra dict thay vì duyệt cả chuỗi điều kiện
+        """
+        self._rules: Dict[Tuple[str, str], Tuple[int, str]] = {
+            (tag, value): (priority, f"{tag}.{value}")
+            for priority, (tag, value) in enumerate(rules)
+        }
+        self._tags = tuple(dict.fromkeys(tag for tag, _ in rules))
+        self._fallback_tags = fallback_tags
+
+    def classify(self, tags: Dict[str, str]) -> Tuple[str, str]:
+        """
+        Phân loại POI theo OSM tags
+
+        Returns:
+            (phrase_id, value điền vào câu fallback)
+        """
+        best: Optional[Tuple[int, str]] = None
+        for tag in self._tags:
+            value = tags.get(tag)
+            if value:
+                match = self._rules.get((tag, value))
+                if match is not None and (best is None or match[0] < best[0]):
+                    best = match
+        if best is not None:
+            return best[1], ""
+
+        for tag in self._fallback_tags:
+            value = tags.get(tag)
+            if value:
+                return f"fallback.{tag}", value
+        return "fallback.default", ""
+
+    def describe(self, tags: Dict[str, str], lang: str = DEFAULT_LANG) -> str:
+        """
+        Mô tả POI theo ngôn ngữ yêu cầu; description tự do của OSM (nếu có)
+        được nối vào sau nguyên văn, không dịch
+
+        Args:
+            tags: OSM tags của POI
+            lang: Mã ngôn ngữ (vi, en)
+        """
+        phrase_id, value = self.classify(tags)
+        text = phrase(phrase_id, lang, value)
+        description = tags.get("description", "")
+        if description:
+            text += f". {description}"
+        return text
+
+
+def weather(code: int, lang: str = DEFAULT_LANG) -> Dict[str, str]:
+    """Mô tả và icon cho WMO weather code theo ngôn ngữ"""
+    phrase_id, icon = WEATHER_CODES.get(code, UNKNOWN_WEATHER)
+    return {"description": phrase(phrase_id, lang), "icon": icon}
@@ -0,0 +1,176 @@
+"""
+POI Store - Kho POI offline dạng cột (columnar), nạp sẵn từ bản trích OSM:
+- Mỗi cột là một array kiểu cố định (id, loại element, lat, lon, chỉ số chuỗi của từng tag)
+- Giá trị tag được mã hóa từ điển (string table) nên chuỗi lặp lại chỉ lưu một lần
+- Chỉ giữ các tag mà LocationService dùng để đặt tên và tạo mô tả
+
+Bố cục file: 1 dòng header JSON, sau đó là các array nhị phân theo thứ tự
+ids, types, lats, lons, rồi một cột chỉ số cho mỗi tag trong KEPT_TAGS, cuối cùng là
+string table (các chuỗi UTF-8 nối nhau, phân tách bằng "\\0").
+Id của node, way và relation trong OSM trùng nhau được nên element được định danh
+bằng cặp (type, id); file version 1 (không có cột types) chỉ chứa node.
+Từ version 3 các hàng được ghi theo thứ tự KD-tree ngầm định (spatial_index.kd_order)
+để StoreIndex truy vấn thẳng trên cột mà không phải dựng cây khi nạp.
+"""
+
+import json
+import logging
+from array import array
+from typing import Dict, Iterator, List
+
+from services.spatial_index import kd_order
+
+
+logger = logging.getLogger(__name__)
+
+
+# Các tag được giữ lại (name để hiển thị, còn lại cho TagClassifier trong services/phrases.py)
+KEPT_TAGS = (
+    "name", "tourism", "historic", "natural", "amenity",
+    "description", "wikipedia", "wikidata",
+)
+
+# Bộ lọc POI, khớp với Overpass query trong LocationService
+TOURISM_VALUES = frozenset({"attraction", "museum", "viewpoint", "artwork", "gallery"})
+NATURAL_VALUES = frozenset({"beach", "cave", "peak", "waterfall"})
+
+MAGIC = "vn-poi-store"
+VERSION = 3
+
+# Loại element OSM, lưu dạng mã 1 byte trong cột types
+ELEMENT_TYPES = ("node", "way", "relation")
+_TYPE_CODES = {name: code for code, name in enumerate(ELEMENT_TYPES)}
+
+
+def is_poi(tags: Dict) -> bool:
+    """Element có phải POI du lịch cần giữ không"""
+    return (
+        tags.get("tourism") in TOURISM_VALUES
+        or bool(tags.get("historic"))
+        or tags.get("natural") in NATURAL_VALUES
+    )
+
+
+def _reorder(column: array, order: List[int]) -> array:
+    """Bản sao của cột theo thứ tự hàng mới"""
+    return array(column.typecode, [column[row] for row in order])
+
+
+class PoiStoreWriter:
+    def __init__(self):
+        """Bộ ghi kho POI: thêm từng element rồi save() một lần"""
+        self.ids = array("q")
+        self.types = array("B")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.columns = {tag: array("I") for tag in KEPT_TAGS}
+        # Chỉ số 0 dành cho "không có tag"
+        self.strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def add(self, element_id: int, lat: float, lon: float, tags: Dict, element_type: str = "node"):
+        """Thêm một POI (các tag ngoài KEPT_TAGS bị bỏ qua)"""
+        self.ids.append(element_id)
+        self.types.append(_TYPE_CODES[element_type])
+        self.lats.append(lat)
+        self.lons.append(lon)
+        for tag, column in self.columns.items():
+            # "\0" là ký tự phân tách trong string table
+            column.append(self._intern(tags.get(tag, "").replace("\0", "")))
+
+    def save(self, path: str):
+        """Ghi kho ra file (các hàng xếp theo thứ tự KD-tree)"""
+        order = kd_order(self.lats, self.lons)
+        strings_blob = "\0".join(self.strings).encode("utf-8")
+        header = {
+            "magic": MAGIC,
+            "version": VERSION,
+            "count": len(self.ids),
+            "tags": list(KEPT_TAGS),
+            "strings_bytes": len(strings_blob),
+        }
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for column in (self.ids, self.types, self.lats, self.lons, *(self.columns[tag] for tag in KEPT_TAGS)):
+                _reorder(column, order).tofile(f)
+            f.write(strings_blob)
+
+
+class PoiStore:
+    def __init__(self, path: str):
+        """
+        Nạp kho POI từ file do PoiStoreWriter ghi ra
+
+        Args:
+            path: Đường dẫn file kho POI
+        """
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            version = header.get("version")
+            if header.get("magic") != MAGIC or version not in (1, 2, VERSION):
+                raise ValueError(f"File kho POI không hợp lệ: {path}")
+
+            count = header["count"]
+            self.tags = header["tags"]
+            self.ids = array("q")
+            self.ids.fromfile(f, count)
+            self.types = array("B")
+            if version >= 2:
+                self.types.fromfile(f, count)
+            else:
+                # Kho version 1 chỉ chứa node
+                self.types.extend(bytes(count))
+            self.lats = array("d")
+            self.lats.fromfile(f, count)
+            self.lons = array("d")
+            self.lons.fromfile(f, count)
+            self.columns = {}
+            for tag in self.tags:
+                column = array("I")
+                column.fromfile(f, count)
+                self.columns[tag] = column
+            self.strings = f.read(header["strings_bytes"]).decode("utf-8").split("\0")
+
+        if version < 3:
+            # File cũ chưa xếp theo KD-tree: xếp lại một lần khi nạp
+            logger.warning("Kho POI %s là version %s, nên import lại để nạp nhanh hơn", path, version)
+            order = kd_order(self.lats, self.lons)
+            self.ids = _reorder(self.ids, order)
+            self.types = _reorder(self.types, order)
+            self.lats = _reorder(self.lats, order)
+            self.lons = _reorder(self.lons, order)
+            self.columns = {tag: _reorder(column, order) for tag, column in self.columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def element(self, row: int) -> Dict:
+        """Dựng lại element (type, id, lat, lon, tags) theo dạng Overpass trả về"""
+        tags = {}
+        for tag, column in self.columns.items():
+            string_id = column[row]
+            if string_id:
+                tags[tag] = self.strings[string_id]
+        return {
+            "type": ELEMENT_TYPES[self.types[row]],
+            "id": self.ids[row],
+            "lat": self.lats[row],
+            "lon": self.lons[row],
+            "tags": tags,
+        }
+
+    def iter_elements(self) -> Iterator[Dict]:
+        """Duyệt toàn bộ POI trong kho"""
+        for row in range(len(self.ids)):
+            yield self.element(row)
@@ -0,0 +1,413 @@
+"""
+Prefetch - Làm mới trước cache của các điểm đến được tìm nhiều, chạy nền trong lifespan:
+- PopularityTracker: đếm lượt truy vấn theo điểm đến từ traffic thật; điểm số giảm một
+  nửa sau mỗi half-life nên điểm đến hết "hot" tự rơi khỏi top
+- Prefetcher: mỗi chu kỳ duyệt top-N điểm đến, làm mới tọa độ, ô POI và thời tiết sắp
+  hết hạn qua các method của LocationService. Lời gọi upstream chạy ở mức ưu tiên nền
+  (request của người dùng đi trước trong rate limiter của từng upstream) và không quá
+  max_refreshes lời gọi mỗi chu kỳ
+- Đo được: mỗi khóa cache của điểm đến hot được ghi nhận là renewed (làm mới trước khi
+  hết hạn), expired (đã hết hạn trước khi kịp làm mới) hoặc cold (nạp lần đầu)
+- Chỉ một process làm mới (giữ flock trên PREFETCH_LOCK_PATH): N worker gunicorn không
+  gọi upstream N lần cho cùng khóa; dữ liệu mới đến các worker khác qua SQLite của cache.
+  Worker khác thử nhận khóa mỗi chu kỳ nên vẫn có người làm mới khi worker đó bị restart
+Số liệu tính riêng cho từng process (mỗi worker gunicorn theo dõi traffic của mình; traffic
+được chia đều nên top-N của một worker đại diện cho cả máy)
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from services import metrics
+from services.rate_limiter import background_priority
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có fcntl, mỗi process tự làm mới
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+HOT_KEYS = metrics.REGISTRY.counter(
+    "prefetch_hot_keys_total",
+    "Khóa cache của điểm đến hot theo trạng thái (renewed: làm mới trước khi hết hạn, "
+    "expired: hết hạn trước khi kịp làm mới, cold: nạp lần đầu)",
+    ["kind", "state"]
+)
+REFRESHES = metrics.REGISTRY.counter(
+    "prefetch_refreshes_total", "Số lời gọi upstream của prefetch", ["kind", "outcome"]
+)
+
+KINDS = ("geocode", "poi_tiles", "weather")
+KEY_STATES = ("renewed", "expired", "cold")
+
+# Làm mới khi dữ liệu còn hạn ít hơn (giây), tối thiểu 2 chu kỳ để không lỡ mốc.
+# Thời tiết: entry hết hạn UPDATE_SLACK (60s) sau mốc cập nhật của Open-Meteo, làm mới
+# trong khoảng đó mới lấy được số liệu mới (sớm hơn sẽ nhận lại đúng số liệu cũ)
+REFRESH_LEAD = {"geocode": 24 * 3600, "poi_tiles": 600, "weather": 30}
+
+# Tọa độ làm tròn 2 chữ số (~1km) khi gộp điểm đến: /api/coordinates rồi /api/pois
+# (tọa độ làm tròn 4 chữ số) cho cùng một địa điểm được tính là một điểm đến
+DESTINATION_DECIMALS = 2
+
+
+class Destination:
+    """Một điểm đến được theo dõi: tham số truy vấn lớn nhất từng gặp và điểm phổ biến"""
+
+    __slots__ = ("name", "lat", "lng", "radius_km", "limit", "weather", "static_name", "score", "updated")
+
+    def __init__(self, lat: float, lng: float):
+        self.name: Optional[str] = None
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = 0.0
+        self.limit = 0
+        self.weather = False
+        # Tọa độ lấy từ gazetteer offline: không hết hạn, không cần làm mới
+        self.static_name = False
+        self.score = 0.0
+        self.updated = 0.0
+
+    def decayed(self, now: float, half_life: float) -> float:
+        """Điểm phổ biến tại thời điểm now"""
+        return self.score * 0.5 ** ((now - self.updated) / half_life)
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "lat": self.lat,
+            "lng": self.lng,
+            "radius_km": self.radius_km,
+            "limit": self.limit,
+            "weather": self.weather,
+        }
+
+
+class PopularityTracker:
+    def __init__(self, half_life: float = 3600, max_destinations: int = 1000):
+        """
+        Args:
+            half_life: Thời gian (giây) để điểm của một lượt truy vấn giảm còn một nửa
+            max_destinations: Số điểm đến theo dõi tối đa (bỏ bớt điểm đến ít phổ biến nhất khi đầy)
+        """
+        self.half_life = half_life
+        self.max_destinations = max_destinations
+        self._destinations: Dict[Tuple[float, float], Destination] = {}
+
+    def __len__(self) -> int:
+        return len(self._destinations)
+
+    def record(
+        self,
+        lat: float,
+        lng: float,
+        name: Optional[str] = None,
+        radius_km: float = 0.0,
+        limit: int = 0,
+        weather: bool = False
+    ):
+        """
+        Ghi nhận một lượt truy vấn tới điểm đến
+
+        Args:
+            lat, lng: Tọa độ điểm đến
+            name: Tên địa điểm đã geocode ra tọa độ (nếu truy vấn theo tên)
+            radius_km, limit: Tham số tìm POI (0 = truy vấn không lấy POI)
+            weather: Truy vấn có lấy thời tiết cho các POI
+        """
+        now = time.time()
+        key = (round(lat, DESTINATION_DECIMALS), round(lng, DESTINATION_DECIMALS))
+        destination = self._destinations.get(key)
+        if destination is None:
+            if len(self._destinations) >= self.max_destinations:
+                self._prune(now)
+            destination = self._destinations[key] = Destination(lat, lng)
+
+        destination.score = destination.decayed(now, self.half_life) + 1
+        destination.updated = now
+        destination.lat, destination.lng = lat, lng
+        if name is not None and name != destination.name:
+            destination.name = name
+            destination.static_name = False
+        destination.radius_km = max(destination.radius_km, radius_km)
+        destination.limit = max(destination.limit, limit)
+        destination.weather = destination.weather or weather
+
+    def _prune(self, now: float):
+        """Bỏ 10% điểm đến có điểm thấp nhất"""
+        count = max(1, len(self._destinations) // 10)
+        coldest = heapq.nsmallest(
+            count, self._destinations.items(), key=lambda item: item[1].decayed(now, self.half_life)
+        )
+        for key, _ in coldest:
+            del self._destinations[key]
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Destination]:
+        """n điểm đến phổ biến nhất có điểm từ min_score trở lên, phổ biến nhất trước"""
+        now = time.time()
+        scored = (
+            (destination.decayed(now, self.half_life), destination)
+            for destination in self._destinations.values()
+        )
+        hot = heapq.nlargest(n, scored, key=lambda item: item[0])
+        return [destination for score, destination in hot if score >= min_score]
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        location_service,
+        top_n: Optional[int] = None,
+        interval: Optional[float] = None,
+        max_refreshes: Optional[int] = None,
+        min_score: Optional[float] = None,
+        tracker: Optional[PopularityTracker] = None,
+        lock_path: Optional[str] = None
+    ):
+        """
+        Khởi tạo bộ làm mới cache nền
+
+        Args:
+            location_service: LocationService cung cấp TTL và các method refresh_*
+            top_n: Số điểm đến phổ biến nhất được làm mới (mặc định PREFETCH_TOP_N)
+            interval: Khoảng cách giữa các chu kỳ (giây, mặc định PREFETCH_INTERVAL)
+            max_refreshes: Số lời gọi upstream tối đa mỗi chu kỳ (mặc định PREFETCH_MAX_REFRESHES)
+            min_score: Điểm phổ biến tối thiểu để được làm mới (mặc định PREFETCH_MIN_SCORE)
+            tracker: Bộ đếm độ phổ biến (mặc định half-life PREFETCH_HALF_LIFE giây)
+            lock_path: File khóa chọn process làm mới (mặc định PREFETCH_LOCK_PATH, rỗng = không khóa)
+        """
+        self.location_service = location_service
+        self.top_n = top_n if top_n is not None else int(os.getenv("PREFETCH_TOP_N", 20))
+        self.interval = interval if interval is not None else float(os.getenv("PREFETCH_INTERVAL", 15))
+        self.max_refreshes = (
+            max_refreshes if max_refreshes is not None else int(os.getenv("PREFETCH_MAX_REFRESHES", 10))
+        )
+        self.min_score = min_score if min_score is not None else float(os.getenv("PREFETCH_MIN_SCORE", 2))
+        self.tracker = tracker or PopularityTracker(half_life=float(os.getenv("PREFETCH_HALF_LIFE", 3600)))
+        self.leads = {kind: max(lead, 2 * self.interval) for kind, lead in REFRESH_LEAD.items()}
+        self.lock_path = lock_path if lock_path is not None else os.getenv("PREFETCH_LOCK_PATH", "cache/prefetch.lock")
+        self._lock_fd: Optional[int] = None
+
+        # (kind, khóa) -> (mốc hết hạn đã thấy, lần cuối thấy) của các khóa hot
+        self._expiry: Dict[Tuple[str, Hashable], Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.counts = {kind: dict.fromkeys(KEY_STATES, 0) for kind in KINDS}
+        self.refreshes = {kind: {"ok": 0, "error": 0} for kind in KINDS}
+        self._key_counters = {
+            (kind, state): HOT_KEYS.labels(kind, state) for kind in KINDS for state in KEY_STATES
+        }
+        self._refresh_counters = {
+            (kind, outcome): REFRESHES.labels(kind, outcome) for kind in KINDS for outcome in ("ok", "error")
+        }
+
+    def record(self, *args, **kwargs):
+        """Ghi nhận một lượt truy vấn (xem PopularityTracker.record)"""
+        self.tracker.record(*args, **kwargs)
+
+    def start(self):
+        """Chạy vòng làm mới nền - gọi trong lifespan của FastAPI"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng vòng làm mới nền - gọi trong lifespan của FastAPI"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            # Đóng file là nhả flock: worker khác nhận việc làm mới ở chu kỳ kế tiếp
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def is_leader(self) -> bool:
+        """Process này được làm mới cache (giữ hoặc vừa nhận được file khóa)"""
+        if self._lock_fd is not None or not self.lock_path or fcntl is None:
+            return True
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info("Prefetch leader: pid %d", os.getpid())
+        return True
+
+    async def run(self):
+        """Mỗi interval giây chạy một chu kỳ làm mới ở mức ưu tiên nền (chỉ ở process giữ khóa)"""
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.is_leader():
+                continue
+            try:
+                with background_priority():
+                    await self.tick()
+            except Exception as e:
+                logger.warning("Prefetch tick failed: %s", e)
+
+    async def tick(self) -> int:
+        """
+        Một chu kỳ: làm mới dữ liệu sắp hết hạn của top-N điểm đến, phổ biến nhất trước
+
+        Returns:
+            Số lời gọi upstream đã gửi
+        """
+        budget = self.max_refreshes
+        for destination in self.tracker.top(self.top_n, self.min_score):
+            if budget <= 0:
+                break
+            budget -= await self._refresh_destination(destination, budget)
+        self.ticks += 1
+        self._forget_stale_keys(time.time())
+        return self.max_refreshes - budget
+
+    async def _refresh_destination(self, destination: Destination, budget: int) -> int:
+        """Làm mới tọa độ, ô POI rồi thời tiết của một điểm đến; trả về số lời gọi upstream"""
+        service = self.location_service
+        calls = 0
+
+        if destination.name is not None and not destination.static_name:
+            name = destination.name
+            ttls = {name: service.geocode_ttl(name)}
+            if ttls[name] == float("inf"):
+                destination.static_name = True
+            elif await self._refresh_due(
+                "geocode", ttls,
+                lambda names: service.refresh_coordinates(names[0]),
+                lambda: {name: service.geocode_ttl(name)}
+            ):
+                calls += 1
+
+        lat, lng, radius_km = destination.lat, destination.lng, destination.radius_km
+        if radius_km <= 0:
+            return calls
+
+        def read_tiles():
+            return service.poi_tile_ttls(lat, lng, radius_km)
+
+        if calls < budget and await self._refresh_due(
+            "poi_tiles", read_tiles(), service.refresh_poi_tiles, read_tiles
+        ):
+            calls += 1
+
+        if destination.weather and calls < budget:
+            # Thời tiết được gắn cho các POI gần nhất (như /api/explore): POI lấy từ
+            # spatial index, không gọi upstream khi các ô POI còn hạn
+            pois = await service.get_points_of_interest(lat, lng, limit=destination.limit, radius_km=radius_km)
+            points = [(poi["coordinates"]["lat"], poi["coordinates"]["lng"]) for poi in pois]
+
+            def read_cells():
+                return service.weather_cell_ttls(points)
+
+            if await self._refresh_due("weather", read_cells(), service.refresh_weather, read_cells):
+                calls += 1
+
+        return calls
+
+    async def _refresh_due(
+        self,
+        kind: str,
+        ttls: Dict[Hashable, Optional[float]],
+        refresh: Callable[[List[Hashable]], Awaitable],
+        read_ttls: Callable[[], Dict[Hashable, Optional[float]]]
+    ) -> bool:
+        """
+        Làm mới (bằng một lời gọi) các khóa sắp hết hạn của một loại dữ liệu
+
+        Args:
+            kind: geocode, poi_tiles hoặc weather
+            ttls: TTL còn lại của các khóa ({khóa: giây, None nếu chưa có/đã hết hạn})
+            refresh: Hàm async làm mới danh sách khóa (method refresh_* của LocationService)
+            read_ttls: Đọc lại TTL sau khi làm mới
+
+        Returns:
+            True nếu đã gửi lời gọi upstream
+        """
+        now = time.time()
+        lead = self.leads[kind]
+        due, ahead = [], set()
+        for key, ttl in ttls.items():
+            state_key = (kind, key)
+            known = self._expiry.get(state_key)
+            if known is not None and known[0] <= now:
+                # Đã qua mốc hết hạn mà chưa được làm mới: request của người dùng đã
+                # (hoặc sẽ) bị miss và phải chờ upstream
+                self._count(kind, "expired")
+                del self._expiry[state_key]
+                known = None
+            if ttl is not None and ttl >= lead:
+                self._expiry[state_key] = (now + ttl, now)
+                continue
+            due.append(key)
+            if known is not None and ttl is not None:
+                ahead.add(key)
+
+        if not due:
+            return False
+        try:
+            await refresh(due)
+        except Exception as e:
+            logger.warning("Prefetch %s refresh failed: %s", kind, e)
+            self._count_refresh(kind, "error")
+            return True
+
+        now = time.time()
+        refreshed = read_ttls()
+        failed = 0
+        for key in due:
+            ttl = refreshed.get(key)
+            if ttl is None:
+                # Upstream lỗi (LocationService đã dùng tạm dữ liệu cũ): thử lại ở chu kỳ sau
+                failed += 1
+                continue
+            self._expiry[(kind, key)] = (now + ttl, now)
+            self._count(kind, "renewed" if key in ahead else "cold")
+        self._count_refresh(kind, "error" if failed else "ok")
+        return True
+
+    def _count(self, kind: str, state: str):
+        self.counts[kind][state] += 1
+        self._key_counters[kind, state].inc()
+
+    def _count_refresh(self, kind: str, outcome: str):
+        self.refreshes[kind][outcome] += 1
+        self._refresh_counters[kind, outcome].inc()
+
+    def _forget_stale_keys(self, now: float):
+        """Bỏ trạng thái của các khóa không còn thuộc điểm đến hot (không thấy trong một half-life)"""
+        horizon = now - self.tracker.half_life
+        stale = [key for key, (_, seen) in self._expiry.items() if seen < horizon]
+        for key in stale:
+            del self._expiry[key]
+
+    def stats(self) -> Dict:
+        """Trạng thái và bộ đếm (expired_ratio = expired / (expired + renewed) theo loại dữ liệu)"""
+        expired_ratio = {}
+        for kind, counts in self.counts.items():
+            total = counts["expired"] + counts["renewed"]
+            expired_ratio[kind] = round(counts["expired"] / total, 4) if total else 0.0
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self._lock_fd is not None or not self.lock_path or fcntl is None,
+            "tracked_destinations": len(self.tracker),
+            "hot_keys": len(self._expiry),
+            "ticks": self.ticks,
+            "keys": self.counts,
+            "refreshes": self.refreshes,
+            "expired_ratio": expired_ratio,
+            "top": [destination.describe() for destination in self.tracker.top(5, self.min_score)],
+        }
@@ -0,0 +1,409 @@
+"""
+Rate Limiter - Điều phối lời gọi upstream theo chính sách sử dụng của từng dịch vụ:
+- Token bucket (VD: Nominatim tối đa 1 request/giây) kèm giới hạn số request đồng thời
+- Hàng đợi ưu tiên: request của người dùng (interactive) đi trước request nền
+  (prefetch, làm mới cache); cùng mức ưu tiên thì vào trước ra trước
+- Đọc /api/status của Overpass để biết còn bao nhiêu slot trước khi gửi query
+- Token bucket có thể dùng chung giữa các process (gunicorn worker) qua một file trạng
+  thái khóa bằng fcntl, để giới hạn (VD 1 request/giây) áp dụng cho cả máy chứ không
+  phải cho từng worker
+Thời gian chờ trong hàng đợi được trả về riêng để tách khỏi độ trễ của upstream
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+import struct
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có fcntl, mỗi process dùng bucket riêng
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# Mức ưu tiên: số nhỏ hơn được phục vụ trước
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Mức ưu tiên của lời gọi upstream trong context hiện tại (task con kế thừa)
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """
+    Đánh dấu các lời gọi upstream bên trong là việc nền (nhường request của người dùng)
+
+    VD:
+        with background_priority():
+            await location_service.get_points_of_interest(lat, lng)
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def worker_processes() -> int:
+    """Số process phục vụ app (gunicorn/uvicorn --workers đọc cùng biến WEB_CONCURRENCY)"""
+    return max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+
+
+class SharedTokenBucket:
+    _STATE = struct.Struct("d")
+
+    def __init__(self, path: str, rate: float, burst: int = 1):
+        """
+        Token bucket dùng chung giữa các process trên cùng máy (GCRA): file trạng thái chỉ
+        lưu thời điểm lý thuyết của request kế tiếp, đọc-ghi dưới flock nên các worker
+        gunicorn cùng trừ vào một bucket
+
+        Args:
+            path: File trạng thái (tạo nếu chưa có)
+            rate: Số request mỗi giây cho cả máy
+            burst: Số request được gửi dồn một lúc
+        """
+        self.path = path
+        self.interval = 1 / rate
+        self.burst = burst
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+
+    def _file(self) -> int:
+        # Mở lại sau fork: flock gắn với file description, fd kế thừa từ master sẽ dùng
+        # chung khóa với process khác thay vì loại trừ lẫn nhau
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def take(self) -> float:
+        """
+        Lấy một token nếu có
+
+        Returns:
+            0 nếu đã lấy được, ngược lại số giây cần chờ trước khi thử lại
+        """
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            data = os.pread(fd, self._STATE.size, 0)
+            arrival = self._STATE.unpack(data)[0] if len(data) == self._STATE.size else 0.0
+            now = time.time()
+            arrival = max(arrival, now) + self.interval
+            wait = arrival - now - self.burst * self.interval
+            if wait > 0:
+                return wait
+            os.pwrite(fd, self._STATE.pack(arrival), 0)
+            return 0.0
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_concurrent: Optional[int] = None,
+        shared_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            name: Tên (hiển thị trong thống kê)
+            rate: Số request mỗi giây, None = không giới hạn tốc độ
+            burst: Số token tối đa tích lũy được (số request được gửi dồn một lúc)
+            max_concurrent: Số request đang chạy tối đa, None = không giới hạn
+            shared_path: File trạng thái để dùng chung `rate` với các process khác;
+                không có fcntl thì mỗi process nhận rate / số worker
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self._shared: Optional[SharedTokenBucket] = None
+        self._shared_wait_until = 0.0
+        if rate is not None and shared_path:
+            if fcntl is not None:
+                self._shared = SharedTokenBucket(shared_path, rate, burst)
+            else:
+                self.rate = rate / worker_processes()
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._active = 0
+        self._blocked_until = 0.0
+        # Heap (priority, thứ tự vào hàng, future) của các request đang chờ
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.wait_seconds = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.max_wait_seconds = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.blocks = 0
+
+    def block_for(self, seconds: float):
+        """Ngừng cấp lượt trong `seconds` giây (VD: upstream trả 429 kèm Retry-After)"""
+        until = time.monotonic() + seconds
+        if until > self._blocked_until:
+            self._blocked_until = until
+            self.blocks += 1
+
+    def set_concurrency(self, max_concurrent: Optional[int]):
+        """Cập nhật số request đồng thời (VD: theo số slot Overpass cấp cho IP)"""
+        self.max_concurrent = max_concurrent
+        self._dispatch()
+
+    @asynccontextmanager
+    async def acquire(self, priority: Optional[int] = None) -> AsyncIterator[float]:
+        """
+        Chờ tới lượt gửi request
+
+        Args:
+            priority: INTERACTIVE / BACKGROUND, None = theo context hiện tại
+
+        Yields:
+            Thời gian đã chờ trong hàng đợi (giây)
+        """
+        if priority is None:
+            priority = current_priority()
+        start = time.monotonic()
+
+        if self._waiters or not self._try_take():
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Đã được cấp lượt đúng lúc bị hủy: trả lại lượt cho request sau
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+
+        waited = time.monotonic() - start
+        self.granted[priority] += 1
+        self.wait_seconds[priority] += waited
+        self.max_wait_seconds[priority] = max(self.max_wait_seconds[priority], waited)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self) -> bool:
+        """Lấy một lượt nếu còn token, còn slot đồng thời và không bị chặn"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self._blocked_until:
+            return False
+        if self.max_concurrent is not None and self._active >= self.max_concurrent:
+            return False
+        if self._shared is not None:
+            wait = self._shared.take()
+            if wait > 0:
+                self._shared_wait_until = now + wait
+                return False
+        elif self.rate is not None:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+        self._active += 1
+        return True
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Cấp lượt cho các request đứng đầu hàng đợi, hẹn giờ nếu phải chờ token"""
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # Request đã bị hủy khi đang chờ
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+        if not self._waiters or self._timer is not None:
+            return
+        now = time.monotonic()
+        if now < self._blocked_until:
+            delay = self._blocked_until - now
+        elif self.max_concurrent is not None and self._active >= self.max_concurrent:
+            # Request đang chạy xong sẽ gọi lại _dispatch
+            return
+        elif self._shared is not None:
+            delay = self._shared_wait_until - now
+        elif self.rate is not None:
+            delay = (1 - self._tokens) / self.rate
+        else:
+            return
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> Dict:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+        return {
+            "rate_per_s": self.rate,
+            "shared": self._shared is not None,
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queued": queued,
+            "blocked_for_s": round(max(0.0, self._blocked_until - time.monotonic()), 1),
+            "blocks": self.blocks,
+            "granted": {PRIORITY_NAMES[p]: count for p, count in self.granted.items()},
+            "avg_wait_ms": {
+                PRIORITY_NAMES[p]: round(self.wait_seconds[p] / count * 1000, 1) if count else 0.0
+                for p, count in self.granted.items()
+            },
+            "max_wait_ms": {
+                PRIORITY_NAMES[p]: round(seconds * 1000, 1) for p, seconds in self.max_wait_seconds.items()
+            },
+        }
+
+
+_RATE_LIMIT_RE = re.compile(r"^Rate limit: (\d+)", re.MULTILINE)
+_AVAILABLE_RE = re.compile(r"^(\d+) slots? available now", re.MULTILINE)
+_NEXT_SLOT_RE = re.compile(r"^Slot available after: \S+, in (-?\d+) seconds", re.MULTILINE)
+
+
+def parse_overpass_status(text: str) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+    """
+    Đọc nội dung /api/status của Overpass
+
+    Returns:
+        (số slot của IP, số slot đang trống, số giây tới khi có slot kế tiếp);
+        None nếu không đọc được thông tin tương ứng
+    """
+    match = _RATE_LIMIT_RE.search(text)
+    rate_limit = int(match.group(1)) if match else None
+
+    match = _AVAILABLE_RE.search(text)
+    next_slots = [max(0, int(seconds)) for seconds in _NEXT_SLOT_RE.findall(text)]
+    if match:
+        available = int(match.group(1))
+    elif next_slots:
+        available = 0
+    else:
+        available = None
+    return rate_limit, available, (min(next_slots) if next_slots else None)
+
+
+class OverpassSlots:
+    def __init__(
+        self,
+        http,
+        status_url: str,
+        limiter: RateLimiter,
+        refresh_interval: float = 10.0,
+        max_block: float = 30.0,
+        processes: int = 1,
+    ):
+        """
+        Đồng bộ RateLimiter của một mirror Overpass với số slot server cấp cho IP
+        Slot tính theo IP nên được chia đều cho các process cùng máy
+
+        Args:
+            http: HttpClient dùng chung
+            status_url: URL /api/status của mirror
+            limiter: RateLimiter của mirror đó
+            refresh_interval: Chu kỳ đọc lại trạng thái (giây)
+            max_block: Thời gian chặn tối đa khi hết slot (giây)
+            processes: Số process cùng gửi query từ IP này (mỗi process nhận ít nhất 1 slot)
+        """
+        self.http = http
+        self.status_url = status_url
+        self.limiter = limiter
+        self.refresh_interval = refresh_interval
+        self.max_block = max_block
+        self.processes = processes
+
+        self.rate_limit: Optional[int] = None
+        self.available: Optional[int] = None
+        self._checked_at = float("-inf")
+        self._refreshing: Optional[asyncio.Task] = None
+        self._throttled = False
+
+        self.checks = 0
+        self.errors = 0
+
+    def invalidate(self):
+        """Vừa nhận 429: request kế tiếp phải chờ đọc lại trạng thái rồi mới gửi"""
+        self._checked_at = float("-inf")
+        self._throttled = True
+
+    async def refresh(self):
+        """
+        Đọc lại /api/status nếu đã cũ (các request đồng thời dùng chung một lần đọc)
+        Bình thường đọc ở nền, không làm chậm request; chỉ chờ kết quả sau khi bị 429
+        """
+        if time.monotonic() - self._checked_at >= self.refresh_interval and self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        if self._throttled and self._refreshing is not None:
+            await asyncio.shield(self._refreshing)
+
+    async def _refresh(self):
+        try:
+            self.checks += 1
+            # wait_for bao cả thời gian chờ slot kết nối của host (đang có query chạy)
+            response = await asyncio.wait_for(self.http.get(self.status_url, timeout=2), 2)
+            response.raise_for_status()
+            rate_limit, available, next_slot_in = parse_overpass_status(response.text)
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            # Không đọc được trạng thái: giữ cấu hình hiện tại, thử lại ở chu kỳ sau
+            self.errors += 1
+            logger.warning("Overpass status error (%s): %s", self.status_url, e)
+            return
+        finally:
+            self._checked_at = time.monotonic()
+            self._refreshing = None
+            self._throttled = False
+
+        self.rate_limit, self.available = rate_limit, available
+        if rate_limit:
+            self.limiter.set_concurrency(max(1, rate_limit // self.processes))
+        if available == 0 and next_slot_in is not None:
+            self.limiter.block_for(min(next_slot_in, self.max_block))
+
+    def stats(self) -> Dict:
+        return {
+            "rate_limit": self.rate_limit,
+            "available": self.available,
+            "checks": self.checks,
+            "errors": self.errors,
+        }
@@ -0,0 +1,372 @@
+"""
+Resilience - Lớp bảo vệ các lời gọi upstream (Nominatim, Overpass, Open-Meteo):
+- Circuit breaker cho từng endpoint: lỗi liên tiếp thì ngừng gọi một thời gian,
+  sau đó cho một request thăm dò (half-open) để thử lại
+- Timeout thích ứng theo phân vị độ trễ quan sát được thay vì một con số cố định
+- Hedged request: endpoint đầu tiên chưa trả lời sau độ trễ p95 thì gửi song song
+  tới mirror kế tiếp, lấy kết quả về trước; endpoint lỗi thì chuyển ngay sang mirror khác
+- Rate limit theo chính sách của từng endpoint (services.rate_limiter); thời gian chờ
+  trong hàng đợi được đo riêng, không tính vào độ trễ dùng cho timeout/hedge
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from services import metrics
+from services.http_client import HttpClient
+from services.rate_limiter import PRIORITY_NAMES, OverpassSlots, RateLimiter, current_priority
+
+
+UPSTREAM_SECONDS = metrics.REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Thời gian một lần gửi tới upstream", ["upstream", "outcome"]
+)
+UPSTREAM_QUEUE_SECONDS = metrics.REGISTRY.histogram(
+    "upstream_queue_wait_seconds", "Thời gian chờ rate limiter trước khi gửi tới upstream", ["upstream", "priority"]
+)
+
+
+class CircuitOpenError(Exception):
+    """Mọi endpoint của upstream đang bị ngắt (circuit open)"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Upstream {name} tạm thời bị ngắt do lỗi liên tiếp")
+        self.name = name
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Số lỗi liên tiếp để ngắt mạch
+            reset_timeout: Thời gian ngắt (giây) trước khi cho request thăm dò
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Có được gửi request không (half-open chỉ cho một request thăm dò)"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Request bị hủy (thua hedge) - không tính là thành công hay lỗi"""
+        self._probing = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Lưu độ trễ của các request thành công gần nhất
+
+        Args:
+            window: Số mẫu giữ lại
+            min_samples: Số mẫu tối thiểu trước khi tin vào phân vị
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Phân vị q (0-100) của độ trễ, None nếu chưa đủ mẫu"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class Endpoint:
+    def __init__(
+        self,
+        url: str,
+        breaker: CircuitBreaker,
+        limiter: Optional[RateLimiter] = None,
+        slots: Optional[OverpassSlots] = None,
+    ):
+        self.url = url
+        self.breaker = breaker
+        self.limiter = limiter
+        self.slots = slots
+        self.requests = 0
+        self.wins = 0
+
+
+class Upstream:
+    def __init__(
+        self,
+        name: str,
+        http: HttpClient,
+        urls: List[str],
+        min_timeout: float = 1.0,
+        max_timeout: float = 30.0,
+        timeout_multiplier: float = 3.0,
+        hedge: bool = True,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_concurrent: Optional[int] = None,
+        slot_status: bool = False,
+        processes: int = 1,
+        rate_state_dir: Optional[str] = None,
+    ):
+        """
+        Một upstream với một hoặc nhiều endpoint (mirror) tương đương
+
+        Args:
+            name: Tên upstream (hiển thị trong thống kê)
+            http: Client HTTP dùng chung
+            urls: Các endpoint theo thứ tự ưu tiên
+            min_timeout, max_timeout: Khoảng chặn của timeout thích ứng (giây);
+                chưa đủ mẫu thì dùng max_timeout
+            timeout_multiplier: Timeout = p99 độ trễ x hệ số
+            hedge: Gửi song song tới mirror kế tiếp khi endpoint đầu chậm hơn p95
+            failure_threshold, reset_timeout: Cấu hình circuit breaker của từng endpoint
+            rate, burst: Token bucket của từng endpoint (request/giây), None = không giới hạn
+            max_concurrent: Số request đồng thời tối đa tới từng endpoint
+            slot_status: Đọc /api/status (Overpass) để biết số slot còn trống
+            processes: Số process (worker) cùng gọi upstream từ máy này; max_concurrent và
+                số slot Overpass được chia đều cho các process (mỗi process ít nhất 1)
+            rate_state_dir: Thư mục chứa file token bucket dùng chung giữa các process,
+                None = mỗi process một bucket riêng
+        """
+        self.name = name
+        self.http = http
+        self.endpoints = []
+        for url in urls:
+            limiter = None
+            if rate is not None or max_concurrent is not None or slot_status:
+                shared_path = None
+                if rate is not None and rate_state_dir:
+                    shared_path = os.path.join(rate_state_dir, f"{name}-{urlsplit(url).netloc}.bucket")
+                limiter = RateLimiter(
+                    url, rate=rate, burst=burst,
+                    max_concurrent=max(1, max_concurrent // processes) if max_concurrent else max_concurrent,
+                    shared_path=shared_path
+                )
+            slots = None
+            if slot_status:
+                slots = OverpassSlots(http, url.rsplit("/", 1)[0] + "/status", limiter, processes=processes)
+            self.endpoints.append(
+                Endpoint(url, CircuitBreaker(failure_threshold, reset_timeout), limiter, slots)
+            )
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge = hedge and len(urls) > 1
+        self.latency = LatencyTracker()
+        self.queue_wait = LatencyTracker()
+
+        self.hedged = 0
+        self.failovers = 0
+
+    def timeout(self) -> float:
+        """Timeout cho mỗi lần thử, theo p99 độ trễ gần đây"""
+        p99 = self.latency.percentile(99)
+        if p99 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Chờ bao lâu trước khi gửi thêm tới mirror kế tiếp (None = không hedge)"""
+        if not self.hedge:
+            return None
+        p95 = self.latency.percentile(95)
+        return p95 if p95 is not None else self.max_timeout / 4
+
+    @property
+    def is_open(self) -> bool:
+        """Mọi endpoint đều đang ngắt"""
+        return all(endpoint.breaker.state == CircuitBreaker.OPEN for endpoint in self.endpoints)
+
+    async def request(self, method: str, **kwargs) -> httpx.Response:
+        """
+        Gửi request tới upstream (hedge/failover giữa các endpoint)
+
+        Args:
+            method: HTTP method
+            **kwargs: Tham số cho httpx (params, data, ...)
+
+        Returns:
+            Response đầu tiên không lỗi (status < 500 và khác 429)
+
+        Raises:
+            CircuitOpenError: Mọi endpoint đang ngắt
+            httpx.HTTPError / asyncio.TimeoutError: Mọi lần thử đều lỗi
+        """
+        timeout = self.timeout()
+        candidates = iter(self.endpoints)
+        pending: Dict[asyncio.Task, Endpoint] = {}
+        errors: List[BaseException] = []
+
+        def launch() -> bool:
+            for endpoint in candidates:
+                if endpoint.breaker.allow():
+                    task = asyncio.ensure_future(self._attempt(endpoint, method, timeout, kwargs))
+                    pending[task] = endpoint
+                    return True
+            return False
+
+        if not launch():
+            raise CircuitOpenError(self.name)
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_delay(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Endpoint đang chạy chậm hơn bình thường: gửi song song tới mirror kế tiếp
+                    if launch():
+                        self.hedged += 1
+                    continue
+
+                for task in done:
+                    endpoint = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        endpoint.wins += 1
+                        return task.result()
+                    errors.append(error)
+                if not pending:
+                    # Lỗi: chuyển ngay sang mirror kế tiếp
+                    if launch():
+                        self.failovers += 1
+
+            if not errors:
+                raise CircuitOpenError(self.name)
+            raise errors[-1]
+        finally:
+            # Hủy các lần thử thua cuộc
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, endpoint: Endpoint, method: str, timeout: float, kwargs: Dict) -> httpx.Response:
+        """Một lần gửi tới một endpoint (chờ tới lượt nếu có rate limit), cập nhật breaker và độ trễ"""
+        try:
+            if endpoint.limiter is None:
+                return await self._send(endpoint, method, timeout, kwargs)
+            if endpoint.slots is not None:
+                await endpoint.slots.refresh()
+            async with endpoint.limiter.acquire() as waited:
+                self.queue_wait.observe(waited)
+                UPSTREAM_QUEUE_SECONDS.labels(self.name, PRIORITY_NAMES[current_priority()]).observe(waited)
+                return await self._send(endpoint, method, timeout, kwargs)
+        except asyncio.CancelledError:
+            endpoint.breaker.release()
+            raise
+
+    async def _send(self, endpoint: Endpoint, method: str, timeout: float, kwargs: Dict) -> httpx.Response:
+        endpoint.requests += 1
+        outcome = "cancelled"
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self.http.request(method, endpoint.url, timeout=timeout, **kwargs), timeout
+            )
+            if response.status_code == 429:
+                outcome = "http_429"
+                self._back_off(endpoint, response)
+                response.raise_for_status()
+            if response.status_code >= 500:
+                outcome = "http_5xx"
+                response.raise_for_status()
+            outcome = "ok"
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            outcome = "timeout"
+            endpoint.breaker.record_failure()
+            raise
+        except Exception:
+            if outcome == "cancelled":
+                outcome = "error"
+            endpoint.breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_SECONDS.labels(self.name, outcome).observe(elapsed)
+        endpoint.breaker.record_success()
+        self.latency.observe(elapsed)
+        return response
+
+    def _back_off(self, endpoint: Endpoint, response: httpx.Response):
+        """Upstream báo quá tải (429): tạm dừng gửi tới endpoint theo Retry-After"""
+        try:
+            retry_after = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            retry_after = 1.0
+        if endpoint.limiter is not None:
+            endpoint.limiter.block_for(min(retry_after, 60.0))
+        if endpoint.slots is not None:
+            endpoint.slots.invalidate()
+
+    def stats(self) -> Dict:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        endpoints = {}
+        for endpoint in self.endpoints:
+            stats = {**endpoint.breaker.stats(), "requests": endpoint.requests, "wins": endpoint.wins}
+            if endpoint.limiter is not None:
+                stats["rate_limiter"] = endpoint.limiter.stats()
+            if endpoint.slots is not None:
+                stats["slots"] = endpoint.slots.stats()
+            endpoints[endpoint.url] = stats
+
+        return {
+            "timeout_s": round(self.timeout(), 2),
+            "latency_p50_ms": ms(self.latency.percentile(50)),
+            "latency_p99_ms": ms(self.latency.percentile(99)),
+            "queue_wait_p50_ms": ms(self.queue_wait.percentile(50)),
+            "queue_wait_p99_ms": ms(self.queue_wait.percentile(99)),
+            "hedged": self.hedged,
+            "failovers": self.failovers,
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,99 @@
+"""
+Single Flight - Gộp các lời gọi upstream trùng nhau đang chạy đồng thời:
+các caller có cùng khóa (đã chuẩn hóa) chờ chung một lời gọi và nhận chung
+kết quả hoặc lỗi, thay vì mỗi caller gọi Nominatim/Overpass/Open-Meteo riêng
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Tên nhóm lời gọi (để hiển thị trong thống kê)
+        """
+        self.name = name
+        # key -> task đang chạy; task trả về dict {key: value} cho cả lô
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Chạy fn() cho key, hoặc chờ lời gọi đang chạy với cùng key
+
+        Args:
+            key: Khóa đã chuẩn hóa
+            fn: Hàm async thực hiện lời gọi upstream
+        """
+        async def run_one(keys: List[Hashable]) -> Dict[Hashable, T]:
+            return {key: await fn()}
+
+        results = await self.do_many([key], run_one)
+        return results[key]
+
+    async def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, T]]],
+    ) -> Dict[Hashable, T]:
+        """
+        Phiên bản theo lô: các key đang có lời gọi chạy thì chờ chung,
+        các key còn lại được gửi trong một lần gọi fn(keys)
+
+        Args:
+            keys: Các khóa cần lấy
+            fn: Hàm async nhận list key, trả về dict {key: value}
+
+        Returns:
+            Dict {key: value} cho mọi key yêu cầu
+        """
+        waiting: Dict[Hashable, asyncio.Task] = {}
+        leading: List[Hashable] = []
+        for key in dict.fromkeys(keys):
+            task = self._calls.get(key)
+            if task is not None:
+                waiting[key] = task
+                self.deduplicated += 1
+            else:
+                leading.append(key)
+
+        if leading:
+            # Chạy thành task riêng để caller dẫn đầu bị hủy (client ngắt kết nối)
+            # không kéo theo các caller đang chờ chung
+            task = asyncio.ensure_future(fn(leading))
+            self.executions += 1
+            for key in leading:
+                self._calls[key] = task
+            task.add_done_callback(lambda done, keys=leading: self._finish(done, keys))
+            for key in leading:
+                waiting[key] = task
+
+        results: Dict[Hashable, T] = {}
+        for key, task in waiting.items():
+            batch = await asyncio.shield(task)
+            results[key] = batch[key]
+        return results
+
+    def _finish(self, task: asyncio.Task, keys: List[Hashable]):
+        """Gỡ các key của lô đã xong khỏi danh sách đang chạy"""
+        for key in keys:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+        # Đánh dấu lỗi đã được xử lý nếu không còn ai chờ
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Số lời gọi thực sự và số caller được gộp"""
+        return {
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "inflight": len(self._calls),
+        }
@@ -0,0 +1,369 @@
+"""
+Spatial Index - KD-tree trong bộ nhớ cho các POI đã thu thập:
+- Tìm k điểm gần nhất và tìm theo bán kính, xếp hạng theo khoảng cách haversine
+- Lọc theo nhóm (tourism / historic / natural)
+
+Mỗi điểm được chiếu lên mặt cầu đơn vị (x, y, z): khoảng cách dây cung tăng
+đơn điệu theo khoảng cách trên mặt cầu, nên KD-tree 3 chiều thông thường cho
+thứ hạng đúng như haversine mà không bị méo ở gần kinh tuyến 180°.
+
+SpatialIndex giữ các POI tải từ Overpass (thêm/bớt theo ô bản đồ); StoreIndex truy vấn
+thẳng trên các cột của kho POI offline, vốn đã được xếp theo KD-tree ngầm định khi import.
+"""
+
+import asyncio
+import heapq
+import math
+import threading
+from array import array
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+EARTH_RADIUS_KM = 6371.0088
+CATEGORIES = ("tourism", "historic", "natural")
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Khoảng cách trên mặt cầu giữa 2 tọa độ (km)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _to_xyz(lat: float, lng: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lng)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _chord_for_km(distance_km: float) -> float:
+    """Độ dài dây cung (trên mặt cầu đơn vị) ứng với khoảng cách km"""
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+def element_key(element: Dict) -> Tuple[str, int]:
+    """
+    Khóa của một OSM element: (type, id) vì id của node, way và relation trùng nhau được
+    (element thiếu type, VD từ Overpass query chỉ lấy node, được coi là node)
+    """
+    return element.get("type", "node"), element["id"]
+
+
+def element_categories(tags: Dict) -> frozenset:
+    """Các nhóm POI mà một element thuộc về, dựa trên OSM tags"""
+    return frozenset(category for category in CATEGORIES if tags.get(category))
+
+
+def kd_order(lats: Sequence[float], lons: Sequence[float]) -> List[int]:
+    """
+    Thứ tự các hàng tạo thành KD-tree ngầm định: với đoạn [lo, hi) ở độ sâu d, hàng ở
+    giữa (lo + hi) // 2 là nút chia theo trục d % 3, hai nửa trái/phải là hai cây con.
+    Lưu các cột theo thứ tự này thì khi nạp không cần dựng cây
+    """
+    points = [(*_to_xyz(lat, lon), row) for row, (lat, lon) in enumerate(zip(lats, lons))]
+
+    def arrange(lo: int, hi: int, depth: int):
+        if hi - lo <= 1:
+            return
+        points[lo:hi] = sorted(points[lo:hi], key=itemgetter(depth % 3))
+        mid = (lo + hi) // 2
+        arrange(lo, mid, depth + 1)
+        arrange(mid + 1, hi, depth + 1)
+
+    arrange(0, len(points), 0)
+    return [point[3] for point in points]
+
+
+class SpatialIndex:
+    def __init__(self):
+        """Khởi tạo index rỗng (cây được dựng lại lười khi có điểm mới)"""
+        # (type, id) -> (xyz, categories, element)
+        self._points: Dict[Tuple[str, int], Tuple[Tuple[float, float, float], frozenset, Dict]] = {}
+        # Nhóm (VD ô bản đồ) -> các khóa element của nhóm, và khóa -> nhóm đang giữ nó
+        self._groups: Dict[Hashable, Set[Tuple[str, int]]] = {}
+        self._owner: Dict[Tuple[str, int], Hashable] = {}
+        # Bản dựng gần nhất (ids, points, tree): được thay nguyên khối nên request đang tìm
+        # vẫn đọc bản cũ nhất quán trong lúc thread khác dựng bản mới
+        self._snapshot: Tuple[List, Dict, Optional[tuple]] = ([], {}, None)
+        self._version = 0
+        self._built_version = 0
+        self._swap_lock = threading.Lock()
+        self._building: Optional[asyncio.Future] = None
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def dirty(self) -> bool:
+        """Có thay đổi chưa được dựng vào cây"""
+        return self._version != self._built_version
+
+    def add(self, elements: Iterable[Dict], group: Optional[Hashable] = None) -> Set[Tuple[str, int]]:
+        """
+        Thêm/cập nhật các OSM element (cần có id, lat, lon, tags; type mặc định node)
+        Element trùng (type, id) sẽ ghi đè bản cũ
+
+        Args:
+            elements: Các element cần thêm
+            group: Nhóm sở hữu các element (None = không thuộc nhóm nào, không bị xóa theo nhóm)
+
+        Returns:
+            Tập khóa (type, id) đã thêm
+        """
+        keys = set()
+        for element in elements:
+            key = element_key(element)
+            xyz = _to_xyz(element["lat"], element["lon"])
+            previous = self._points.get(key)
+            # Chỉ cần dựng lại cây khi có điểm mới hoặc điểm đổi vị trí
+            if previous is None or previous[0] != xyz:
+                self._version += 1
+            self._points[key] = (xyz, element_categories(element.get("tags", {})), element)
+            keys.add(key)
+            if group is not None:
+                # Element đổi ô (VD di chuyển qua biên) thuộc về ô nạp nó sau cùng
+                self._owner[key] = group
+        return keys
+
+    def replace(self, group: Hashable, elements: Iterable[Dict]):
+        """
+        Thay toàn bộ element của một nhóm: element có trong bản cũ mà không còn trong
+        bản mới (VD POI đã bị xóa trên OSM) bị gỡ khỏi index
+        """
+        keys = self.add(elements, group)
+        for key in self._groups.get(group, set()) - keys:
+            self._discard(key, group)
+        self._groups[group] = keys
+
+    def remove(self, group: Hashable):
+        """Gỡ mọi element của một nhóm khỏi index"""
+        for key in self._groups.pop(group, set()):
+            self._discard(key, group)
+
+    def _discard(self, key: Tuple[str, int], group: Hashable):
+        # Bỏ qua element đã được nhóm khác nạp lại
+        if self._owner.get(key) != group:
+            return
+        del self._owner[key]
+        del self._points[key]
+        self._version += 1
+
+    def build(self):
+        """
+        Dựng cây ngay trên thread hiện tại nếu có thay đổi (khi khởi động, ngoài event loop);
+        trong event loop dùng build_async()
+        """
+        if self.dirty:
+            self._rebuild()
+
+    async def build_async(self):
+        """
+        Dựng cây trong thread nếu có thay đổi, không chặn event loop
+        Các caller đồng thời chờ chung một lần dựng; trả về khi cây đã chứa mọi thay
+        đổi có trước lúc gọi
+        """
+        target = self._version
+        while self._built_version < target:
+            if self._building is None:
+                self._building = asyncio.ensure_future(asyncio.to_thread(self._rebuild))
+            building = self._building
+            try:
+                await asyncio.shield(building)
+            finally:
+                if building.done() and self._building is building:
+                    self._building = None
+
+    def _rebuild(self):
+        """Dựng lại KD-tree (median split xoay vòng theo trục x, y, z)"""
+        # dict() sao chép trong một bước (giữ GIL) nên an toàn khi event loop vẫn đang ghi
+        version = self._version
+        points = dict(self._points)
+        ids = list(points)
+
+        def build_node(indices: List[int], depth: int):
+            if not indices:
+                return None
+            axis = depth % 3
+            indices.sort(key=lambda i: points[ids[i]][0][axis])
+            mid = len(indices) // 2
+            return (
+                indices[mid],
+                axis,
+                build_node(indices[:mid], depth + 1),
+                build_node(indices[mid + 1:], depth + 1),
+            )
+
+        tree = build_node(list(range(len(ids))), 0)
+        with self._swap_lock:
+            # Không để bản dựng cũ hơn (xong muộn) ghi đè bản mới hơn
+            if version >= self._built_version:
+                self._snapshot = (ids, points, tree)
+                self._built_version = version
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 5,
+        radius_km: Optional[float] = None,
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, Dict]]:
+        """
+        Tìm tối đa k POI gần nhất
+
+        Args:
+            lat, lng: Tọa độ tâm
+            k: Số kết quả tối đa
+            radius_km: Chỉ lấy điểm trong bán kính này (None = không giới hạn)
+            categories: Chỉ lấy điểm thuộc một trong các nhóm này (None = tất cả)
+
+        Returns:
+            List (khoảng cách km, element) sắp xếp từ gần đến xa
+
+        Chỉ đọc bản dựng gần nhất, không tự dựng lại: thay đổi chưa dựng (dirty) chỉ
+        thấy được sau build() hoặc await build_async()
+        """
+        ids, points, tree = self._snapshot
+        if tree is None or k <= 0:
+            return []
+
+        wanted = frozenset(categories) if categories else None
+        target = _to_xyz(lat, lng)
+        limit = _chord_for_km(radius_km) if radius_km is not None else math.inf
+        limit_sq = limit * limit
+        # Max-heap (lưu âm khoảng cách) giữ k điểm tốt nhất hiện tại
+        best: List[Tuple[float, int]] = []
+
+        def search(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            xyz, point_categories, _ = points[ids[index]]
+            dist_sq = sum((a - b) ** 2 for a, b in zip(xyz, target))
+
+            if dist_sq <= limit_sq and (wanted is None or point_categories & wanted):
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, index))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, index))
+
+            diff = target[axis] - xyz[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            # Chỉ duyệt nhánh xa khi mặt phẳng chia còn gần hơn điểm tệ nhất đang giữ
+            worst_sq = -best[0][0] if len(best) == k else limit_sq
+            if diff * diff <= worst_sq:
+                search(far)
+
+        search(tree)
+
+        results = []
+        for _, index in best:
+            element = points[ids[index]][2]
+            results.append((haversine_km(lat, lng, element["lat"], element["lon"]), element))
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def within(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, Dict]]:
+        """Tất cả POI trong bán kính (của bản dựng gần nhất), sắp xếp từ gần đến xa"""
+        return self.nearest(lat, lng, k=len(self._snapshot[0]), radius_km=radius_km, categories=categories)
+
+
+class StoreIndex:
+    def __init__(self, store):
+        """
+        Tìm kiếm trên kho POI offline (PoiStore) mà không tạo dict cho từng POI: các cột
+        lat/lon đã theo thứ tự kd_order nên chính mảng hàng là cây; chỉ k kết quả được
+        dựng lại thành element
+
+        Args:
+            store: PoiStore (các cột lats, lons, columns và element(row))
+        """
+        self.store = store
+        # Nhóm của từng hàng dạng bitmask theo thứ tự CATEGORIES
+        columns = [store.columns.get(category) for category in CATEGORIES]
+        masks = array("B", bytes(len(store)))
+        for bit, column in enumerate(columns):
+            if column is None:
+                continue
+            flag = 1 << bit
+            for row, string_id in enumerate(column):
+                if string_id:
+                    masks[row] |= flag
+        self._masks = masks
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 5,
+        radius_km: Optional[float] = None,
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, Dict]]:
+        """Như SpatialIndex.nearest"""
+        count = len(self.store)
+        wanted = 0
+        if categories:
+            wanted = sum(1 << CATEGORIES.index(category) for category in set(categories) if category in CATEGORIES)
+            if not wanted:
+                return []
+        if not count or k <= 0:
+            return []
+
+        lats, lons, masks = self.store.lats, self.store.lons, self._masks
+        target = _to_xyz(lat, lng)
+        limit = _chord_for_km(radius_km) if radius_km is not None else math.inf
+        limit_sq = limit * limit
+        best: List[Tuple[float, int]] = []
+
+        def search(lo: int, hi: int, depth: int):
+            if lo >= hi:
+                return
+            row = (lo + hi) // 2
+            xyz = _to_xyz(lats[row], lons[row])
+            dist_sq = sum((a - b) ** 2 for a, b in zip(xyz, target))
+
+            if dist_sq <= limit_sq and (not wanted or masks[row] & wanted):
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, row))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, row))
+
+            axis = depth % 3
+            diff = target[axis] - xyz[axis]
+            near, far = ((lo, row), (row + 1, hi)) if diff < 0 else ((row + 1, hi), (lo, row))
+            search(*near, depth + 1)
+            worst_sq = -best[0][0] if len(best) == k else limit_sq
+            if diff * diff <= worst_sq:
+                search(*far, depth + 1)
+
+        search(0, count, 0)
+
+        results = []
+        for _, row in best:
+            element = self.store.element(row)
+            results.append((haversine_km(lat, lng, element["lat"], element["lon"]), element))
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def within(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, Dict]]:
+        """Tất cả POI trong bán kính, sắp xếp từ gần đến xa"""
+        return self.nearest(lat, lng, k=len(self.store), radius_km=radius_km, categories=categories)
@@ -0,0 +1,72 @@
+"""
+Text utilities - Chuẩn hóa chuỗi tiếng Việt dùng chung cho các service
+"""
+
+import re
+import unicodedata
+from typing import List, Tuple
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def strip_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt (VD: "Đà Nẵng" -> "Da Nang")"""
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    # "đ"/"Đ" không phải ký tự tổ hợp nên phải thay thủ công
+    return stripped.replace("đ", "d").replace("Đ", "D")
+
+
+def normalize_place_name(name: str) -> str:
+    """
+    Chuẩn hóa tên địa điểm để làm khóa cache/index
+    Các biến thể về hoa/thường, khoảng trắng và dấu dùng chung một khóa
+
+    Args:
+        name: Tên địa điểm (VD: "  Vịnh  Hạ Long ")
+
+    Returns:
+        Tên đã chuẩn hóa (VD: "vinh ha long")
+    """
+    text = strip_diacritics(name).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip(" ,.")
+
+
+# Ranh giới câu: sau . ! ? … (kèm ngoặc/nháy đóng) là khoảng trắng, hoặc xuống dòng
+_SENTENCE_RE = re.compile(r"(.+?(?:[.!?…]+[\"'”’)\]]*(?=\s)|(?=\n)|$))(\s*)", re.S)
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """
+    Tách văn bản thành các câu, giữ lại khoảng trắng phía sau mỗi câu để ghép lại
+    đúng nguyên văn: "".join(câu + khoảng trắng) luôn bằng text. Khoảng trắng ở đầu
+    văn bản nằm trong một đoạn câu rỗng ("", khoảng trắng) - không cần dịch
+
+    Args:
+        text: Văn bản (VD: "Bảo tàng lịch sử. Mở cửa hằng ngày.")
+
+    Returns:
+        List (câu, khoảng trắng theo sau)
+        (VD: [("Bảo tàng lịch sử.", " "), ("Mở cửa hằng ngày.", "")])
+    """
+    segments: List[Tuple[str, str]] = []
+
+    def append_whitespace(whitespace: str):
+        if segments:
+            segments[-1] = (segments[-1][0], segments[-1][1] + whitespace)
+        else:
+            segments.append(("", whitespace))
+
+    for match in _SENTENCE_RE.finditer(text):
+        sentence, separator = match.group(1), match.group(2)
+        stripped = sentence.strip()
+        if not stripped:
+            # Dòng trống: gộp vào khoảng trắng của câu trước
+            append_whitespace(sentence + separator)
+            continue
+        leading = sentence[:len(sentence) - len(sentence.lstrip())]
+        if leading:
+            append_whitespace(leading)
+        segments.append((stripped, sentence[len(leading) + len(stripped):] + separator))
+    return segments
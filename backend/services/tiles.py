@@ -0,0 +1,42 @@
+"""
+Tiles - Lưới ô bản đồ cố định (slippy-map, chuẩn OSM z/x/y) cho cache POI:
+mọi bbox được quy về các ô cố định nên các truy vấn gần nhau dùng chung cache
+"""
+
+import math
+from typing import List, Tuple
+
+
+Tile = Tuple[int, int]
+
+
+def lat_lng_to_tile(lat: float, lng: float, zoom: int) -> Tile:
+    """Ô (x, y) chứa tọa độ ở mức zoom"""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(tile: Tile, zoom: int) -> Tuple[float, float, float, float]:
+    """Bbox của ô theo thứ tự Overpass: (south, west, north, east)"""
+    x, y = tile
+    n = 2 ** zoom
+
+    def tile_lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return tile_lat(y + 1), x / n * 360.0 - 180.0, tile_lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(south: float, west: float, north: float, east: float, zoom: int) -> List[Tile]:
+    """Danh sách ô phủ kín bbox"""
+    x_min, y_min = lat_lng_to_tile(north, west, zoom)
+    x_max, y_max = lat_lng_to_tile(south, east, zoom)
+    return [(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+
+def tile_key(tile: Tile, zoom: int) -> str:
+    """Khóa cache dạng "z/x/y" """
+    return f"{zoom}/{tile[0]}/{tile[1]}"
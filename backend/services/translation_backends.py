@@ -0,0 +1,149 @@
+"""
+Translation Backends - Các cách chạy inference cho model opus-mt (MarianMT):
+- pytorch:   transformers pipeline fp32 (mặc định, giống trước đây)
+- quantized: PyTorch với Linear được lượng tử hóa động sang int8
+- onnx:      ONNX Runtime (optimum) export encoder/decoder, decoder dùng lại KV-cache
+Chọn qua biến môi trường TRANSLATION_BACKEND
+"""
+
+import abc
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+
+# Câu dịch thử khi warmup theo ngôn ngữ nguồn
+WARMUP_TEXTS = {
+    "en": "Welcome to Vietnam.",
+    "vi": "Chào mừng đến Việt Nam.",
+}
+
+class PyTorchBackend:
+    name = "pytorch"
+    # Trọng số nạp trong gunicorn master được các worker dùng chung (copy-on-write)
+    fork_safe = True
+
+    def __init__(self, model_name: str, token: Optional[str] = None):
+        from transformers import pipeline
+
+        self.pipeline = pipeline(
+            "translation",
+            model=model_name,
+            tokenizer=model_name,
+            token=token
+        )
+
+    def translate(self, texts: List[str], max_length: int = 512) -> List[str]:
+        """Dịch một batch câu (pipeline tự pad các câu trong batch)"""
+        results = self.pipeline(texts, max_length=max_length, batch_size=len(texts))
+        return [result.get("translation_text", "") for result in results]
+
+
+class _GenerateBackend(abc.ABC):
+    """Backend dùng tokenizer + model.generate trực tiếp"""
+
+    fork_safe = True
+
+    def __init__(self, model_name: str, token: Optional[str] = None):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, token=token)
+        self.model = self._load_model(model_name, token)
+
+    @abc.abstractmethod
+    def _load_model(self, model_name: str, token: Optional[str]):
+        """Nạp model seq2seq có generate() (lớp con quyết định cách nạp)"""
+
+    def translate(self, texts: List[str], max_length: int = 512) -> List[str]:
+        import torch
+
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        with torch.inference_mode():
+            outputs = self.model.generate(**inputs, max_length=max_length)
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+class QuantizedPyTorchBackend(_GenerateBackend):
+    name = "quantized"
+
+    def _load_model(self, model_name: str, token: Optional[str]):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, token=token)
+        model.eval()
+        # Lượng tử hóa động: trọng số Linear lưu int8, activation tính lại scale mỗi lần
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_export_complete(export_dir: str) -> bool:
+    """Thư mục export có đủ config và file model ONNX (không chỉ kiểm tra thư mục tồn tại)"""
+    if not os.path.isdir(export_dir):
+        return False
+    files = set(os.listdir(export_dir))
+    # optimum ghi decoder riêng (decoder_model + decoder_with_past) hoặc gộp (merged)
+    return {"config.json", "encoder_model.onnx"} <= files and bool(
+        files & {"decoder_model.onnx", "decoder_model_merged.onnx"}
+    )
+
+
+class OnnxBackend(_GenerateBackend):
+    name = "onnx"
+    # InferenceSession tạo thread pool ngay khi khởi tạo, không an toàn khi fork
+    fork_safe = False
+
+    def _load_model(self, model_name: str, token: Optional[str]):
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise RuntimeError("Backend onnx cần cài optimum[onnxruntime]")
+
+        # Export một lần rồi lưu lại, các lần khởi động sau nạp thẳng file .onnx
+        export_root = os.getenv("ONNX_EXPORT_DIR", "cache/onnx")
+        export_dir = os.path.join(export_root, model_name.replace("/", "__"))
+        if _onnx_export_complete(export_dir):
+            return ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+
+        # use_cache=True: export thêm decoder_with_past để dùng lại KV-cache khi decode
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True, token=token)
+        # Ghi vào thư mục tạm rồi đổi tên một bước: tiến trình bị ngắt giữa chừng không để
+        # lại thư mục dở dang mà lần khởi động sau tưởng là đã export xong
+        os.makedirs(export_root, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=os.path.basename(export_dir) + ".tmp-", dir=export_root)
+        try:
+            model.save_pretrained(staging_dir)
+            self.tokenizer.save_pretrained(staging_dir)
+            if os.path.isdir(export_dir) and not _onnx_export_complete(export_dir):
+                # Bản dở dang từ lần export trước (phiên bản cũ chưa ghi qua thư mục tạm)
+                shutil.rmtree(export_dir, ignore_errors=True)
+            try:
+                os.rename(staging_dir, export_dir)
+            except OSError:
+                # Tiến trình khác đã export xong trước: dùng bản đó, bỏ bản của mình
+                if not _onnx_export_complete(export_dir):
+                    raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return model
+
+
+BACKENDS: Dict[str, type] = {
+    backend.name: backend
+    for backend in (PyTorchBackend, QuantizedPyTorchBackend, OnnxBackend)
+}
+
+
+def create_backend(kind: str, model_name: str, token: Optional[str] = None):
+    """
+    Tạo backend inference theo tên
+
+    Args:
+        kind: pytorch, quantized hoặc onnx
+        model_name: Tên model trên HuggingFace Hub
+        token: HuggingFace token (nếu cần)
+    """
+    backend = BACKENDS.get(kind)
+    if backend is None:
+        raise ValueError(f"TRANSLATION_BACKEND không hợp lệ: '{kind}' (chọn một trong {', '.join(BACKENDS)})")
+    return backend(model_name, token=token)
@@ -0,0 +1,208 @@
+"""
+Translation Batcher - Gom các request dịch đồng thời thành batch:
+- Mỗi cặp ngôn ngữ có một hàng đợi riêng
+- Batch được gửi đi khi đủ max_batch_size câu hoặc sau max_wait_ms kể từ câu đầu tiên
+- Inference chạy trên worker thread riêng (hoặc pool tiến trình) nên không chặn event loop
+- Hàng đợi có giới hạn: khi đầy, submit báo TranslationQueueFull ngay thay vì để độ trễ tăng mãi
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services import metrics
+
+
+Pair = Tuple[str, str]
+
+BATCH_SIZE = metrics.REGISTRY.histogram(
+    "translation_batch_size", "Số câu trong mỗi batch dịch", ["pair"],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INFERENCE_SECONDS = metrics.REGISTRY.histogram(
+    "translation_inference_seconds", "Thời gian chạy một batch dịch (gồm chuyển sang worker)", ["pair"]
+)
+QUEUE_SECONDS = metrics.REGISTRY.histogram(
+    "translation_queue_wait_seconds", "Thời gian một câu chờ trong hàng đợi trước khi vào batch", ["pair"]
+)
+
+
+class TranslationQueueFull(Exception):
+    """Hàng đợi dịch đã đầy - caller nên thử lại sau retry_after giây"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Hàng đợi dịch đang quá tải, thử lại sau {retry_after} giây")
+        self.retry_after = retry_after
+
+
+class TranslationBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[str, str, List[str]], List[str]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1,
+        max_queue: int = 0,
+    ):
+        """
+        Args:
+            run_batch: Hàm đồng bộ (source_lang, target_lang, texts) -> bản dịch theo thứ tự
+                       (với pool tiến trình phải là hàm cấp module để pickle được)
+            max_batch_size: Số câu tối đa mỗi batch
+            max_wait_ms: Thời gian chờ gom thêm câu sau câu đầu tiên (ms)
+            executor: Nơi chạy inference (mặc định 1 thread riêng)
+            max_concurrent_batches: Số batch chạy song song (bằng số worker của executor)
+            max_queue: Số câu tối đa đang chờ trong hàng đợi, 0 = không giới hạn
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation")
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_queue = max_queue
+
+        self._queues: Dict[Pair, asyncio.Queue] = {}
+        self._dispatchers: Dict[Pair, asyncio.Task] = {}
+        # Giới hạn số batch đang chạy, dùng chung cho mọi cặp ngôn ngữ vì chung executor
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        self._running: set = set()
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def queued(self) -> int:
+        """Số câu đang chờ trong mọi hàng đợi"""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def check_capacity(self, count: int = 1):
+        """Báo TranslationQueueFull nếu hàng đợi không còn chỗ cho `count` câu"""
+        if self.max_queue and self.queued() + count > self.max_queue:
+            self.rejected += count
+            raise TranslationQueueFull(self.retry_after())
+
+    def retry_after(self) -> int:
+        """Ước lượng thời gian (giây) để xả hết hàng đợi hiện tại"""
+        if not self.batches:
+            return 1
+        avg_batch_seconds = self.busy_seconds / self.batches
+        pending_batches = self.queued() / self.max_batch_size / self.max_concurrent_batches
+        return max(1, math.ceil(pending_batches * avg_batch_seconds))
+
+    async def submit(self, source_lang: str, target_lang: str, text: str) -> str:
+        """Đưa một câu vào hàng đợi và chờ bản dịch"""
+        return await self.enqueue(source_lang, target_lang, [text])[0]
+
+    def enqueue(self, source_lang: str, target_lang: str, texts: List[str]) -> List[asyncio.Future]:
+        """
+        Đưa cả lô câu vào hàng đợi: kiểm tra chỗ trống cho cả lô rồi thêm ngay, không có
+        await ở giữa nên hai request đồng thời không thể cùng lọt qua bước kiểm tra;
+        đầy thì từ chối cả lô (không đưa một phần vào hàng đợi)
+
+        Returns:
+            Future bản dịch của từng câu, cùng thứ tự (hủy future = bỏ câu khỏi batch)
+        """
+        self.check_capacity(len(texts))
+        pair = (source_lang, target_lang)
+        queue = self._queues.get(pair)
+        if queue is None:
+            queue = self._queues[pair] = asyncio.Queue()
+            self._dispatchers[pair] = asyncio.create_task(self._dispatch(pair, queue))
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            queue.put_nowait((text, future, now))
+            futures.append(future)
+        return futures
+
+    async def _dispatch(self, pair: Pair, queue: asyncio.Queue):
+        """Vòng lặp gom batch cho một cặp ngôn ngữ"""
+        while True:
+            batch = [await queue.get()]
+            # Chờ executor rảnh: trong lúc chờ, các câu mới dồn lại thành batch lớn hơn
+            await self._slots.acquire()
+            try:
+                # Chờ thêm một chút để gom các câu đến gần như cùng lúc
+                if queue.qsize() < self.max_batch_size - 1 and self.max_wait > 0:
+                    await asyncio.sleep(self.max_wait)
+                while len(batch) < self.max_batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+            except BaseException:
+                self._slots.release()
+                raise
+
+            now = asyncio.get_running_loop().time()
+            queue_seconds = QUEUE_SECONDS.labels(f"{pair[0]}-{pair[1]}")
+            for _, _, enqueued in batch:
+                queue_seconds.observe(now - enqueued)
+
+            # Bỏ các request mà caller đã hủy (client ngắt kết nối)
+            batch = [(text, future) for text, future, _ in batch if not future.cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run(pair, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, pair: Pair, batch: List[Tuple[str, asyncio.Future]]):
+        """Chạy một batch trên executor rồi trả kết quả cho từng caller"""
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        label = f"{pair[0]}-{pair[1]}"
+        BATCH_SIZE.labels(label).observe(len(batch))
+
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.run_batch, pair[0], pair[1], [text for text, _ in batch]
+            )
+            if len(results) != len(batch):
+                raise ValueError(f"Model trả về {len(results)} bản dịch cho {len(batch)} câu")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.busy_seconds += elapsed
+            INFERENCE_SECONDS.labels(label).observe(elapsed)
+            self._slots.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Số batch, số câu và kích thước batch trung bình/lớn nhất"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "avg_batch_ms": round(self.busy_seconds / self.batches * 1000, 1) if self.batches else 0,
+            "queued": self.queued(),
+            "max_queue": self.max_queue,
+            "running_batches": len(self._running),
+            "rejected": self.rejected,
+        }
+
+    async def shutdown(self):
+        """Dừng các vòng lặp gom batch và executor"""
+        tasks = [*self._dispatchers.values(), *self._running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatchers.clear()
+        self._queues.clear()
+        self.executor.shutdown(wait=False)
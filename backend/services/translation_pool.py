@@ -0,0 +1,202 @@
+"""
+Translation Pool - Chạy inference dịch thuật trong các tiến trình worker riêng:
+- Inference nặng CPU không tranh GIL/CPU với event loop phục vụ các endpoint địa điểm
+- Mỗi worker nạp model riêng một lần (initializer) và giới hạn số thread của torch
+- Theo dõi số worker đang bận và mức sử dụng để hiển thị trong /health
+- Worker chết đột ngột (OOM, segfault) làm hỏng cả pool: pool được tạo lại và warmup
+  lại, /health báo chưa sẵn sàng cho tới khi warmup xong
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from services.translation_backends import WARMUP_TEXTS, create_backend
+
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+# Trạng thái trong tiến trình worker (do _init_worker thiết lập)
+_worker: Dict = {}
+
+
+def _init_worker(
+    backend: str,
+    models: Dict[Pair, str],
+    default_pair: Pair,
+    preload_pairs: List[Pair],
+    threads: int,
+    token: Optional[str],
+):
+    """Chạy một lần khi worker khởi động: đặt số thread, nạp và chạy thử model"""
+    import torch
+
+    torch.set_num_threads(threads)
+    _worker.update(
+        backend=backend, models=models, default_pair=default_pair, token=token, translators={}
+    )
+    for source_lang, target_lang in preload_pairs:
+        translate_in_worker(source_lang, target_lang, [WARMUP_TEXTS.get(source_lang, "Hello.")])
+
+
+def translate_in_worker(source_lang: str, target_lang: str, texts: List[str]) -> List[str]:
+    """Dịch một batch câu trong tiến trình worker (model nạp lazy theo cặp ngôn ngữ)"""
+    models = _worker["models"]
+    model = models.get((source_lang, target_lang)) or models[_worker["default_pair"]]
+    translator = _worker["translators"].get(model)
+    if translator is None:
+        translator = _worker["translators"][model] = create_backend(
+            _worker["backend"], model, token=_worker["token"]
+        )
+    return translator.translate(texts, max_length=512)
+
+
+def _ping() -> int:
+    return 0
+
+
+class TranslationPool(Executor):
+    def __init__(
+        self,
+        workers: int,
+        threads_per_worker: int,
+        backend: str,
+        models: Dict[Pair, str],
+        default_pair: Pair,
+        preload_pairs: List[Pair],
+        token: Optional[str] = None,
+    ):
+        """
+        Args:
+            workers: Số tiến trình worker
+            threads_per_worker: Số thread torch của mỗi worker
+            backend: Backend inference (pytorch, quantized, onnx)
+            models: Model theo cặp ngôn ngữ {(source_lang, target_lang): tên model}
+            default_pair: Cặp dùng khi cặp được yêu cầu không có model
+            preload_pairs: Các cặp nạp sẵn khi worker khởi động
+            token: HuggingFace token (nếu cần)
+        """
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self._initargs = (backend, models, default_pair, preload_pairs, threads_per_worker, token)
+        self._executor = self._create_executor()
+
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._started = time.monotonic()
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.tasks = 0
+        # False từ lúc pool hỏng tới khi pool mới warmup xong
+        self.healthy = True
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: không fork từ tiến trình đang chạy event loop + thread
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=self._initargs,
+        )
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Gửi việc sang worker, ghi nhận thời gian bận để tính mức sử dụng
+        Pool đã hỏng thì được tạo lại rồi gửi lại việc (một lần)
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.busy += 1
+            self.tasks += 1
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool as e:
+            self._restart(executor, e)
+            try:
+                executor = self._executor
+                future = executor.submit(fn, *args, **kwargs)
+            except BaseException:
+                self._done(start)
+                raise
+        except BaseException:
+            self._done(start)
+            raise
+        future.add_done_callback(lambda done: self._done(start, executor, done))
+        return future
+
+    def _done(self, start: float, executor: Optional[Executor] = None, future: Optional[Future] = None):
+        with self._lock:
+            self.busy -= 1
+            self.busy_seconds += time.perf_counter() - start
+        # Việc đang chạy khi worker chết nhận BrokenProcessPool: tạo pool mới cho các việc sau
+        if future is not None and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart(executor, future.exception())
+
+    def _restart(self, broken: Executor, error: BaseException):
+        """Thay pool đã hỏng bằng pool mới và warmup lại (chỉ một lần cho mỗi pool hỏng)"""
+        with self._restart_lock:
+            if self._executor is not broken:
+                return
+            logger.error("Translation pool broken (%s), restarting workers", error)
+            self.healthy = False
+            self.restarts += 1
+            self.last_error = str(error) or type(error).__name__
+            self._executor = self._create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._watch_warmup(self._executor, self.start())
+
+    def _watch_warmup(self, executor: Executor, pings: List[Future]):
+        """Đánh dấu pool khỏe lại khi mọi worker của pool mới đã warmup xong"""
+        remaining = [len(pings)]
+
+        def on_ping(future: Future):
+            error = None if future.cancelled() else future.exception()
+            with self._restart_lock:
+                if self._executor is not executor:
+                    return
+                if error is not None:
+                    # Pool mới cũng hỏng thì việc gửi tiếp theo sẽ tạo lại pool
+                    self.last_error = str(error) or type(error).__name__
+                    logger.error("Translation pool warmup failed after restart: %s", error)
+                    return
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self.healthy = True
+                    logger.info("Translation pool restarted (%d restarts)", self.restarts)
+
+        for ping in pings:
+            ping.add_done_callback(on_ping)
+
+    def start(self) -> List[Future]:
+        """
+        Khởi động đủ số worker ngay (ProcessPoolExecutor chỉ tạo worker khi có việc);
+        mỗi worker nạp và chạy thử model trong initializer trước khi nhận việc
+        """
+        return [self._executor.submit(_ping) for _ in range(self.workers)]
+
+    def stats(self) -> Dict[str, float]:
+        """Số worker đang bận và mức sử dụng trung bình kể từ khi khởi động"""
+        elapsed = time.monotonic() - self._started
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "busy_workers": self.busy,
+                "tasks": self.tasks,
+                "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0,
+                "healthy": self.healthy,
+                "restarts": self.restarts,
+                "last_error": self.last_error,
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,102 @@
+"""
+Weather Cache - Cache thời tiết hiện tại theo ô lưới tọa độ:
+- Tọa độ được quy về ô lưới (mặc định 0.02°, ~2km) vì thời tiết gần như giống nhau trong ô
+- Entry hết hạn đúng lúc Open-Meteo cập nhật số liệu mới (current.time + interval)
+  thay vì một TTL cố định
+"""
+
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from services.cache import TwoTierCache
+
+
+# Chu kỳ cập nhật "current" mặc định của Open-Meteo (giây)
+DEFAULT_INTERVAL = 900
+# Chờ thêm một chút sau mốc cập nhật để upstream kịp có số liệu mới
+UPDATE_SLACK = 60
+# TTL tối thiểu, tránh gọi lại liên tục khi số liệu upstream bị trễ
+MIN_TTL = 60
+# Giữ số liệu cũ thêm (giây) để dùng tạm khi Open-Meteo lỗi
+MAX_STALE = 3 * 3600
+
+
+class WeatherCache:
+    def __init__(self, grid_deg: float = 0.02, max_entries: int = 4096, path: Optional[str] = None):
+        """
+        Khởi tạo cache thời tiết
+
+        Args:
+            grid_deg: Kích thước ô lưới (độ)
+            max_entries: Số ô tối đa giữ trong bộ nhớ
+            path: File SQLite dùng chung giữa các worker (VD số liệu do prefetch làm mới),
+                  None = chỉ trong bộ nhớ
+        """
+        self.grid_deg = grid_deg
+        self.cache = TwoTierCache(namespace="weather", path=path, max_entries=max_entries, max_stale=MAX_STALE)
+
+        self._upstream_calls = 0
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.grid_deg), math.floor(lng / self.grid_deg)
+
+    def key(self, lat: float, lng: float) -> str:
+        """Khóa cache của ô chứa tọa độ"""
+        row, col = self._cell(lat, lng)
+        return f"{row}:{col}"
+
+    def snap(self, lat: float, lng: float) -> Tuple[float, float]:
+        """Tâm ô chứa tọa độ (tọa độ thực sự gửi lên upstream)"""
+        row, col = self._cell(lat, lng)
+        return (
+            round((row + 0.5) * self.grid_deg, 6),
+            round((col + 0.5) * self.grid_deg, 6),
+        )
+
+    def get(self, key: str, allow_stale: bool = False) -> Tuple[bool, Optional[Dict]]:
+        return self.cache.get(key, allow_stale=allow_stale)
+
+    def ttl(self, key: str) -> Optional[float]:
+        """Số giây tới khi số liệu của ô hết hạn (lần cập nhật kế tiếp của upstream)"""
+        return self.cache.ttl(key)
+
+    def set(self, key: str, weather: Dict, current: Dict):
+        """Ghi cache, hết hạn ở mốc cập nhật kế tiếp của upstream"""
+        ttl = max(self.expires_at(current) - time.time(), MIN_TTL)
+        self.cache.set(key, weather, ttl=ttl)
+
+    @staticmethod
+    def expires_at(current: Dict, now: Optional[float] = None) -> float:
+        """
+        Mốc Open-Meteo cập nhật số liệu kế tiếp (epoch giây)
+
+        Args:
+            current: Block "current" của Open-Meteo (time theo GMT, interval theo giây)
+            now: Thời điểm hiện tại (mặc định time.time())
+        """
+        now = time.time() if now is None else now
+        interval = current.get("interval") or DEFAULT_INTERVAL
+        try:
+            observed = datetime.fromisoformat(current["time"]).replace(tzinfo=timezone.utc).timestamp()
+            next_update = observed + interval
+        except (KeyError, TypeError, ValueError):
+            # Không đọc được time: lấy mốc chia hết cho interval kế tiếp
+            next_update = (now // interval + 1) * interval
+        return next_update + UPDATE_SLACK
+
+    def record_upstream(self):
+        """Ghi nhận một lời gọi Open-Meteo (một lô tọa độ)"""
+        self._upstream_calls += 1
+
+    def close(self):
+        """Đóng kết nối SQLite (nếu có)"""
+        self.cache.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Bộ đếm hit/miss và số lời gọi upstream"""
+        return {
+            **self.cache.stats(),
+            "upstream_calls": self._upstream_calls,
+        }
@@ -0,0 +1,73 @@
+"""
+Kiểm thử APP_PROFILE: mỗi profile chỉ gắn nhóm route của mình và chỉ import
+service cần dùng (APP_PROFILE đọc lúc import main nên chạy trong process riêng)
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys
+import main
+paths = sorted(main.app.openapi()["paths"])
+print(json.dumps({
+    "paths": paths,
+    "translation_loaded": "services.huggingface_service" in sys.modules,
+    "geo_loaded": "services.location_service" in sys.modules,
+}))
+"""
+
+
+def run_profile(profile, tmp_path):
+    env = {
+        **os.environ,
+        "APP_PROFILE": profile,
+        "TRANSLATION_PRELOAD": "",
+        "PREFETCH_ENABLED": "0",
+        "GEOCODE_CACHE_PATH": str(tmp_path / "geocode.sqlite3"),
+        "POI_TILE_CACHE_PATH": str(tmp_path / "poi_tiles.sqlite3"),
+        "TRANSLATION_CACHE_PATH": str(tmp_path / "translations.sqlite3"),
+        "RATE_LIMIT_STATE_DIR": str(tmp_path / "ratelimit"),
+        "WEATHER_CACHE_PATH": str(tmp_path / "weather.sqlite3"),
+        "PREFETCH_LOCK_PATH": str(tmp_path / "prefetch.lock"),
+    }
+    return subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+
+
+def probe(profile, tmp_path):
+    result = run_profile(profile, tmp_path)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_geo_profile_does_not_mount_translation(tmp_path):
+    info = probe("geo", tmp_path)
+    assert "/api/explore" in info["paths"]
+    assert not any(path.startswith("/api/translate") for path in info["paths"])
+    # Process geo không import service dịch (không batcher, không model)
+    assert not info["translation_loaded"]
+
+
+def test_translation_profile_does_not_mount_geo(tmp_path):
+    info = probe("translation", tmp_path)
+    assert "/api/translate/stream" in info["paths"]
+    assert not any(path in info["paths"] for path in ("/api/explore", "/api/pois", "/api/weather"))
+    assert not info["geo_loaded"]
+
+
+def test_all_profile_mounts_both(tmp_path):
+    paths = probe("all", tmp_path)["paths"]
+    assert "/api/explore" in paths and "/api/translate" in paths
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    result = run_profile("everything", tmp_path)
+    assert result.returncode != 0
+    assert "APP_PROFILE" in result.stderr
@@ -0,0 +1,112 @@
+"""
+Kiểm thử cache 2 tầng (LRU + SQLite)
+"""
+
+import os
+
+import pytest
+
+from services import cache as cache_module
+from services.cache import TwoTierCache
+
+
+def test_peek_ttl_has_no_side_effects(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TwoTierCache("tiles", path=path).set("12/1/1", [1], ttl=100)
+
+    # Process mới (VD sau restart): entry chỉ có trên đĩa
+    cache = TwoTierCache("tiles", path=path)
+    assert 99 < cache.peek_ttl("12/1/1") <= 100
+    assert cache.peek_ttl("12/9/9") is None
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.stats()["disk_hits"] == cache.stats()["misses"] == 0
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TwoTierCache("geocode")
+    cache.set("hà nội", [21.0, 105.8], ttl=10)
+
+    clock.now += 9
+    assert cache.get("hà nội") == (True, [21.0, 105.8])
+    clock.now += 2
+    assert cache.get("hà nội") == (False, None)
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_expired_entry_served_only_when_stale_allowed(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TwoTierCache("geocode", path=path, max_stale=60)
+    cache.set("huế", [16.46, 107.59], ttl=10)
+
+    clock.now += 30
+    assert cache.get("huế") == (False, None)
+    assert cache.get("huế", allow_stale=True) == (True, [16.46, 107.59])
+    assert cache.stats()["stale_hits"] == 1
+
+    # Quá max_stale: bị xóa khỏi cả 2 tầng
+    clock.now += 60
+    assert cache.get("huế", allow_stale=True) == (False, None)
+    assert TwoTierCache("geocode", path=path, max_stale=3600).get("huế", allow_stale=True) == (False, None)
+
+
+def test_disk_tier_survives_restart_and_refills_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = TwoTierCache("geocode", path=path, max_entries=1)
+    first.set("a", 1, ttl=100)
+    first.set("b", 2, ttl=100)
+    assert first.stats()["evictions"] == 1
+    # "a" bị loại khỏi LRU nhưng vẫn còn trên đĩa
+    assert first.get("a") == (True, 1)
+    assert first.stats()["disk_hits"] == 1
+
+    second = TwoTierCache("geocode", path=path)
+    assert second.get("b") == (True, 2)
+    assert second.get("b") == (True, 2)
+    assert (second.stats()["disk_hits"], second.stats()["memory_hits"]) == (1, 1)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="cần os.fork")
+def test_forked_child_reopens_database(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TwoTierCache("geocode", path=path)
+    cache.set("parent", 1)
+    parent_db = cache._db
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Process con (như worker gunicorn sau preload_app)
+        try:
+            os.close(read_fd)
+            cache.set("child", 2)
+            reopened = cache._db is not parent_db and cache._inherited_db is parent_db
+            result = b"ok" if reopened and cache.get("parent") == (True, 1) else b"not reopened"
+        except Exception as exc:
+            result = repr(exc).encode()
+        os.write(write_fd, result)
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        result = pipe.read()
+    os.waitpid(pid, 0)
+    assert result == b"ok"
+    # Kết nối của process cha vẫn dùng được và thấy dữ liệu con đã ghi
+    assert cache._db is parent_db
+    assert cache.get("child") == (True, 2)
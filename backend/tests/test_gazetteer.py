@@ -0,0 +1,76 @@
+"""
+Kiểm thử gazetteer offline trên index dựng từ data/vn_gazetteer.csv
+
+Chạy từ thư mục backend:
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+from services.gazetteer import Gazetteer, build_index, plausible_match
+
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "vn_gazetteer.csv")
+
+
+@pytest.fixture(scope="module")
+def gazetteer(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("gazetteer") / "gazetteer.idx")
+    build_index(CSV_PATH, path)
+    index = Gazetteer(path)
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Hà Nội", "Hà Nội"),
+    ("Quận 1", "Quận 1"),
+    ("Hồ Hoàn Kiếm", "Hồ Hoàn Kiếm"),
+])
+def test_exact_name(gazetteer, query, expected):
+    match = gazetteer.lookup(query)
+    assert match["name"] == expected
+    assert match["score"] == 1.0
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ha noi", "Hà Nội"),
+    ("  HO HOAN   KIEM ", "Hồ Hoàn Kiếm"),
+    ("Da Nang", "Đà Nẵng"),
+])
+def test_unaccented_name(gazetteer, query, expected):
+    assert gazetteer.lookup(query)["name"] == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Vịnh Hạ Lon", "Vịnh Hạ Long"),
+    ("Thanh pho Ho Chi Mnh", "Thành phố Hồ Chí Minh"),
+])
+def test_misspelled_name(gazetteer, query, expected):
+    match = gazetteer.lookup(query)
+    assert match["name"] == expected
+    assert match["score"] < 1.0
+
+
+@pytest.mark.parametrize("query", ["Quận 10", "Quận 11", "Quận 12", "Quan 10"])
+def test_numbered_near_miss_falls_through(gazetteer, query):
+    # "Quận 1" giống tới 0.8 theo trigram nhưng là quận khác: để Nominatim trả lời
+    assert gazetteer.lookup(query) is None
+
+
+def test_missing_token_falls_through(gazetteer):
+    # "Chợ Bến Thành" có thêm từ "chợ": không đoán là cùng địa danh
+    assert gazetteer.lookup("Bến Thành") is None
+
+
+def test_short_name_needs_higher_similarity(gazetteer):
+    assert gazetteer.lookup("Ha Nol") is None
+
+
+def test_plausible_match():
+    assert plausible_match("vinh ha lon", "vinh ha long")
+    assert not plausible_match("quan 10", "quan 1")
+    assert not plausible_match("ben thanh", "cho ben thanh")
+    assert not plausible_match("ha nam", "ha noi")
@@ -0,0 +1,40 @@
+"""
+Kiểm thử response cache được qua HTTP: header của 304 và Vary sau khi nén
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services import http_cache
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(http_cache.CompressionMiddleware, minimum_size=100)
+
+    @app.get("/small")
+    async def small(request: Request):
+        return http_cache.cached_json(request, {"ok": True}, 60)
+
+    @app.get("/large")
+    async def large(request: Request):
+        return http_cache.cached_json(request, {"items": ["Hồ Hoàn Kiếm"] * 200}, 60)
+
+    return TestClient(app)
+
+
+def test_not_modified_keeps_cache_headers():
+    client = make_client()
+    for path in ("/small", "/large"):
+        first = client.get(path, headers={"Accept-Encoding": "gzip"})
+        revalidated = client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == first.headers["etag"]
+        assert revalidated.headers["cache-control"] == first.headers["cache-control"]
+        assert revalidated.headers["vary"] == "Accept-Encoding"
+
+
+def test_compressed_response_has_single_vary():
+    response = make_client().get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers.get_list("vary") == ["Accept-Encoding"]
@@ -0,0 +1,202 @@
+"""
+Kiểm thử LocationService với upstream giả (Overpass, Open-Meteo): cache POI theo ô
+bản đồ và gộp lời gọi thời tiết
+"""
+
+import asyncio
+import re
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+
+from services import location_service
+from services.cache import TwoTierCache
+from services.location_service import LocationService
+from services.tiles import lat_lng_to_tile, tile_bounds
+from services.weather_cache import WeatherCache
+
+
+OVERPASS_URL = "http://overpass.test/api/interpreter"
+OPEN_METEO_URL = "http://open-meteo.test/v1/forecast"
+
+# POI quanh Hồ Hoàn Kiếm và Văn Miếu (Hà Nội)
+POIS = [
+    {"type": "node", "id": 1, "lat": 21.0287, "lon": 105.8524, "tags": {"name": "Hồ Hoàn Kiếm", "tourism": "attraction"}},
+    {"type": "node", "id": 2, "lat": 21.0285, "lon": 105.8356, "tags": {"name": "Văn Miếu", "historic": "monument"}},
+    {"type": "node", "id": 3, "lat": 21.0368, "lon": 105.8347, "tags": {"name": "Lăng Bác", "historic": "memorial"}},
+    {"type": "node", "id": 4, "lat": 21.0245, "lon": 105.8412, "tags": {"name": "Bảo tàng Mỹ thuật", "tourism": "museum"}},
+]
+
+_BBOX_RE = re.compile(r"\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)")
+
+
+class FakeHttp:
+    """HttpClient giả: trả lời Overpass theo bbox trong query, Open-Meteo theo danh sách tọa độ"""
+
+    def __init__(self):
+        self.overpass_bboxes = []
+        self.open_meteo_calls = []
+        self.open_meteo_fail = set()
+
+    async def get(self, url, **kwargs):
+        # /api/status của Overpass
+        return httpx.Response(200, text="Rate limit: 2\n2 slots available now.\n", request=httpx.Request("GET", url))
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        request = httpx.Request(method, url)
+        host = urlsplit(url).netloc
+        if host == urlsplit(OVERPASS_URL).netloc:
+            south, west, north, east = map(float, _BBOX_RE.search(kwargs["data"]["data"]).groups())
+            self.overpass_bboxes.append((south, west, north, east))
+            elements = [
+                poi for poi in POIS
+                if south <= poi["lat"] <= north and west <= poi["lon"] <= east
+            ]
+            return httpx.Response(200, json={"elements": elements}, request=request)
+
+        params = kwargs["params"]
+        lats = [float(value) for value in params["latitude"].split(",")]
+        lngs = [float(value) for value in params["longitude"].split(",")]
+        self.open_meteo_calls.append(list(zip(lats, lngs)))
+        if len(self.open_meteo_calls) in self.open_meteo_fail:
+            return httpx.Response(500, request=request)
+        locations = [
+            {
+                "latitude": lat,
+                "longitude": lng,
+                "current": {"time": "2024-05-01T10:00", "interval": 900, "temperature_2m": 30 + i, "weather_code": 0},
+            }
+            for i, (lat, lng) in enumerate(zip(lats, lngs))
+        ]
+        return httpx.Response(200, json=locations if len(locations) > 1 else locations[0], request=request)
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch):
+    monkeypatch.setenv("OVERPASS_URLS", OVERPASS_URL)
+    monkeypatch.setenv("OPEN_METEO_URL", OPEN_METEO_URL)
+    monkeypatch.setenv("RATE_LIMIT_STATE_DIR", str(tmp_path / "ratelimit"))
+    monkeypatch.setenv("POI_STORE_PATH", str(tmp_path / "missing.store"))
+    monkeypatch.setenv("GAZETTEER_PATH", str(tmp_path / "missing.idx"))
+
+    def make(http=None):
+        return LocationService(
+            http_client=http or FakeHttp(),
+            geocode_cache=TwoTierCache("geocode"),
+            poi_tile_cache=TwoTierCache("poi_tiles", path=str(tmp_path / "poi_tiles.sqlite3")),
+            weather_cache=WeatherCache(),
+        )
+
+    return make
+
+
+def poi_names(service, lat, lng, radius_km=2.0):
+    pois, fallback = asyncio.run(service.search_points_of_interest(lat, lng, limit=10, radius_km=radius_km))
+    assert not fallback
+    return {poi["name"] for poi in pois}
+
+
+def test_nearby_queries_reuse_cached_tiles(make_service):
+    service = make_service()
+    assert "Hồ Hoàn Kiếm" in poi_names(service, 21.0287, 105.8524)
+    assert len(service.http.overpass_bboxes) == 1
+
+    # Dịch vài trăm mét: cùng các ô bản đồ nên không gọi lại Overpass
+    assert "Hồ Hoàn Kiếm" in poi_names(service, 21.0290, 105.8520)
+    assert len(service.http.overpass_bboxes) == 1
+    assert service.poi_tile_cache.stats()["memory_hits"] > 0
+
+
+def test_only_missing_tiles_are_fetched(make_service):
+    service = make_service()
+    poi_names(service, 21.0287, 105.8524, radius_km=1.0)
+    cached = set(service._indexed_tiles)
+
+    # Dịch về phía tây sang ô kế bên: một phần ô đã có trong cache
+    assert "Văn Miếu" in poi_names(service, 21.0287, 105.8250, radius_km=1.5)
+    assert len(service.http.overpass_bboxes) == 2
+    south, west, north, east = service.http.overpass_bboxes[1]
+    zoom = service.poi_tile_zoom
+    for key in cached:
+        _, x, y = map(int, key.split("/"))
+        tile_south, tile_west, tile_north, tile_east = tile_bounds((x, y), zoom)
+        center = ((tile_south + tile_north) / 2, (tile_west + tile_east) / 2)
+        inside = south < center[0] < north and west < center[1] < east
+        assert not inside, f"ô {key} đã có trong cache nhưng vẫn bị tải lại"
+
+
+def test_tiles_survive_restart(make_service):
+    poi_names(make_service(), 21.0287, 105.8524)
+
+    # Process mới dùng chung file SQLite: ô được nạp từ đĩa, không gọi Overpass
+    restarted = make_service()
+    assert "Hồ Hoàn Kiếm" in poi_names(restarted, 21.0287, 105.8524)
+    assert restarted.http.overpass_bboxes == []
+    assert restarted.poi_tile_cache.stats()["disk_hits"] > 0
+
+
+def test_elements_are_assigned_to_their_tile(make_service):
+    service = make_service()
+    poi_names(service, 21.0287, 105.8524)
+    zoom = service.poi_tile_zoom
+    for poi in POIS:
+        x, y = lat_lng_to_tile(poi["lat"], poi["lon"], zoom)
+        found, elements = service.poi_tile_cache.get(f"{zoom}/{x}/{y}")
+        if found:
+            assert poi["id"] in {element["id"] for element in elements}
+
+
+def test_weather_for_many_points_uses_one_call(make_service):
+    service = make_service()
+    points = [(21.0287, 105.8524), (16.4637, 107.5909), (21.0288, 105.8525), (10.7769, 106.7009)]
+    results = asyncio.run(service.get_weather_batch(points, "en"))
+
+    # Hai điểm đầu/thứ ba cùng ô lưới: chỉ gửi 3 tọa độ trong một lời gọi
+    assert len(service.http.open_meteo_calls) == 1
+    assert len(service.http.open_meteo_calls[0]) == 3
+    assert [result["temperature"] for result in results] == [30, 31, 30, 32]
+    assert results[0]["description"] == "Clear sky"
+    assert service.weather_cache.stats()["upstream_calls"] == 1
+
+    # Lần sau lấy từ cache
+    asyncio.run(service.get_weather_batch(points))
+    assert len(service.http.open_meteo_calls) == 1
+
+
+def test_single_point_weather_accepts_object_response(make_service):
+    service = make_service()
+    weather = asyncio.run(service.get_weather(21.0287, 105.8524))
+    assert weather["temperature"] == 30
+    assert len(service.http.open_meteo_calls[0]) == 1
+
+
+def test_failed_weather_chunk_maps_to_its_points_only(make_service, monkeypatch):
+    monkeypatch.setattr(location_service, "WEATHER_BATCH_SIZE", 2)
+    service = make_service()
+    # Lô thứ hai (2 tọa độ cuối) bị lỗi 500
+    service.http.open_meteo_fail = {2}
+    points = [(21.0287, 105.8524), (16.4637, 107.5909), (10.7769, 106.7009), (12.2388, 109.1967)]
+    results = asyncio.run(service.get_weather_batch(points))
+
+    assert [len(call) for call in service.http.open_meteo_calls] == [2, 2]
+    assert [result is not None for result in results] == [True, True, False, False]
+    assert service.weather_cache.stats()["upstream_calls"] == 2
+
+    # Ô lỗi không được cache: lần sau chỉ gọi lại cho các ô đó
+    results = asyncio.run(service.get_weather_batch(points))
+    assert service.http.open_meteo_calls[-1] == [service.weather_cache.snap(*point) for point in points[2:]]
+    assert all(result is not None for result in results)
+
+
+def test_failed_weather_falls_back_to_stale_cell(make_service, monkeypatch):
+    service = make_service()
+    asyncio.run(service.get_weather(21.0287, 105.8524))
+    key = service.weather_cache.key(21.0287, 105.8524)
+    # Ô hết hạn nhưng còn trong khoảng max_stale, Open-Meteo lỗi ở lần gọi kế tiếp
+    service.weather_cache.cache.set(key, {"temperature": 25, "weather_code": 3}, ttl=-1)
+    service.http.open_meteo_fail = {2}
+
+    weather = asyncio.run(service.get_weather(21.0287, 105.8524))
+    assert weather["temperature"] == 25
+    assert service.weather_cache.stats()["stale_hits"] == 1
@@ -0,0 +1,176 @@
+"""
+Kiểm thử các endpoint của app (không chạy lifespan, không gọi upstream thật)
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Cache của app trong thư mục tạm, không ghi vào cache/ của repo
+_CACHE_DIR = tempfile.mkdtemp(prefix="test-main-")
+for _name, _file in (
+    ("GEOCODE_CACHE_PATH", "geocode.sqlite3"),
+    ("POI_TILE_CACHE_PATH", "poi_tiles.sqlite3"),
+    ("TRANSLATION_CACHE_PATH", "translations.sqlite3"),
+    ("RATE_LIMIT_STATE_DIR", "ratelimit"),
+    ("WEATHER_CACHE_PATH", "weather.sqlite3"),
+    ("PREFETCH_LOCK_PATH", "prefetch.lock"),
+):
+    os.environ.setdefault(_name, os.path.join(_CACHE_DIR, _file))
+
+import main  # noqa: E402
+from services.spatial_index import SpatialIndex  # noqa: E402
+from services.translation_batcher import TranslationBatcher  # noqa: E402
+
+
+@pytest.fixture
+def empty_pois(monkeypatch):
+    """Kho POI rỗng: mọi truy vấn POI rơi vào danh sách mẫu"""
+    monkeypatch.setattr(main.location_service, "offline_pois", True)
+    monkeypatch.setattr(main.location_service, "poi_index", SpatialIndex())
+    return TestClient(main.app)
+
+
+def test_fallback_pois_are_not_cacheable(empty_pois):
+    response = empty_pois.get("/api/pois", params={"lat": 21.03, "lng": 105.85, "categories": "historic"})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Địa điểm 1"
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_explore_with_fallback_pois_is_not_cacheable(empty_pois, monkeypatch):
+    async def coordinates(query):
+        return {"lat": 21.03, "lng": 105.85}
+
+    async def no_weather(pois, lang):
+        return [{**poi, "weather": None} for poi in pois]
+
+    monkeypatch.setattr(main.location_service, "get_coordinates", coordinates)
+    monkeypatch.setattr(main.location_service, "attach_weather", no_weather)
+    response = empty_pois.get("/api/explore", params={"q": "Hoàn Kiếm"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_weather_batch_keeps_order_and_maps_errors(monkeypatch):
+    async def partial(coordinates, lang):
+        return [
+            {"temperature": round(lat), "description": "Trời quang", "icon": "☀️"} if lat > 15 else None
+            for lat, _ in coordinates
+        ]
+
+    client = TestClient(main.app)
+    body = {"coordinates": [{"lat": 21.03, "lng": 105.85}, {"lat": 10.78, "lng": 106.7}, {"lat": 16.46, "lng": 107.59}]}
+    monkeypatch.setattr(main.location_service, "get_weather_batch", partial)
+    response = client.post("/api/weather/batch", json=body)
+    assert response.status_code == 200
+    assert [item and item["temperature"] for item in response.json()] == [21, None, 16]
+
+    async def broken(coordinates, lang):
+        raise RuntimeError("Open-Meteo down")
+
+    monkeypatch.setattr(main.location_service, "get_weather_batch", broken)
+    assert client.post("/api/weather/batch", json=body).json() == [None, None, None]
+
+
+@pytest.fixture
+def explore(monkeypatch):
+    """Các bước của /api/explore được thay bằng hàm giả có ghi lại lời gọi"""
+    calls = {"search": [], "weather": []}
+
+    async def coordinates(query):
+        return {"lat": 21.03, "lng": 105.85} if query == "Hoàn Kiếm" else None
+
+    async def search(lat, lng, limit=5, radius_km=10.0, categories=None, lang="vi"):
+        calls["search"].append((lat, lng, limit, radius_km, lang))
+        pois = [
+            {"name": f"POI {i}", "description": "", "coordinates": {"lat": lat + i / 100, "lng": lng}, "distance_km": i}
+            for i in range(limit)
+        ]
+        return pois, False
+
+    async def weather(pois, lang):
+        calls["weather"].append(len(pois))
+        return [{**poi, "weather": {"temperature": 30, "description": "Trời quang", "icon": "☀️"}} for poi in pois]
+
+    monkeypatch.setattr(main.location_service, "get_coordinates", coordinates)
+    monkeypatch.setattr(main.location_service, "search_points_of_interest", search)
+    monkeypatch.setattr(main.location_service, "attach_weather", weather)
+    monkeypatch.setattr(main.location_service, "poi_ttl", lambda lat, lng, radius_km: 600)
+    monkeypatch.setattr(main.location_service, "weather_ttl", lambda coordinates: 300)
+    return TestClient(main.app), calls
+
+
+def test_explore_fans_out_from_geocode_to_pois_and_weather(explore):
+    client, calls = explore
+    response = client.get("/api/explore", params={"q": "Hoàn Kiếm", "limit": 3, "radius_km": 5, "lang": "en"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["coordinates"] == {"lat": 21.03, "lng": 105.85}
+    # POI tìm quanh tọa độ vừa geocode, thời tiết của mọi POI trong một lời gọi batch
+    assert calls["search"] == [(21.03, 105.85, 3, 5.0, "en")]
+    assert calls["weather"] == [3]
+    assert [poi["weather"]["temperature"] for poi in data["pois"]] == [30, 30, 30]
+    assert response.headers["cache-control"].startswith("public, max-age=300")
+
+
+def test_explore_returns_pois_when_weather_is_slow(explore, monkeypatch):
+    client, _ = explore
+
+    async def slow_weather(pois, lang):
+        await asyncio.sleep(1)
+        return pois
+
+    monkeypatch.setattr(main, "EXPLORE_WEATHER_TIMEOUT", 0.05)
+    monkeypatch.setattr(main.location_service, "attach_weather", slow_weather)
+    response = client.get("/api/explore", params={"q": "Hoàn Kiếm", "limit": 2})
+    assert response.status_code == 200
+    assert [poi["weather"] for poi in response.json()["pois"]] == [None, None]
+
+
+def test_explore_unknown_place_is_404(explore):
+    client, calls = explore
+    assert client.get("/api/explore", params={"q": "Atlantis"}).status_code == 404
+    assert calls["search"] == []
+
+
+def upper_batch(source_lang, target_lang, texts):
+    return [text.upper() for text in texts]
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_translate_stream_ends_with_done(monkeypatch):
+    monkeypatch.setattr(main.huggingface_service, "batcher", TranslationBatcher(upper_batch, max_wait_ms=0))
+    text = "  Streaming works. Sentence by sentence!\n\nLast one."
+    response = TestClient(main.app).post(
+        "/api/translate/stream", json={"text": text, "source_lang": "en", "target_lang": "vi"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = read_ndjson(response)
+    assert lines[-1] == {"done": True}
+    chunks = lines[:-1]
+    assert [chunk["index"] for chunk in chunks] == list(range(len(chunks)))
+    assert "".join(chunk["text"] + chunk["separator"] for chunk in chunks) == text.upper()
+
+
+def test_translate_stream_reports_error_instead_of_done(monkeypatch):
+    def broken_batch(source_lang, target_lang, texts):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(main.huggingface_service, "batcher", TranslationBatcher(broken_batch, max_wait_ms=0))
+    response = TestClient(main.app).post(
+        "/api/translate/stream", json={"text": "Never cached before.", "source_lang": "en", "target_lang": "vi"}
+    )
+    lines = read_ndjson(response)
+    assert "model crashed" in lines[-1]["error"]
+    assert {"done": True} not in lines
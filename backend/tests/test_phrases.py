@@ -0,0 +1,106 @@
+"""
+Kiểm thử TagClassifier: mô tả tiếng Việt phải giống hệt chuỗi if/elif cũ trong
+LocationService._generate_description (trước khi chuyển sang bộ câu dịch sẵn)
+"""
+
+import itertools
+
+import pytest
+
+from services.phrases import TagClassifier
+
+
+def legacy_description(tags: dict) -> str:
+    """Bản sao nguyên văn chuỗi if/elif cũ, dùng làm kết quả chuẩn"""
+    tourism = tags.get("tourism", "")
+    historic = tags.get("historic", "")
+    natural = tags.get("natural", "")
+    amenity = tags.get("amenity", "")
+    description = tags.get("description", "")
+
+    if tourism == "attraction":
+        base_desc = "Điểm tham quan du lịch nổi tiếng"
+    elif tourism == "museum":
+        base_desc = "Bảo tàng lưu giữ di sản văn hóa và lịch sử"
+    elif tourism == "viewpoint":
+        base_desc = "Điểm ngắm cảnh đẹp, view panorama tuyệt vời"
+    elif tourism == "artwork":
+        base_desc = "Tác phẩm nghệ thuật công cộng, điểm check-in độc đáo"
+    elif tourism == "gallery":
+        base_desc = "Phòng tranh nghệ thuật, triển lãm đa dạng"
+    elif historic == "memorial":
+        base_desc = "Đài tưởng niệm lịch sử, nơi tôn vinh các anh hùng dân tộc"
+    elif historic == "monument":
+        base_desc = "Di tích lịch sử quan trọng, kiến trúc đặc sắc"
+    elif historic == "archaeological_site":
+        base_desc = "Khu di tích khảo cổ học, dấu tích văn minh cổ đại"
+    elif historic == "castle":
+        base_desc = "Lâu đài cổ kính, kiến trúc thời phong kiến"
+    elif historic == "ruins":
+        base_desc = "Tàn tích lịch sử, dấu vết của thời gian"
+    elif natural == "beach":
+        base_desc = "Bãi biển đẹp, cát trắng nước trong, lý tưởng để nghỉ dưỡng"
+    elif natural == "cave":
+        base_desc = "Hang động tự nhiên, khám phá thạch nhũ kỳ thú"
+    elif natural == "peak":
+        base_desc = "Đỉnh núi hùng vĩ, chinh phục và ngắm cảnh từ trên cao"
+    elif natural == "waterfall":
+        base_desc = "Thác nước hùng vĩ, khung cảnh thiên nhiên tuyệt đẹp"
+    elif amenity == "place_of_worship":
+        base_desc = "Nơi thờ cúng tâm linh, kiến trúc tôn giáo độc đáo"
+    else:
+        if tourism:
+            base_desc = f"Địa điểm du lịch thú vị - {tourism}"
+        elif historic:
+            base_desc = f"Di tích lịch sử - {historic}"
+        elif natural:
+            base_desc = f"Kỳ quan thiên nhiên - {natural}"
+        else:
+            base_desc = "Địa điểm đáng khám phá tại Việt Nam"
+
+    if description:
+        base_desc += f". {description}"
+    return base_desc
+
+
+# Mỗi tag: không có, các giá trị có luật riêng, và một giá trị chỉ khớp fallback
+TAG_VALUES = {
+    "tourism": ["", "attraction", "museum", "viewpoint", "artwork", "gallery", "hotel"],
+    "historic": ["", "memorial", "monument", "archaeological_site", "castle", "ruins", "pagoda"],
+    "natural": ["", "beach", "cave", "peak", "waterfall", "water"],
+    "amenity": ["", "place_of_worship", "cafe"],
+}
+
+
+def all_combinations():
+    for values in itertools.product(*TAG_VALUES.values()):
+        yield {tag: value for tag, value in zip(TAG_VALUES, values) if value}
+
+
+def test_matches_legacy_chain_for_every_tag_combination():
+    classifier = TagClassifier()
+    mismatches = [
+        (tags, classifier.describe(tags, "vi"), legacy_description(tags))
+        for tags in all_combinations()
+        if classifier.describe(tags, "vi") != legacy_description(tags)
+    ]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("tags, expected", [
+    # tourism đứng trước historic trong chuỗi cũ
+    ({"tourism": "museum", "historic": "castle"}, "Bảo tàng lưu giữ di sản văn hóa và lịch sử"),
+    # Giá trị tourism không có luật riêng không chặn luật của historic
+    ({"tourism": "hotel", "historic": "ruins"}, "Tàn tích lịch sử, dấu vết của thời gian"),
+    ({"historic": "monument", "natural": "peak"}, "Di tích lịch sử quan trọng, kiến trúc đặc sắc"),
+    ({"natural": "cave", "amenity": "place_of_worship"}, "Hang động tự nhiên, khám phá thạch nhũ kỳ thú"),
+    # Fallback theo tag đầu tiên có giá trị
+    ({"tourism": "hotel", "historic": "pagoda"}, "Địa điểm du lịch thú vị - hotel"),
+    ({"historic": "pagoda", "natural": "water"}, "Di tích lịch sử - pagoda"),
+    ({"amenity": "cafe"}, "Địa điểm đáng khám phá tại Việt Nam"),
+    ({}, "Địa điểm đáng khám phá tại Việt Nam"),
+    ({"tourism": "attraction", "description": "Mở cửa 8h-17h"}, "Điểm tham quan du lịch nổi tiếng. Mở cửa 8h-17h"),
+])
+def test_precedence(tags, expected):
+    assert legacy_description(tags) == expected
+    assert TagClassifier().describe(tags, "vi") == expected
@@ -0,0 +1,100 @@
+"""
+Kiểm thử kho POI offline và spatial index với node/way/relation trùng id
+"""
+
+import random
+
+import pytest
+
+from services import poi_store
+from services.poi_store import PoiStore, PoiStoreWriter
+from services.spatial_index import SpatialIndex, StoreIndex
+
+
+def test_store_keeps_element_type(tmp_path):
+    writer = PoiStoreWriter()
+    writer.add(42, 21.0287, 105.8524, {"name": "Hồ Hoàn Kiếm", "natural": "water", "tourism": "attraction"})
+    writer.add(42, 21.0285, 105.8542, {"name": "Văn Miếu", "historic": "monument"}, "way")
+    path = str(tmp_path / "pois.store")
+    writer.save(path)
+
+    elements = list(PoiStore(path).iter_elements())
+    assert sorted((element["type"], element["id"]) for element in elements) == [("node", 42), ("way", 42)]
+
+
+def test_index_does_not_merge_same_id_across_types():
+    index = SpatialIndex()
+    index.add([
+        {"type": "node", "id": 7, "lat": 21.0287, "lon": 105.8524, "tags": {"name": "A", "tourism": "attraction"}},
+        {"type": "way", "id": 7, "lat": 21.0290, "lon": 105.8530, "tags": {"name": "B", "historic": "monument"}},
+    ])
+    assert len(index) == 2
+    index.build()
+    names = {element["tags"]["name"] for _, element in index.nearest(21.0287, 105.8524, k=5)}
+    assert names == {"A", "B"}
+
+
+
+def random_pois(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    kinds = [{"tourism": "attraction"}, {"historic": "monument"}, {"natural": "beach"}, {"tourism": "museum", "historic": "fort"}]
+    return [
+        (row, 10 + rng.random() * 10, 103 + rng.random() * 6, {"name": f"P{row}", **rng.choice(kinds)})
+        for row in range(count)
+    ]
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    writer = PoiStoreWriter()
+    for row, lat, lon, tags in random_pois(500):
+        writer.add(row, lat, lon, tags)
+    path = str(tmp_path / "pois.store")
+    writer.save(path)
+    return path
+
+
+def reference_index():
+    index = SpatialIndex()
+    index.add({"type": "node", "id": row, "lat": lat, "lon": lon, "tags": tags} for row, lat, lon, tags in random_pois(500))
+    index.build()
+    return index
+
+
+@pytest.mark.parametrize("categories", [None, ["historic"], ["natural", "tourism"]])
+def test_store_index_matches_spatial_index(store_path, categories):
+    store_index, reference = StoreIndex(PoiStore(store_path)), reference_index()
+    for lat, lng in [(16.0, 106.0), (10.0, 103.0), (21.0287, 105.8524)]:
+        expected = reference.nearest(lat, lng, k=7, radius_km=300, categories=categories)
+        actual = store_index.nearest(lat, lng, k=7, radius_km=300, categories=categories)
+        assert [element["id"] for _, element in actual] == [element["id"] for _, element in expected]
+        assert [round(d, 6) for d, _ in actual] == [round(d, 6) for d, _ in expected]
+
+
+def test_store_index_materialises_only_results(store_path, monkeypatch):
+    store = PoiStore(store_path)
+    index = StoreIndex(store)
+    built = []
+    element = store.element
+    monkeypatch.setattr(store, "element", lambda row: built.append(row) or element(row))
+    assert len(index.nearest(16.0, 106.0, k=5)) == 5
+    assert len(built) == 5
+
+
+def test_legacy_store_is_reordered_on_load(tmp_path, monkeypatch):
+    # File version 2 ghi các hàng theo thứ tự thêm vào, chưa xếp theo KD-tree
+    monkeypatch.setattr(poi_store, "VERSION", 2)
+    monkeypatch.setattr(poi_store, "kd_order", lambda lats, lons: list(range(len(lats))))
+    writer = PoiStoreWriter()
+    for row, lat, lon, tags in random_pois(200, seed=2):
+        writer.add(row, lat, lon, tags)
+    path = str(tmp_path / "legacy.store")
+    writer.save(path)
+    monkeypatch.undo()
+
+    index = StoreIndex(PoiStore(path))
+    reference = SpatialIndex()
+    reference.add({"type": "node", "id": row, "lat": lat, "lon": lon, "tags": tags} for row, lat, lon, tags in random_pois(200, seed=2))
+    reference.build()
+    expected = [element["id"] for _, element in reference.nearest(15.0, 105.0, k=10)]
+    assert [element["id"] for _, element in index.nearest(15.0, 105.0, k=10)] == expected
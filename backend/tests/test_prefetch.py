@@ -0,0 +1,93 @@
+"""
+Kiểm thử prefetch: chọn điểm đến theo độ phổ biến, chọn khóa sắp hết hạn để làm mới
+và chỉ một process làm mới
+"""
+
+import asyncio
+
+from services import prefetch
+from services.prefetch import PopularityTracker, Prefetcher
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_top_ranks_by_decayed_popularity(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prefetch.time, "time", clock)
+    tracker = PopularityTracker(half_life=100)
+
+    for _ in range(4):
+        tracker.record(21.03, 105.85, name="Hà Nội")
+    clock.now += 200
+    # Hà Nội: 4 lượt từ 2 half-life trước = 1 điểm; Huế: 2 lượt vừa xong = 2 điểm
+    for _ in range(2):
+        tracker.record(16.46, 107.59, name="Huế")
+    tracker.record(10.77, 106.70, name="Sài Gòn")
+
+    assert [d.name for d in tracker.top(3)] == ["Huế", "Hà Nội", "Sài Gòn"]
+    assert [d.name for d in tracker.top(3, min_score=1.5)] == ["Huế"]
+    assert [d.name for d in tracker.top(1)] == ["Huế"]
+
+
+def test_nearby_queries_count_as_one_destination():
+    tracker = PopularityTracker()
+    tracker.record(21.0285, 105.8542, name="Hoàn Kiếm")
+    tracker.record(21.0291, 105.8537, radius_km=10, limit=5, weather=True)
+    (destination,) = tracker.top(5)
+    assert destination.name == "Hoàn Kiếm"
+    assert (destination.radius_km, destination.limit, destination.weather) == (10, 5, True)
+
+
+def test_refreshes_only_keys_expiring_within_lead(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(prefetch.time, "time", clock)
+    prefetcher = Prefetcher(None, interval=5, lock_path=str(tmp_path / "prefetch.lock"))
+    lead = prefetcher.leads["poi_tiles"]
+    ttls = {"fresh": lead + 100, "expiring": lead - 1, "missing": None}
+    refreshed = []
+
+    async def refresh(keys):
+        refreshed.extend(keys)
+        for key in keys:
+            ttls[key] = 3600
+
+    async def run():
+        return await prefetcher._refresh_due("poi_tiles", dict(ttls), refresh, lambda: dict(ttls))
+
+    assert asyncio.run(run())
+    assert sorted(refreshed) == ["expiring", "missing"]
+    assert prefetcher.counts["poi_tiles"] == {"renewed": 0, "expired": 0, "cold": 2}
+
+    # "fresh" hết hạn trước chu kỳ kế tiếp mà không được làm mới: tính là expired
+    clock.now += lead + 200
+    ttls["fresh"] = None
+    refreshed.clear()
+    assert asyncio.run(run())
+    assert refreshed == ["fresh"]
+    assert prefetcher.counts["poi_tiles"]["expired"] == 1
+
+    # Khóa đã theo dõi được làm mới khi còn hạn ít hơn lead: renewed
+    clock.now += 3600 - lead + 1
+    ttls.update(fresh=3600, expiring=lead - 1, missing=3600)
+    refreshed.clear()
+    assert asyncio.run(run())
+    assert refreshed == ["expiring"]
+    assert prefetcher.counts["poi_tiles"]["renewed"] == 1
+
+
+def test_only_one_prefetcher_is_leader(tmp_path):
+    path = str(tmp_path / "prefetch.lock")
+    first, second = Prefetcher(None, lock_path=path), Prefetcher(None, lock_path=path)
+    assert first.is_leader()
+    assert not second.is_leader()
+
+    # Leader dừng (VD worker bị restart): process khác nhận việc
+    asyncio.run(first.stop())
+    assert second.is_leader()
+    asyncio.run(second.stop())
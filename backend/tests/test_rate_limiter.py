@@ -0,0 +1,116 @@
+"""
+Kiểm thử rate limiter: thứ tự ưu tiên, token bucket dùng chung giữa các process
+và đọc /api/status của Overpass
+"""
+
+import asyncio
+import multiprocessing
+import time
+
+from services.rate_limiter import (
+    BACKGROUND, INTERACTIVE, OverpassSlots, RateLimiter, SharedTokenBucket, parse_overpass_status,
+)
+
+
+STATUS_FREE = """Connected as: 1234567890
+Current time: 2024-05-01T10:00:00Z
+Announced endpoint: none
+Rate limit: 2
+2 slots available now.
+Currently running queries (pid, space limit, time limit, start time):
+"""
+
+STATUS_BUSY = """Connected as: 1234567890
+Current time: 2024-05-01T10:00:00Z
+Rate limit: 2
+Slot available after: 2024-05-01T10:00:07Z, in 7 seconds.
+Slot available after: 2024-05-01T10:00:03Z, in 3 seconds.
+Currently running queries (pid, space limit, time limit, start time):
+"""
+
+
+def test_parse_overpass_status():
+    assert parse_overpass_status(STATUS_FREE) == (2, 2, None)
+    assert parse_overpass_status(STATUS_BUSY) == (2, 0, 3)
+    assert parse_overpass_status("<html>error</html>") == (None, None, None)
+
+
+def test_interactive_requests_jump_background_queue():
+    async def scenario():
+        limiter = RateLimiter("test", max_concurrent=1)
+        order = []
+
+        async def call(name, priority):
+            async with limiter.acquire(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        holder = asyncio.create_task(call("holder", INTERACTIVE))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(call("bg1", BACKGROUND)), asyncio.create_task(call("bg2", BACKGROUND))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("user", INTERACTIVE)))
+        await asyncio.gather(holder, *tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["holder", "user", "bg1", "bg2"]
+
+
+def test_overpass_slots_are_split_between_processes():
+    class FakeHttp:
+        async def get(self, url, timeout=None):
+            import httpx
+            return httpx.Response(200, text=STATUS_FREE, request=httpx.Request("GET", url))
+
+    async def scenario():
+        limiter = RateLimiter("overpass", max_concurrent=2)
+        await OverpassSlots(FakeHttp(), "http://overpass/api/status", limiter, processes=2)._refresh()
+        return limiter.max_concurrent
+
+    assert asyncio.run(scenario()) == 1
+
+
+def _take_tokens(path, deadline, results):
+    bucket = SharedTokenBucket(path, rate=10)
+    granted = 0
+    while time.time() < deadline:
+        wait = bucket.take()
+        if wait == 0:
+            granted += 1
+        else:
+            time.sleep(min(wait, 0.01))
+    results.put(granted)
+
+
+def test_shared_bucket_limits_all_processes_together(tmp_path):
+    path = str(tmp_path / "nominatim.bucket")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    deadline = time.time() + 2
+    workers = [context.Process(target=_take_tokens, args=(path, deadline, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    total = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join()
+    # 10 request/giây cho cả 3 process (không phải 10 cho mỗi process); process spawn
+    # xong trễ thì được ít hơn nên chỉ chặn trên
+    assert 1 <= total <= 21
+
+
+def test_limiters_sharing_a_bucket_wait_for_each_other(tmp_path):
+    path = str(tmp_path / "nominatim.bucket")
+
+    async def scenario():
+        limiters = [RateLimiter("a", rate=20, shared_path=path), RateLimiter("b", rate=20, shared_path=path)]
+
+        async def call(limiter):
+            async with limiter.acquire():
+                pass
+
+        start = time.monotonic()
+        await asyncio.gather(*(call(limiter) for limiter in limiters for _ in range(5)))
+        return time.monotonic() - start
+
+    # 10 lượt với 20 lượt/giây dùng chung: ít nhất 9 khoảng 50ms
+    assert asyncio.run(scenario()) >= 0.4
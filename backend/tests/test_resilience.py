@@ -0,0 +1,146 @@
+"""
+Kiểm thử circuit breaker (closed -> open -> half-open -> closed) và hedge/failover
+giữa các mirror của một upstream
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from services import resilience
+from services.resilience import CircuitBreaker, CircuitOpenError, Upstream
+
+
+PRIMARY = "http://primary.test/api/interpreter"
+MIRROR = "http://mirror.test/api/interpreter"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    # Thành công giữa chừng đặt lại bộ đếm
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats() == {"state": "open", "consecutive_failures": 3, "trips": 1, "rejected": 1}
+
+
+def test_half_open_allows_one_probe_then_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29
+    assert not breaker.allow()
+
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Chỉ một request thăm dò tại một thời điểm
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+
+    # Mở lại tính từ lần thăm dò lỗi
+    clock[0] += 29
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_releases_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+class FakeHttp:
+    """Mỗi URL trả về theo hành vi cấu hình sẵn: (độ trễ giây, status)"""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+        self.cancelled = []
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append(url)
+        delay, status = self.behaviours[url]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        return httpx.Response(status, text=url, request=httpx.Request(method, url))
+
+
+def test_failover_to_mirror_on_server_error():
+    http = FakeHttp({PRIMARY: (0, 503), MIRROR: (0, 200)})
+    upstream = Upstream("overpass", http, [PRIMARY, MIRROR], max_timeout=1)
+
+    response = asyncio.run(upstream.request("POST"))
+    assert response.text == MIRROR
+    assert http.calls == [PRIMARY, MIRROR]
+    assert upstream.failovers == 1
+    primary, mirror = upstream.endpoints
+    assert primary.breaker.failures == 1
+    assert mirror.wins == 1
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    # Chưa có mẫu độ trễ: hedge sau max_timeout / 4 = 0.05s
+    http = FakeHttp({PRIMARY: (0.5, 200), MIRROR: (0, 200)})
+    upstream = Upstream("overpass", http, [PRIMARY, MIRROR], max_timeout=0.2)
+
+    async def scenario():
+        response = await upstream.request("POST")
+        await asyncio.sleep(0)
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.text == MIRROR
+    assert upstream.hedged == 1
+    assert http.cancelled == [PRIMARY]
+    # Lần thử bị hủy không tính là lỗi
+    primary = upstream.endpoints[0]
+    assert primary.breaker.state == CircuitBreaker.CLOSED
+    assert primary.breaker.failures == 0
+
+
+def test_open_circuits_fail_fast():
+    http = FakeHttp({PRIMARY: (0, 500), MIRROR: (0, 500)})
+    upstream = Upstream("overpass", http, [PRIMARY, MIRROR], max_timeout=1, failure_threshold=1, hedge=False)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("POST"))
+    assert upstream.is_open
+
+    calls = len(http.calls)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.request("POST"))
+    assert len(http.calls) == calls
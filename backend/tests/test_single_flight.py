@@ -0,0 +1,112 @@
+"""
+Kiểm thử gộp lời gọi trùng nhau (SingleFlight)
+"""
+
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight("geocode")
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return {"lat": 21.03, "lng": 105.85}
+
+        callers = [asyncio.ensure_future(flight.do("hoàn kiếm", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        # Lời gọi đã xong: lần sau chạy lại
+        await flight.do("hoàn kiếm", fetch)
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result == {"lat": 21.03, "lng": 105.85} for result in results)
+    assert stats == {"executions": 2, "deduplicated": 4, "inflight": 0}
+
+
+def test_error_is_shared_and_not_cached():
+    async def scenario():
+        flight = SingleFlight("weather")
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do("cell", failing), flight.do("cell", failing), return_exceptions=True
+        )
+        assert len(attempts) == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        async def working():
+            return "ok"
+
+        return await flight.do("cell", working)
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        flight = SingleFlight("poi_tiles")
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "tile"
+
+        leader = asyncio.ensure_future(flight.do("12/3252/1803", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("12/3252/1803", fetch))
+        await asyncio.sleep(0)
+
+        # Client của caller dẫn đầu ngắt kết nối
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result, flight.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "tile"
+    assert stats["executions"] == 1
+    assert stats["inflight"] == 0
+
+
+def test_do_many_only_sends_keys_not_in_flight():
+    async def scenario():
+        flight = SingleFlight("poi_tiles")
+        batches = []
+        release = asyncio.Event()
+
+        async def fetch(keys):
+            batches.append(sorted(keys))
+            await release.wait()
+            return {key: key.upper() for key in keys}
+
+        first = asyncio.ensure_future(flight.do_many(["a", "b"], fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do_many(["b", "c", "c"], fetch))
+        await asyncio.sleep(0)
+        release.set()
+        return batches, await first, await second
+
+    batches, first, second = asyncio.run(scenario())
+    assert batches == [["a", "b"], ["c"]]
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
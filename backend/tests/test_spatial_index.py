@@ -0,0 +1,66 @@
+"""
+Kiểm thử spatial index: thay/gỡ POI theo ô và dựng cây ngoài event loop
+"""
+
+import asyncio
+
+from services.spatial_index import SpatialIndex
+
+
+def poi(element_id, lat, lon, name):
+    return {"type": "node", "id": element_id, "lat": lat, "lon": lon, "tags": {"name": name, "tourism": "attraction"}}
+
+
+def names(index, lat=21.03, lng=105.85, build=True):
+    if build:
+        index.build()
+    return {element["tags"]["name"] for _, element in index.nearest(lat, lng, k=10)}
+
+
+def test_replace_drops_elements_missing_from_refresh():
+    index = SpatialIndex()
+    index.replace("12/1/1", [poi(1, 21.03, 105.85, "A"), poi(2, 21.031, 105.851, "B")])
+    assert names(index) == {"A", "B"}
+
+    index.replace("12/1/1", [poi(1, 21.03, 105.85, "A")])
+    assert names(index) == {"A"}
+    assert len(index) == 1
+
+
+def test_remove_group_keeps_element_moved_to_other_group():
+    index = SpatialIndex()
+    index.replace("a", [poi(1, 21.03, 105.85, "A"), poi(2, 21.031, 105.851, "B")])
+    # B được ô khác nạp lại sau (VD di chuyển qua biên ô)
+    index.replace("b", [poi(2, 21.032, 105.852, "B")])
+    index.remove("a")
+    assert names(index) == {"B"}
+
+
+def test_nearest_reads_previous_snapshot_while_dirty(monkeypatch):
+    index = SpatialIndex()
+    index.replace("a", [poi(1, 21.03, 105.85, "A")])
+    index.build()
+    index.replace("b", [poi(2, 21.031, 105.851, "B")])
+    assert index.dirty
+
+    def fail_rebuild():
+        raise AssertionError("nearest() must not rebuild the tree")
+
+    monkeypatch.setattr(index, "_rebuild", fail_rebuild)
+    assert names(index, build=False) == {"A"}
+    assert [element["tags"]["name"] for _, element in index.within(21.03, 105.85, 10)] == ["A"]
+    assert index.dirty
+
+
+def test_build_async_serves_latest_changes():
+    index = SpatialIndex()
+
+    async def scenario():
+        index.replace("a", [poi(1, 21.03, 105.85, "A")])
+        await asyncio.gather(index.build_async(), index.build_async())
+        assert not index.dirty
+        index.replace("b", [poi(2, 21.031, 105.851, "B")])
+        await index.build_async()
+        return names(index)
+
+    assert asyncio.run(scenario()) == {"A", "B"}
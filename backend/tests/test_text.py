@@ -0,0 +1,27 @@
+"""
+Kiểm thử tách câu: ghép câu và khoảng trắng phải ra đúng văn bản gốc
+"""
+
+import pytest
+
+from services.text import split_sentences
+
+
+@pytest.mark.parametrize("text", [
+    "Bảo tàng lịch sử. Mở cửa hằng ngày.",
+    "  Hello world.",
+    "\n\nFirst line\nSecond line.  ",
+    "Wait... really?! \"Yes.\" (Sure.)\tDone",
+    "Title   \n\n  Body text.",
+    "   ",
+    "",
+])
+def test_split_sentences_round_trip(text):
+    segments = split_sentences(text)
+    assert "".join(sentence + separator for sentence, separator in segments) == text
+    # Câu không mang khoảng trắng ở hai đầu (dùng làm khóa cache dịch)
+    assert all(sentence == sentence.strip() for sentence, _ in segments)
+
+
+def test_leading_whitespace_is_an_empty_segment():
+    assert split_sentences("  Hello world. Bye.") == [("", "  "), ("Hello world.", " "), ("Bye.", "")]
@@ -0,0 +1,19 @@
+"""
+Kiểm thử nhận biết bản export ONNX đã hoàn tất
+"""
+
+from services.translation_backends import _onnx_export_complete
+
+
+def test_partial_export_is_not_complete(tmp_path):
+    export_dir = tmp_path / "Helsinki-NLP__opus-mt-en-vi"
+    assert not _onnx_export_complete(str(export_dir))
+
+    # Tiến trình bị ngắt khi mới ghi được encoder
+    export_dir.mkdir()
+    (export_dir / "encoder_model.onnx").write_bytes(b"onnx")
+    assert not _onnx_export_complete(str(export_dir))
+
+    for name in ("config.json", "decoder_model.onnx", "decoder_with_past_model.onnx"):
+        (export_dir / name).write_bytes(b"{}")
+    assert _onnx_export_complete(str(export_dir))
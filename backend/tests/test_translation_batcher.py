@@ -0,0 +1,134 @@
+"""
+Kiểm thử batcher dịch: gom batch, giới hạn hàng đợi và từ chối cả request khi quá tải
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.huggingface_service import HuggingFaceService
+from services.translation_batcher import TranslationBatcher, TranslationQueueFull
+
+
+def upper_batch(source_lang, target_lang, texts):
+    return [text.upper() for text in texts]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSLATION_CACHE_PATH", str(tmp_path / "translations.sqlite3"))
+    monkeypatch.setenv("TRANSLATION_PRELOAD", "")
+    service = HuggingFaceService()
+    yield service
+    service.translation_cache.close()
+
+
+def test_concurrent_requests_cannot_overcommit_queue(service):
+    release = threading.Event()
+    translated = []
+
+    def blocked_batch(source_lang, target_lang, texts):
+        release.wait(5)
+        translated.extend(texts)
+        return upper_batch(source_lang, target_lang, texts)
+
+    async def scenario():
+        service.batcher = TranslationBatcher(blocked_batch, max_wait_ms=0, max_queue=4)
+        first = asyncio.create_task(service.translate_many(["a1. a2. a3."]))
+        second = asyncio.create_task(service.translate_many(["b1. b2. b3."]))
+        # Request thứ hai bị từ chối trong lúc batch của request đầu còn đang chạy
+        await asyncio.wait([second], timeout=1)
+        release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        await service.batcher.shutdown()
+        return results
+
+    first, second = asyncio.run(scenario())
+    assert first == ["A1. A2. A3."]
+    assert isinstance(second, TranslationQueueFull)
+    # Request bị từ chối không có câu nào lọt vào hàng đợi, và chỉ được đếm một lần
+    assert not any(text.startswith("b") for text in translated)
+    assert service.batcher.rejected == 3
+
+
+def recording_batcher(**kwargs):
+    batches = []
+
+    def run_batch(source_lang, target_lang, texts):
+        batches.append((f"{source_lang}-{target_lang}", list(texts)))
+        return upper_batch(source_lang, target_lang, texts)
+
+    return TranslationBatcher(run_batch, **kwargs), batches
+
+
+def test_batches_never_exceed_max_batch_size():
+    async def scenario():
+        batcher, batches = recording_batcher(max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit("en", "vi", f"s{i}") for i in range(10)))
+        await batcher.shutdown()
+        return batcher, batches, results
+
+    batcher, batches, results = asyncio.run(scenario())
+    assert results == [f"S{i}" for i in range(10)]
+    assert [len(texts) for _, texts in batches] == [4, 4, 2]
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_requests_within_max_wait_share_a_batch():
+    async def scenario():
+        batcher, batches = recording_batcher(max_batch_size=16, max_wait_ms=100)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = asyncio.ensure_future(batcher.submit("en", "vi", "a"))
+        await asyncio.sleep(0.02)
+        second = asyncio.ensure_future(batcher.submit("en", "vi", "b"))
+        await asyncio.gather(first, second)
+        elapsed = loop.time() - start
+        await batcher.shutdown()
+        return batches, elapsed
+
+    batches, elapsed = asyncio.run(scenario())
+    assert batches == [("en-vi", ["a", "b"])]
+    # Batch được gửi khoảng max_wait sau câu đầu tiên, không chờ thêm theo câu sau
+    assert 0.09 <= elapsed < 0.5
+
+
+def test_full_batch_is_sent_without_waiting():
+    async def scenario():
+        batcher, batches = recording_batcher(max_batch_size=3, max_wait_ms=5000)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit("en", "vi", text) for text in "xyz")), timeout=1
+        )
+        await batcher.shutdown()
+        return batches, results
+
+    batches, results = asyncio.run(scenario())
+    assert results == ["X", "Y", "Z"]
+    assert batches == [("en-vi", ["x", "y", "z"])]
+
+
+def test_language_pairs_are_batched_separately_and_cancelled_items_dropped():
+    async def scenario():
+        batcher, batches = recording_batcher(max_batch_size=8, max_wait_ms=20)
+        cancelled = batcher.enqueue("en", "vi", ["gone"])[0]
+        cancelled.cancel()
+        results = await asyncio.gather(
+            batcher.submit("en", "vi", "hello"), batcher.submit("vi", "en", "xin chào")
+        )
+        await batcher.shutdown()
+        return batches, results
+
+    batches, results = asyncio.run(scenario())
+    assert results == ["HELLO", "XIN CHÀO"]
+    assert sorted(batches) == [("en-vi", ["hello"]), ("vi-en", ["xin chào"])]
+
+
+def test_translate_many_keeps_surrounding_whitespace(service):
+    async def scenario():
+        service.batcher = TranslationBatcher(upper_batch, max_wait_ms=0)
+        results = await service.translate_many(["  Hello world.", "Title   \n\n  Body.", "   "])
+        await service.batcher.shutdown()
+        return results
+
+    assert asyncio.run(scenario()) == ["  HELLO WORLD.", "TITLE   \n\n  BODY.", "   "]
@@ -0,0 +1,49 @@
+"""
+Kiểm thử pool tiến trình dịch: worker chết làm hỏng pool thì pool được tạo lại
+"""
+
+import os
+import time
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services import translation_pool
+
+
+def _init_without_model(*args):
+    """Initializer thay thế: không nạp model (torch không cần có khi chạy test)"""
+
+
+def _crash():
+    os._exit(1)
+
+
+def _answer():
+    return 42
+
+
+def wait_for(condition, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_pool_restarts_after_worker_dies(monkeypatch):
+    monkeypatch.setattr(translation_pool, "_init_worker", _init_without_model)
+    pool = translation_pool.TranslationPool(1, 1, "pytorch", {}, ("en", "vi"), [])
+    try:
+        wait(pool.start())
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(_crash).result(timeout=30)
+        # Callback của future chạy ngay sau khi result() trả về
+        assert wait_for(lambda: pool.stats()["restarts"] == 1)
+
+        # Việc gửi sau đó chạy trên pool mới; pool khỏe lại khi warmup xong
+        assert pool.submit(_answer).result(timeout=30) == 42
+        assert wait_for(lambda: pool.stats()["healthy"])
+        assert pool.stats()["busy_workers"] == 0
+    finally:
+        pool.shutdown()
@@ -1,6 +1,6 @@
 
 import React, { useState } from 'react';
-import { translateText } from '../services/apiService';
+import { translateTextStream } from '../services/apiService';
 
 export const TranslationWidget: React.FC = () => {
   const [isOpen, setIsOpen] = useState(false);
@@ -17,7 +17,8 @@ export const TranslationWidget: React.FC = () => {
     setTranslatedText('');
 
     try {
-      const result = await translateText(inputText, 'en', 'vi');
+      // Hiển thị từng câu ngay khi dịch xong thay vì chờ cả đoạn
+      const result = await translateTextStream(inputText, 'en', 'vi', setTranslatedText);
       
       // Kiểm tra xem có thực sự dịch được không (nếu kết quả giống text gốc)
       if (result === inputText) {
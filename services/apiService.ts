@@ -9,9 +9,13 @@ import type { Coordinates, PointOfInterest, WeatherInfo } from '../types';
 // Ngrok URL - Cập nhật URL này mỗi khi restart ngrok
 const API_URL = import.meta.env.VITE_API_URL || "https://vietnam-discovery-api.onrender.com";
 
+// Làm tròn tọa độ giống backend (4 chữ số, ~11m) để các truy vấn gần như trùng nhau
+// dùng chung URL, nhờ đó trình duyệt/CDN cache được (GET + ETag/Cache-Control)
+const formatCoord = (value: number): string => value.toFixed(4);
+
 /**
  * Lấy tọa độ (lat, lng) của một địa điểm tại Việt Nam
- * Gọi endpoint: POST /api/coordinates
+ * Gọi endpoint: GET /api/coordinates?q=... (cache được bởi trình duyệt/CDN)
  * 
  * @param locationName - Tên địa điểm (VD: "Hà Nội", "Vịnh Hạ Long")
  * @returns Promise<Coordinates> - Tọa độ { lat, lng }
@@ -19,12 +23,8 @@ const API_URL = import.meta.env.VITE_API_URL || "https://vietnam-discovery-api.o
  */
 export async function getCoordinatesForLocation(locationName: string): Promise<Coordinates> {
   try {
-    const response = await fetch(`${API_URL}/api/coordinates`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ location_name: locationName }),
+    const response = await fetch(`${API_URL}/api/coordinates?q=${encodeURIComponent(locationName)}`, {
+      method: 'GET',
     });
 
     if (!response.ok) {
@@ -58,19 +58,24 @@ export async function getCoordinatesForLocation(locationName: string): Promise<C
 
 /**
  * Lấy danh sách 5 điểm ưa thích (POI) xung quanh tọa độ
- * Gọi endpoint: POST /api/pois
+ * Gọi endpoint: GET /api/pois?lat=...&lng=... (cache được bởi trình duyệt/CDN)
  * 
  * @param coords - Tọa độ { lat, lng }
+ * @param includeWeather - Backend điền sẵn thời tiết cho từng POI (1 lời gọi Open-Meteo)
  * @returns Promise<PointOfInterest[]> - Mảng các điểm du lịch
  */
-export async function getPointsOfInterest(coords: Coordinates): Promise<PointOfInterest[]> {
+export async function getPointsOfInterest(
+  coords: Coordinates,
+  includeWeather: boolean = false
+): Promise<PointOfInterest[]> {
   try {
-    const response = await fetch(`${API_URL}/api/pois`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ lat: coords.lat, lng: coords.lng }),
+    const params = new URLSearchParams({
+      lat: formatCoord(coords.lat),
+      lng: formatCoord(coords.lng),
+      include_weather: String(includeWeather),
+    });
+    const response = await fetch(`${API_URL}/api/pois?${params}`, {
+      method: 'GET',
     });
 
     if (!response.ok) {
@@ -93,7 +98,8 @@ export async function getPointsOfInterest(coords: Coordinates): Promise<PointOfI
         lat: poi.coordinates.lat,
         lng: poi.coordinates.lng
       },
-      weather: poi.weather // Optional
+      distance_km: poi.distance_km, // Optional
+      weather: poi.weather ?? undefined // Optional
     }));
 
   } catch (error) {
@@ -109,19 +115,16 @@ export async function getPointsOfInterest(coords: Coordinates): Promise<PointOfI
 
 /**
  * Lấy thông tin thời tiết hiện tại tại một tọa độ
- * Gọi endpoint: POST /api/weather
+ * Gọi endpoint: GET /api/weather?lat=...&lng=... (cache được bởi trình duyệt/CDN)
  * 
  * @param coords - Tọa độ { lat, lng }
  * @returns Promise<WeatherInfo | null> - Thông tin thời tiết hoặc null nếu lỗi
  */
 export async function getWeatherForCoordinates(coords: Coordinates): Promise<WeatherInfo | null> {
   try {
-    const response = await fetch(`${API_URL}/api/weather`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ lat: coords.lat, lng: coords.lng }),
+    const params = new URLSearchParams({ lat: formatCoord(coords.lat), lng: formatCoord(coords.lng) });
+    const response = await fetch(`${API_URL}/api/weather?${params}`, {
+      method: 'GET',
     });
 
     if (!response.ok) {
@@ -149,6 +152,59 @@ export async function getWeatherForCoordinates(coords: Coordinates): Promise<Wea
   }
 }
 
+/**
+ * Tìm kiếm trọn gói: tọa độ + POI + thời tiết trong một request
+ * Gọi endpoint: GET /api/explore?q=...
+ * 
+ * @param locationName - Tên địa điểm (VD: "Hà Nội", "Vịnh Hạ Long")
+ * @returns Promise<{ coordinates, pois }> - Tọa độ địa điểm và các POI kèm thời tiết
+ * @throws Error nếu không tìm thấy hoặc lỗi API
+ */
+export async function exploreLocation(
+  locationName: string
+): Promise<{ coordinates: Coordinates; pois: PointOfInterest[] }> {
+  try {
+    const response = await fetch(`${API_URL}/api/explore?q=${encodeURIComponent(locationName)}`, {
+      method: 'GET',
+    });
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `Không thể tìm kiếm ${locationName}`);
+    }
+
+    const data = await response.json();
+    
+    // Validate dữ liệu trả về
+    if (!data || !data.coordinates || !Array.isArray(data.pois)) {
+      throw new Error('Dữ liệu tìm kiếm không hợp lệ từ backend');
+    }
+
+    return {
+      coordinates: { lat: data.coordinates.lat, lng: data.coordinates.lng },
+      pois: data.pois.map((poi: any) => ({
+        name: poi.name,
+        description: poi.description,
+        coordinates: {
+          lat: poi.coordinates.lat,
+          lng: poi.coordinates.lng
+        },
+        distance_km: poi.distance_km, // Optional
+        weather: poi.weather ?? undefined // Optional
+      }))
+    };
+
+  } catch (error) {
+    console.error("Error exploring location:", error);
+    
+    if (error instanceof TypeError && error.message.includes('fetch')) {
+      throw new Error('Không thể kết nối tới backend API. Vui lòng kiểm tra backend đang chạy.');
+    }
+    
+    throw error;
+  }
+}
+
 /**
  * Dịch văn bản sang tiếng Việt hoặc tiếng Anh
  * Gọi endpoint: POST /api/translate
@@ -206,6 +262,91 @@ export async function translateText(
   }
 }
 
+/**
+ * Dịch văn bản dài theo từng câu, nhận kết quả dần dần
+ * Gọi endpoint: POST /api/translate/stream (NDJSON, mỗi dòng một câu đã dịch)
+ * 
+ * @param text - Văn bản cần dịch
+ * @param sourceLang - Ngôn ngữ nguồn (en, vi)
+ * @param targetLang - Ngôn ngữ đích (en, vi)
+ * @param onProgress - Gọi mỗi khi có thêm câu mới, với toàn bộ phần đã dịch
+ * @returns Promise<string> - Văn bản đã dịch đầy đủ
+ * @throws Error nếu backend báo lỗi hoặc stream kết thúc mà không có dòng {"done": true}
+ */
+export async function translateTextStream(
+  text: string,
+  sourceLang: string = 'en',
+  targetLang: string = 'vi',
+  onProgress?: (partial: string) => void
+): Promise<string> {
+  try {
+    const response = await fetch(`${API_URL}/api/translate/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ 
+        text, 
+        source_lang: sourceLang, 
+        target_lang: targetLang 
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}));
+      console.error('Translation API error:', response.status, errorData);
+      throw new Error(errorData.detail || 'Không thể dịch văn bản. Vui lòng kiểm tra backend API.');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let translated = '';
+    // Backend kết thúc bằng {"done": true}; thiếu dòng này nghĩa là stream bị ngắt giữa chừng
+    let finished = false;
+
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const chunk = JSON.parse(line);
+      if (chunk.error) {
+        throw new Error(chunk.error);
+      }
+      if (chunk.done) {
+        finished = true;
+      } else if (chunk.text !== undefined) {
+        translated += chunk.text + chunk.separator;
+        onProgress?.(translated);
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer + decoder.decode());
+
+    if (!finished) {
+      throw new Error('Bản dịch bị ngắt giữa chừng, kết quả chưa đầy đủ. Vui lòng thử lại.');
+    }
+
+    return translated;
+
+  } catch (error) {
+    console.error("Translation error:", error);
+    
+    if (error instanceof TypeError && error.message.includes('fetch')) {
+      throw new Error('Không thể kết nối tới backend API. Vui lòng kiểm tra backend đang chạy.');
+    }
+    
+    throw error;
+  }
+}
+
 /**
  * Kiểm tra backend API có hoạt động không
  * Gọi endpoint: GET /
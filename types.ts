@@ -14,5 +14,6 @@ export interface PointOfInterest {
   name: string;
   description: string;
   coordinates: Coordinates;
+  distance_km?: number;
   weather?: WeatherInfo;
 }